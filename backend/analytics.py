@@ -0,0 +1,209 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+# Rollup periods and the length of their bucket keys ("2024-03-15" / "2024-03")
+ANALYTICS_PERIODS = {"day": 10, "month": 7}
+
+# Default window per period when the caller gives no range
+DEFAULT_SPAN = {"day": timedelta(days=30), "month": timedelta(days=365)}
+
+# Additive upserts, so the same statements apply a new row (+1) or retract an old one (-1)
+UPSERT_MAINTENANCE_ROLLUP = '''
+    INSERT INTO maintenance_rollups (period, bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (period, bucket, type) DO UPDATE SET
+        records = records + excluded.records,
+        completed = completed + excluded.completed,
+        on_time = on_time + excluded.on_time,
+        cost = cost + excluded.cost,
+        estimated_hours = estimated_hours + excluded.estimated_hours,
+        actual_hours = actual_hours + excluded.actual_hours
+'''
+UPSERT_ACTIVITY_ROLLUP = '''
+    INSERT INTO sensor_activity_rollups (period, bucket, train_id, readings, anomalies)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (period, bucket, train_id) DO UPDATE SET
+        readings = readings + excluded.readings,
+        anomalies = anomalies + excluded.anomalies
+'''
+
+# Backfill: daily rows straight from the source tables, monthly rows folded from the daily ones.
+# These mirror maintenance_contributions / activity_contributions below.
+BACKFILL_MAINTENANCE_DAYS = '''
+    INSERT INTO maintenance_rollups (period, bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours)
+    SELECT 'day', substr(COALESCE(completed_date, scheduled_date), 1, 10) AS day, COALESCE(type, 'Other'),
+           COUNT(*), COUNT(completed_date),
+           COALESCE(SUM(completed_date IS NOT NULL AND completed_date <= scheduled_date), 0),
+           COALESCE(SUM(cost), 0),
+           COALESCE(SUM(CASE WHEN completed_date IS NOT NULL THEN estimated_hours END), 0),
+           COALESCE(SUM(CASE WHEN completed_date IS NOT NULL THEN actual_hours END), 0)
+    FROM maintenance_records
+    WHERE COALESCE(completed_date, scheduled_date) >= ?
+    GROUP BY day, COALESCE(type, 'Other')
+'''
+BACKFILL_ACTIVITY_DAYS = '''
+    INSERT INTO sensor_activity_rollups (period, bucket, train_id, readings, anomalies)
+    SELECT 'day', substr(timestamp, 1, 10) AS day, train_id, COUNT(*), COALESCE(SUM(is_anomaly), 0)
+    FROM sensor_data WHERE timestamp >= ?
+    GROUP BY day, train_id
+'''
+BACKFILL_MAINTENANCE_MONTHS = '''
+    INSERT INTO maintenance_rollups (period, bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours)
+    SELECT 'month', substr(bucket, 1, 7) AS month, type, SUM(records), SUM(completed), SUM(on_time),
+           SUM(cost), SUM(estimated_hours), SUM(actual_hours)
+    FROM maintenance_rollups WHERE period = 'day' AND bucket >= ?
+    GROUP BY month, type
+'''
+BACKFILL_ACTIVITY_MONTHS = '''
+    INSERT INTO sensor_activity_rollups (period, bucket, train_id, readings, anomalies)
+    SELECT 'month', substr(bucket, 1, 7) AS month, train_id, SUM(readings), SUM(anomalies)
+    FROM sensor_activity_rollups WHERE period = 'day' AND bucket >= ?
+    GROUP BY month, train_id
+'''
+
+
+def day_key(value):
+    # date, datetime or the ISO text SQLite hands back -> "YYYY-MM-DD"
+    return str(value)[:10]
+
+
+def maintenance_contributions(records, sign=1):
+    # records: (type, status, scheduled_date, completed_date, estimated_hours, actual_hours, cost) tuples.
+    # A record counts on its completion day, or its scheduled day until it is completed.
+    buckets = {}
+    for kind, _, scheduled, completed, estimated, actual, cost in records:
+        when = completed or scheduled
+        if when is None:
+            continue
+        done = completed is not None
+        measures = (
+            1,
+            int(done),
+            int(done and day_key(completed) <= day_key(scheduled)) if scheduled is not None else 0,
+            cost or 0,
+            (estimated or 0) if done else 0,
+            (actual or 0) if done else 0,
+        )
+        day = day_key(when)
+        for period, width in ANALYTICS_PERIODS.items():
+            key = (period, day[:width], kind or "Other")
+            agg = buckets.setdefault(key, [0] * len(measures))
+            for i, value in enumerate(measures):
+                agg[i] += sign * value
+    return [key + tuple(agg) for key, agg in buckets.items()]
+
+
+def activity_contributions(readings):
+    # readings: (train_id, sensor_type, value, unit, timestamp, is_anomaly) tuples
+    buckets = {}
+    for train_id, _, _, _, timestamp, is_anomaly in readings:
+        day = day_key(timestamp)
+        for period, width in ANALYTICS_PERIODS.items():
+            key = (period, day[:width], train_id)
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = [1, int(bool(is_anomaly))]
+            else:
+                agg[0] += 1
+                agg[1] += int(bool(is_anomaly))
+    return [key + tuple(agg) for key, agg in buckets.items()]
+
+
+def bucket_range(period, since=None, until=None, today=None):
+    # Inclusive (first, last) bucket keys; defaults to the trailing DEFAULT_SPAN
+    if period not in ANALYTICS_PERIODS:
+        raise ValueError(f"Unknown period {period}; use one of {', '.join(ANALYTICS_PERIODS)}")
+    until = until or today or date.today()
+    since = since or until - DEFAULT_SPAN[period]
+    width = ANALYTICS_PERIODS[period]
+    return day_key(since)[:width], day_key(until)[:width]
+
+
+def bucket_hours(period, bucket):
+    if period == "day":
+        return 24
+    year, month = int(bucket[:4]), int(bucket[5:7])
+    return calendar.monthrange(year, month)[1] * 24
+
+
+def bucket_label(period, bucket):
+    if period == "day":
+        return bucket
+    return datetime.strptime(bucket, "%Y-%m").strftime("%b %Y")
+
+
+def _percent(part, whole):
+    return round(part * 100 / whole, 1) if whole else None
+
+
+def performance_series(period, maintenance_rows, activity_rows, fleet_size):
+    # maintenance_rows: (bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours)
+    # activity_rows: (bucket, trains reporting, readings, anomalies)
+    buckets = {}
+    for bucket, _, records, completed, on_time, _, estimated, actual in maintenance_rows:
+        agg = buckets.setdefault(bucket, [0, 0, 0, 0, 0, 0, 0, 0])
+        agg[0] += records
+        agg[1] += completed
+        agg[2] += on_time
+        agg[3] += estimated
+        agg[4] += actual
+    for bucket, trains, readings, anomalies in activity_rows:
+        agg = buckets.setdefault(bucket, [0, 0, 0, 0, 0, 0, 0, 0])
+        agg[5], agg[6], agg[7] = trains, readings, anomalies
+
+    series = []
+    for bucket in sorted(buckets):
+        records, completed, on_time, estimated, actual, trains, readings, anomalies = buckets[bucket]
+        # Trains that reported sensor data that period; the current fleet size when there is none
+        fleet_hours = (trains or fleet_size) * bucket_hours(period, bucket)
+        series.append({
+            "period": bucket,
+            "month": bucket_label(period, bucket),
+            # Planned vs actual hours on completed work, capped at 100
+            "efficiency": min(100.0, _percent(estimated, actual)) if actual else None,
+            # Fleet hours not spent in completed maintenance
+            "availability": round(max(0.0, 100 - actual * 100 / fleet_hours), 1) if fleet_hours else None,
+            "onTime": _percent(on_time, completed),
+            "sensorHealth": round(100 - anomalies * 100 / readings, 1) if readings else None,
+            "maintenanceRecords": records,
+            "completed": completed,
+            "maintenanceHours": actual,
+            "trainsReporting": trains,
+            "readings": readings,
+            "anomalies": anomalies,
+        })
+    return series
+
+
+def cost_summary(period, maintenance_rows):
+    # Spend per bucket split by maintenance type, plus the breakdown over the whole range
+    months, by_type = {}, {}
+    for bucket, kind, records, _, _, cost, _, _ in maintenance_rows:
+        entry = months.setdefault(bucket, {"period": bucket, "month": bucket_label(period, bucket),
+                                           "maintenance": 0.0, "records": 0, "byType": {}})
+        entry["maintenance"] += cost
+        entry["records"] += records
+        entry["byType"][kind] = round(entry["byType"].get(kind, 0) + cost, 2)
+        totals = by_type.setdefault(kind, [0.0, 0])
+        totals[0] += cost
+        totals[1] += records
+
+    monthly = [months[bucket] for bucket in sorted(months)]
+    for entry in monthly:
+        entry["maintenance"] = round(entry["maintenance"], 2)
+    total = sum(amount for amount, _ in by_type.values())
+    breakdown = [
+        {"category": kind, "amount": round(amount, 2), "records": records,
+         "percentage": _percent(amount, total) or 0}
+        for kind, (amount, records) in sorted(by_type.items(), key=lambda item: -item[1][0])
+    ]
+    records = sum(count for _, count in by_type.values())
+    return {
+        "monthly_costs": monthly,
+        "cost_breakdown": breakdown,
+        "totals": {
+            "cost": round(total, 2),
+            "records": records,
+            "averageCost": round(total / records, 2) if records else None,
+        },
+    }
@@ -0,0 +1,106 @@
+import math
+
+ALERT_COLUMNS = ("train_id", "type", "title", "description", "status", "priority", "created_at")
+
+
+class StreamingAnomalyDetector:
+    """Flags statistical excursions per (train, sensor) in O(1) time and memory.
+
+    Each stream keeps an exponentially weighted mean and variance of its value
+    and of its rate of change (units per second). A reading is anomalous when
+    its z-score against either distribution exceeds the threshold. Streams stay
+    quiet for ``warmup`` readings and alert at most once per ``cooldown``
+    seconds, so a sustained excursion produces one alert rather than one per
+    reading.
+    """
+
+    def __init__(self, alpha=0.05, z_threshold=4.0, rate_z_threshold=5.0, critical_z=6.0, warmup=20, cooldown=300):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.rate_z_threshold = rate_z_threshold
+        self.critical_z = critical_z
+        self.warmup = warmup
+        self.cooldown = cooldown
+        # (train_id, sensor_type) -> [count, mean, var, rate_mean, rate_var, last_value, last_epoch, last_alert_epoch]
+        self.streams = {}
+        self.readings_seen = 0
+        self.anomalies_found = 0
+
+    def _update(self, state, value, epoch):
+        alpha = self.alpha
+        count, mean, var, rate_mean, rate_var, last_value, last_epoch, last_alert = state
+
+        z = abs(value - mean) / math.sqrt(var) if var > 0 else 0.0
+        rate = None
+        rate_z = 0.0
+        elapsed = epoch - last_epoch
+        if elapsed > 0:
+            rate = (value - last_value) / elapsed
+            if rate_var > 0:
+                rate_z = abs(rate - rate_mean) / math.sqrt(rate_var)
+
+        # Incremental EWMA mean/variance update
+        diff = value - mean
+        increment = alpha * diff
+        state[1] = mean + increment
+        state[2] = (1 - alpha) * (var + diff * increment)
+        if rate is not None:
+            if count < 2:
+                state[3] = rate
+            else:
+                diff = rate - rate_mean
+                increment = alpha * diff
+                state[3] = rate_mean + increment
+                state[4] = (1 - alpha) * (rate_var + diff * increment)
+        state[0] = count + 1
+        state[5] = value
+        state[6] = epoch
+
+        if count < self.warmup or epoch - last_alert < self.cooldown:
+            return None
+        if z >= self.z_threshold or rate_z >= self.rate_z_threshold:
+            state[7] = epoch
+            return z, rate_z, mean, rate
+        return None
+
+    def process(self, readings):
+        # readings: (train_id, sensor_type, value, unit, timestamp, is_anomaly) tuples.
+        # Returns alert rows in ALERT_COLUMNS order.
+        alerts = []
+        streams = self.streams
+        for train_id, sensor_type, value, unit, timestamp, _is_anomaly in readings:
+            epoch = timestamp.timestamp()
+            key = (train_id, sensor_type)
+            state = streams.get(key)
+            if state is None:
+                streams[key] = [1, value, 0.0, 0.0, 0.0, value, epoch, -math.inf]
+                continue
+            result = self._update(state, value, epoch)
+            if result is not None:
+                alerts.append(self._alert_row(train_id, sensor_type, value, unit, timestamp, *result))
+        self.readings_seen += len(readings)
+        self.anomalies_found += len(alerts)
+        return alerts
+
+    def _alert_row(self, train_id, sensor_type, value, unit, timestamp, z, rate_z, mean, rate):
+        severity = max(z, rate_z)
+        if z >= rate_z:
+            detail = f"{sensor_type} reading {value:.2f} {unit} is {z:.1f} standard deviations from its recent mean of {mean:.2f} {unit}"
+        else:
+            detail = f"{sensor_type} changing at {rate:.2f} {unit}/s, {rate_z:.1f} standard deviations from its usual rate"
+        return (
+            train_id,
+            "critical" if severity >= self.critical_z else "warning",
+            f"Train KMRL-{str(train_id).zfill(3)} {sensor_type.title()} Anomaly",
+            detail[0].upper() + detail[1:],
+            "active",
+            "High" if severity >= self.critical_z else "Medium",
+            timestamp,
+        )
+
+    def stats(self):
+        return {
+            "streams": len(self.streams),
+            "readings_seen": self.readings_seen,
+            "anomalies_found": self.anomalies_found,
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Analytics queries answered from the rollups against aggregating the source tables per request.
+
+Seeds several years of maintenance records and sensor readings into a temporary
+database, then times a monthly performance + cost query both ways.
+
+Usage: python benchmarks/bench_analytics.py [--years 5] [--trains 100] [--readings-per-day 20] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KMRL_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="kmrl-analytics-"), "kmrl.db"))
+
+from analytics import cost_summary, performance_series
+from database import INSERT_MAINTENANCE_RECORD, INSERT_SENSOR_DATA, KMRLDatabase
+
+# What the endpoints would have to run without rollups
+RAW_MAINTENANCE = '''
+    SELECT substr(COALESCE(completed_date, scheduled_date), 1, 7) AS month, COALESCE(type, 'Other'),
+           COUNT(*), COUNT(completed_date),
+           COALESCE(SUM(completed_date IS NOT NULL AND completed_date <= scheduled_date), 0), COALESCE(SUM(cost), 0),
+           COALESCE(SUM(CASE WHEN completed_date IS NOT NULL THEN estimated_hours END), 0),
+           COALESCE(SUM(CASE WHEN completed_date IS NOT NULL THEN actual_hours END), 0)
+    FROM maintenance_records WHERE COALESCE(completed_date, scheduled_date) >= ?
+    GROUP BY month, 2 ORDER BY month
+'''
+RAW_ACTIVITY = '''
+    SELECT month, COUNT(*), SUM(readings), SUM(anomalies) FROM (
+        SELECT substr(timestamp, 1, 7) AS month, train_id, COUNT(*) AS readings, SUM(is_anomaly) AS anomalies
+        FROM sensor_data WHERE timestamp >= ? GROUP BY month, train_id
+    ) GROUP BY month
+'''
+
+
+def seed(db, years, trains, readings_per_day, rng):
+    start = datetime.now() - timedelta(days=365 * years)
+    days = 365 * years
+    with db.transaction() as conn:
+        conn.executemany(INSERT_MAINTENANCE_RECORD, (
+            (train, rng.choice(("Preventive", "Corrective", "Inspection", "Emergency")), "Completed",
+             (start + timedelta(days=day)).date(), (start + timedelta(days=day + rng.choice((0, 0, 1)))).date(),
+             8, rng.randint(6, 12), "Medium", "Ravi Kumar", rng.uniform(10000, 150000), None)
+            for train in range(1, trains + 1) for day in range(0, days, 30)
+        ))
+    for day in range(days):
+        base = start + timedelta(days=day)
+        with db.transaction() as conn:
+            conn.executemany(INSERT_SENSOR_DATA, (
+                (train, "temperature", 70.0, "°C", base + timedelta(seconds=i * 86400 // readings_per_day), rng.random() < 0.05)
+                for train in range(1, trains + 1) for i in range(readings_per_day)
+            ))
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--trains", type=int, default=100)
+    parser.add_argument("--readings-per-day", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = KMRLDatabase(os.environ["KMRL_DB_PATH"])
+    started = time.perf_counter()
+    seed(db, args.years, args.trains, args.readings_per_day, random.Random(11))
+    with db.connection() as conn:
+        readings = conn.execute("SELECT COUNT(*) FROM sensor_data").fetchone()[0]
+        records = conn.execute("SELECT COUNT(*) FROM maintenance_records").fetchone()[0]
+    print(f"seeded {readings} readings and {records} maintenance records in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    db.backfill_analytics_rollups()
+    print(f"backfill: {time.perf_counter() - started:.2f}s")
+
+    since = (datetime.now() - timedelta(days=365 * args.years)).date().isoformat()
+    first, last = since[:7], datetime.now().date().isoformat()[:7]
+
+    def from_rollups():
+        maintenance = db.maintenance_rollups("month", first, last)
+        performance_series("month", maintenance, db.activity_rollups("month", first, last), args.trains)
+        cost_summary("month", maintenance)
+
+    def from_source():
+        with db.connection() as conn:
+            maintenance = conn.execute(RAW_MAINTENANCE, (since,)).fetchall()
+            activity = conn.execute(RAW_ACTIVITY, (since,)).fetchall()
+        performance_series("month", maintenance, activity, args.trains)
+        cost_summary("month", maintenance)
+
+    raw_ms, rollup_ms = timed(from_source, args.repeat), timed(from_rollups, args.repeat)
+    print(f"{'source tables ms':>18}{'rollups ms':>12}{'speedup':>9}")
+    print(f"{raw_ms:>18.1f}{rollup_ms:>12.2f}{raw_ms / rollup_ms:>8.0f}x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
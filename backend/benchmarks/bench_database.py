@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare connect-per-call SQLite access with the pooled KMRLDatabase.
+
+Usage: python benchmarks/bench_database.py [--inserts 2000] [--reads 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("KMRL_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="kmrl-bench-"), "kmrl.db"))
+
+from database import KMRLDatabase, INSERT_SENSOR_DATA, SELECT_TRAINS
+
+
+def legacy_insert(db_path, row):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(INSERT_SENSOR_DATA, row)
+    conn.commit()
+    conn.close()
+
+
+def legacy_read(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(SELECT_TRAINS)
+    trains = cursor.fetchall()
+    conn.close()
+    return trains
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_inserts(insert, count):
+    start = time.perf_counter()
+    for i in range(count):
+        insert((i % 20 + 1, "temperature", 70.0 + i % 25, "°C", datetime.now(), False))
+    return count / (time.perf_counter() - start)
+
+
+def run_reads(read, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        read()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50), percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kmrl-bench-")
+
+    # The legacy path shares the schema but uses SQLite's default rollback journal
+    legacy_path = os.path.join(workdir, "legacy.db")
+    KMRLDatabase(legacy_path, pragmas={"journal_mode": "DELETE", "synchronous": "FULL"}).close()
+    legacy = {
+        "inserts_per_sec": run_inserts(lambda row: legacy_insert(legacy_path, row), args.inserts),
+        "read": run_reads(lambda: legacy_read(legacy_path), args.reads),
+    }
+
+    pooled_db = KMRLDatabase(os.path.join(workdir, "pooled.db"))
+    pooled = {
+        "inserts_per_sec": run_inserts(lambda row: pooled_db.add_sensor_data(*row[:4], is_anomaly=row[5]), args.inserts),
+        "read": run_reads(pooled_db.get_trains, args.reads),
+    }
+    pooled_db.close()
+
+    print(f"{'':<10}{'inserts/sec':>14}{'read p50 ms':>14}{'read p99 ms':>14}")
+    for name, result in (("before", legacy), ("after", pooled)):
+        p50, p99 = result["read"]
+        print(f"{name:<10}{result['inserts_per_sec']:>14,.0f}{p50:>14.3f}{p99:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
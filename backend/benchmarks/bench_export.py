@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Peak memory of streaming sensor_data exports against loading the full result.
+
+Each measurement runs in a fresh child process so ru_maxrss reflects that
+export alone.
+
+Usage: python benchmarks/bench_export.py [--rows 100000 1000000] [--formats csv ndjson parquet]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(fmt, mode):
+    from database import db
+    from report_export import export_sql, stream_export
+
+    before = rss_mb()
+    started = time.perf_counter()
+    written = 0
+    if mode == "stream":
+        for data in stream_export(db, "sensor-data", fmt):
+            written += len(data)
+    else:
+        sql, params = export_sql("sensor-data")
+        with db.connection() as conn:
+            written = len(conn.execute(sql, params).fetchall())
+    print(f"{rss_mb() - before:.1f} {time.perf_counter() - started:.2f} {written}")
+
+
+def seed_database(path, rows):
+    os.environ["KMRL_DB_PATH"] = path
+    from database import INSERT_SENSOR_DATA, KMRLDatabase
+
+    db = KMRLDatabase(path)
+    start = datetime.now() - timedelta(seconds=rows)
+    sensors = (("temperature", "°C"), ("vibration", "mm/s"), ("pressure", "bar"))
+    batch = 50000
+    for offset in range(0, rows, batch):
+        with db.transaction() as conn:
+            conn.executemany(INSERT_SENSOR_DATA, (
+                (i % 20 + 1, sensors[i % 3][0], 60 + (i % 37) * 0.5, sensors[i % 3][1], start + timedelta(seconds=i), i % 11 == 0)
+                for i in range(offset, min(offset + batch, rows))
+            ))
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "parquet"])
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'rows':>10}{'format':>10}{'mode':>10}{'peak +MB':>10}{'seconds':>9}{'MB out':>9}")
+    for rows in args.rows:
+        path = os.path.join(tempfile.mkdtemp(prefix="kmrl-export-"), "kmrl.db")
+        seed_database(path, rows)
+        env = dict(os.environ, KMRL_DB_PATH=path)
+        runs = [(fmt, "stream") for fmt in args.formats] + [("-", "fetchall")]
+        for fmt, mode in runs:
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", fmt, mode],
+                                 env=env, cwd=BACKEND, capture_output=True, text=True, check=True).stdout.split()
+            peak, seconds, written = float(out[0]), float(out[1]), int(out[2])
+            size = f"{written / 1048576:.1f}" if mode == "stream" else "-"
+            print(f"{rows:>10}{fmt:>10}{mode:>10}{peak:>10.1f}{seconds:>9.2f}{size:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Scale test for the induction optimizer over a 30-day horizon.
+
+Also times the materialized plan: single-train updates and plan reads
+against the full re-optimization they replace.
+
+Usage: python benchmarks/bench_induction.py [--fleets 20 1000 5000] [--horizon 30] [--budget 0.05] [--updates 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fleet_store import FleetStore, TrainRecord
+from induction_optimizer import InductionOptimizer
+from induction_plan import MaterializedInductionPlan
+
+
+def synthetic_fleet(size, horizon, seed=7):
+    rng = random.Random(seed)
+    today = date.today()
+    depot_count = max(3, size // 100)
+    # Enough free bays for roughly the whole fleet to cycle through once per horizon
+    free_bays = max(2, size // (depot_count * horizon) + 2)
+    depots = [(d, f"Depot {d}", free_bays * 3, free_bays * 2, f"Site {d}") for d in range(1, depot_count + 1)]
+    trains = [
+        (
+            i, f"KMRL-{str(i).zfill(5)}",
+            ["Metro-A1", "Metro-B2", "Metro-C3"][i % 3],
+            ["Available", "Maintenance", "In Service"][i % 3],
+            rng.randint(25000, 55000),
+            rng.randint(1, depot_count),
+            rng.randint(60, 95),
+            today - timedelta(days=rng.randint(1, 30)),
+            today + timedelta(days=rng.randint(-5, horizon - 1)),
+            ["Alstom", "BEML", "Siemens"][i % 3],
+            2020 + (i % 4),
+        )
+        for i in range(1, size + 1)
+    ]
+    return trains, depots
+
+
+def bench_incremental(trains, depots, horizon, updates, seed=11):
+    store = FleetStore()
+    for row in trains:
+        store.add(TrainRecord(*row))
+    plan = MaterializedInductionPlan(store, lambda: depots, InductionOptimizer(horizon_days=horizon))
+    store.add_listener(plan.on_train_changed)
+    plan.rebuild()
+
+    rng = random.Random(seed)
+    ids = [row[0] for row in trains]
+    started = time.perf_counter()
+    for _ in range(updates):
+        store.update_train(rng.choice(ids), mileage=rng.randint(25000, 55000), health_score=rng.randint(40, 99),
+                           status=rng.choice(["Available", "Maintenance", "In Service"]))
+    update_us = (time.perf_counter() - started) / updates * 1e6
+
+    started = time.perf_counter()
+    for _ in range(updates):
+        plan.read()
+    read_us = (time.perf_counter() - started) / updates * 1e6
+    return update_us, read_us, plan.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleets", type=int, nargs="+", default=[20, 1000, 5000])
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--budget", type=float, default=0.05, help="time budget in seconds for the anytime run")
+    parser.add_argument("--updates", type=int, default=2000, help="single-train updates for the incremental run")
+    args = parser.parse_args()
+
+    print(f"{'trains':>8}{'mode':>10}{'scheduled':>11}{'unsched':>9}{'objective':>14}{'iters':>10}{'ms':>10}")
+    for size in args.fleets:
+        trains, depots = synthetic_fleet(size, args.horizon)
+        optimizer = InductionOptimizer(horizon_days=args.horizon)
+        for mode, budget in (("full", None), ("anytime", args.budget)):
+            result = optimizer.optimize(trains, depots, time_budget=budget)
+            print(f"{size:>8}{mode:>10}{len(result['assignments']):>11}{len(result['unscheduled']):>9}"
+                  f"{result['objective']:>14,.0f}{result['iterations']:>10}{result['elapsed_ms']:>10.1f}")
+        again = optimizer.optimize(trains, depots)
+        same = [(j["row"][0], j["day"], j["depot"]) for j in again["assignments"]] == \
+               [(j["row"][0], j["day"], j["depot"]) for j in optimizer.optimize(trains, depots)["assignments"]]
+        print(f"{'':>8}{'repeat':>10}  deterministic={same}")
+        if args.updates:
+            update_us, read_us, stats = bench_incremental(trains, depots, args.horizon, args.updates)
+            print(f"{'':>8}{'increment':>10}  update={update_us:.1f}us read={read_us:.1f}us "
+                  f"scheduled={stats['scheduled']} waiting={stats['waiting']}")
+
+
+if __name__ == "__main__":
+    main()
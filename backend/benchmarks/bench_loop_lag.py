@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Event-loop lag: /api/health latency while the database is under heavy sensor writes.
+
+Starts the backend under uvicorn once with database calls run inline on the
+event loop (KMRL_DB_READERS=0) and once through the async repository, and in
+both runs keeps the database busy: a writer process commits large sensor
+batches back to back while client processes fetch raw sensor series, list
+alerts and schedule maintenance. Meanwhile /api/health is called every few
+milliseconds; its latency is the time the event loop took to get to it.
+
+Usage: python benchmarks/bench_loop_lag.py [--duration 10] [--clients 8] [--batch 20000] [--modes inline pooled]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+MODES = {"inline": "0", "pooled": "4"}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def readings(count, now):
+    sensors = (("temperature", "°C", 60, 95), ("vibration", "mm/s", 1, 5), ("pressure", "bar", 6, 10))
+    rows = []
+    for i in range(count):
+        name, unit, low, high = sensors[i % 3]
+        rows.append((i % 20 + 1, name, random.uniform(low, high), unit, now - timedelta(seconds=i * 7 % 86400), False))
+    return rows
+
+
+def start_server(path, port, readers):
+    env = dict(os.environ, KMRL_DB_PATH=path, KMRL_DB_READERS=readers, KMRL_PREDICT_SECONDS="3600")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def sensor_writer(path, batch, stop, writes):
+    from database import KMRLDatabase
+
+    db = KMRLDatabase(path)
+    while not stop.is_set():
+        db.add_sensor_data_batch(readings(batch, datetime.now()))
+        with writes.get_lock():
+            writes.value += 1
+    db.close()
+
+
+def client(port, stop, requests, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    rng = random.Random()
+    while not stop.is_set():
+        choice = rng.random()
+        if choice < 0.5:
+            conn.request("GET", f"/api/trains/{rng.randint(1, 20)}/sensors?timeRange=1h")
+        elif choice < 0.8:
+            conn.request("GET", "/api/alerts")
+        else:
+            body = json.dumps({"trainId": rng.randint(1, 20), "scheduledDate": "2026-12-01"})
+            conn.request("POST", "/api/maintenance/schedule", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        with requests.get_lock():
+            requests.value += 1
+        if response.status >= 400:
+            with errors.get_lock():
+                errors.value += 1
+
+
+def run_mode(mode, args):
+    # The writer and each client get their own process so none of them competes with the probe for a GIL
+    path = os.path.join(tempfile.mkdtemp(prefix="kmrl-lag-"), "kmrl.db")
+    from database import KMRLDatabase
+
+    seed = KMRLDatabase(path)
+    seed.add_sensor_data_batch(readings(args.history, datetime.now()))
+    seed.close()
+    port = free_port()
+    server = start_server(path, port, MODES[mode])
+    stop = multiprocessing.Event()
+    writes, requests, errors = (multiprocessing.Value("i", 0) for _ in range(3))
+    workers = [multiprocessing.Process(target=sensor_writer, args=(path, args.batch, stop, writes))]
+    workers += [multiprocessing.Process(target=client, args=(port, stop, requests, errors)) for _ in range(args.clients)]
+    probe = []
+    try:
+        for worker in workers:
+            worker.start()
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            conn.request("GET", "/api/health")
+            conn.getresponse().read()
+            probe.append((time.perf_counter() - started) * 1000)
+            time.sleep(args.probe_interval)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        server.terminate()
+        server.wait()
+    return probe, {"writes": writes.value, "requests": requests.value, "errors": errors.value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=20000, help="sensor rows per write transaction")
+    parser.add_argument("--history", type=int, default=300000, help="sensor rows seeded before the run")
+    parser.add_argument("--probe-interval", type=float, default=0.005)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':>8}{'probes':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'req/s':>8}{'writes':>8}{'errors':>8}")
+    for mode in args.modes:
+        probe, counts = run_mode(mode, args)
+        print(f"{mode:>8}{len(probe):>8}{percentile(probe, 50):>9.2f}{percentile(probe, 95):>9.2f}"
+              f"{percentile(probe, 99):>9.2f}{max(probe, default=0):>9.2f}{counts['requests'] / args.duration:>8.0f}"
+              f"{counts['writes']:>8}{counts['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
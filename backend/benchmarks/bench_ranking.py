@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: top-k induction ranking against a full sort of the fleet.
+
+Usage: python benchmarks/bench_ranking.py [--fleets 10000 100000] [--k 10] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import PriorityScorer
+
+
+def synthetic_fleet(size, seed=7):
+    rng = random.Random(seed)
+    today = date.today()
+    return [
+        (
+            i, f"KMRL-{str(i).zfill(6)}", "Metro-A1", "Available",
+            rng.randint(25000, 55000), rng.randint(1, 3), rng.randint(60, 95),
+            (today - timedelta(days=rng.randint(1, 30))).isoformat(),
+            (today + timedelta(days=rng.randint(-5, 40))).isoformat(),
+            "Alstom", 2021,
+        )
+        for i in range(1, size + 1)
+    ]
+
+
+def timed(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleets", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scorer = PriorityScorer()
+    heap_only = PriorityScorer(vectorize_above=float("inf"))
+    today = date.today()
+
+    def full_sort(trains):
+        # What the ranking used to do: score and sort everything, keep the head
+        ranked = sorted(((scorer.score_row(r, today), r) for r in trains), key=lambda p: (-p[0], p[1][0]))
+        return ranked[:args.k]
+
+    print(f"{'trains':>8}{'full sort ms':>14}{'heap ms':>10}{'numpy ms':>10}{'speedup':>9}  same")
+    for size in args.fleets:
+        trains = synthetic_fleet(size)
+        sort_ms, expected = timed(lambda: full_sort(trains), args.repeat)
+        heap_ms, by_heap = timed(lambda: heap_only.top_k(trains, args.k, today), args.repeat)
+        numpy_ms, by_numpy = timed(lambda: scorer._top_k_vectorized(trains, args.k, today), args.repeat)
+        ids = lambda ranked: [(round(s, 9), r[0]) for s, r in ranked]
+        same = ids(expected) == ids(by_heap) == ids(by_numpy)
+        print(f"{size:>8}{sort_ms:>14.1f}{heap_ms:>10.1f}{numpy_ms:>10.1f}{sort_ms / min(heap_ms, numpy_ms):>8.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
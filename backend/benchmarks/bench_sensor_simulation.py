@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Readings/sec of the vectorized fleet sensor simulator versus the scalar loop.
+
+Usage: python benchmarks/bench_sensor_simulation.py [--fleets 20 500 5000] [--ticks 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor_simulator import FleetSensorSimulator
+
+MODELS = ["Metro-A1", "Metro-B2", "Metro-C3"]
+
+
+def scalar_tick(trains):
+    # The per-train random.uniform loop generate_sensor_data used before
+    now = datetime.now()
+    readings = []
+    for train_id, _model, _depot in trains:
+        temp = 70 + random.uniform(-10, 25)
+        vibration = 1 + random.uniform(0, 4)
+        pressure = 7 + random.uniform(-1, 3)
+        readings.append((train_id, "temperature", temp, "°C", now, temp > 90))
+        readings.append((train_id, "vibration", vibration, "mm/s", now, vibration > 4))
+        readings.append((train_id, "pressure", pressure, "bar", now, pressure < 6 or pressure > 10))
+    return readings
+
+
+def rate(fn, ticks, readings_per_tick):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        fn()
+    return ticks * readings_per_tick / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleets", type=int, nargs="+", default=[20, 500, 5000])
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'trains':>8}{'scalar loop':>16}{'vector step':>16}{'step+rows':>16}   readings/sec")
+    for size in args.fleets:
+        trains = [(i, MODELS[i % 3], i % 3 + 1) for i in range(1, size + 1)]
+        simulator = FleetSensorSimulator(trains, seed=42)
+        per_tick = size * len(simulator.sensor_names)
+
+        def step_and_rows():
+            values, anomalies = simulator.step()
+            simulator.to_readings(values, anomalies, datetime.now())
+
+        scalar = rate(lambda: scalar_tick(trains), args.ticks, per_tick)
+        vector = rate(simulator.step, args.ticks, per_tick)
+        with_rows = rate(step_and_rows, args.ticks, per_tick)
+        print(f"{size:>8}{scalar:>16,.0f}{vector:>16,.0f}{with_rows:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark suite with JSON baselines and a regression check.
+
+Runs entirely on this machine. Each scenario produces one or more results,
+each a throughput and p50/p95/p99 latencies in milliseconds:
+
+  read       read endpoints at --concurrency, in-process through the ASGI app
+             (httpx ASGITransport) and over loopback against uvicorn
+  ingestion  simulated sensor ticks through SensorIngestionPipeline into
+             SQLite for synthetic fleets of --ingest-fleets trains
+  websocket  sensor_batch fan-out to --clients clients: in-process through
+             BroadcastHub, and over loopback through /ws of a uvicorn server
+  induction  a full InductionOptimizer run for --plan-fleets trains
+
+--save writes the results as a JSON baseline. --baseline compares the run
+against one and exits with status 1 if any result regressed by more than
+--threshold: lower throughput or higher latency (percentiles picked with
+--metrics). Latency changes smaller than --min-delta-ms never count, so
+sub-millisecond noise does not fail a run. Baselines are only comparable
+on the same machine; the suite warns when CPU count or Python differ.
+
+Usage:
+    python benchmarks/bench_suite.py --save benchmarks/baselines/local.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baselines/local.json [--threshold 0.25]
+    python benchmarks/bench_suite.py --quick --scenarios read induction
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from bench_induction import synthetic_fleet
+from ws_load_test import SimulatedSocket
+
+SCENARIOS = ("read", "ingestion", "websocket", "induction")
+METRICS = ("throughput", "p50", "p95", "p99")
+
+# {train} is replaced by a random train id per request
+READ_ENDPOINTS = (
+    ("GET", "/api/trains"),
+    ("GET", "/api/trains?status=Available&sort=-healthScore&limit=50"),
+    ("GET", "/api/trains/{train}"),
+    ("GET", "/api/dashboard"),
+    ("GET", "/api/induction/plan"),
+    ("POST", "/api/induction/generate-plan?timeBudget=0.05"),
+    ("GET", "/api/alerts"),
+    ("GET", "/api/analytics/performance"),
+)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def summarize(latencies, operations, elapsed, unit, **extra):
+    # latencies in seconds; throughput is operations per second of wall time
+    ms = [latency * 1000 for latency in latencies]
+    return dict(
+        unit=unit,
+        count=len(ms),
+        throughput=round(operations / elapsed, 2) if elapsed > 0 else 0.0,
+        p50=round(percentile(ms, 50), 3),
+        p95=round(percentile(ms, 95), 3),
+        p99=round(percentile(ms, 99), 3),
+        **extra,
+    )
+
+
+def prepare_database(path, trains):
+    # The sample depots and trains, plus synthetic ones up to `trains`
+    from database import KMRLDatabase
+
+    database = KMRLDatabase(path)
+    rng = random.Random(3)
+    today = date.today()
+    rows = [
+        {
+            "train_number": f"BENCH-{i:05d}",
+            "model": ["Metro-A1", "Metro-B2", "Metro-C3"][i % 3],
+            "status": ["Available", "Maintenance", "In Service"][i % 3],
+            "mileage": rng.randint(25000, 55000),
+            "health_score": rng.randint(60, 95),
+            "last_maintenance": (today - timedelta(days=rng.randint(1, 30))).isoformat(),
+            "next_maintenance": (today + timedelta(days=rng.randint(-5, 29))).isoformat(),
+            "manufacturer": ["Alstom", "BEML", "Siemens"][i % 3],
+            "year_manufactured": 2020 + i % 4,
+            "depot_id": i % 3 + 1,
+        }
+        for i in range(21, trains + 1)
+    ]
+    if rows:
+        database.upsert_trains(rows)
+    database.close()
+
+
+def start_server(path, port, tick_seconds):
+    env = dict(os.environ, KMRL_DB_PATH=path, KMRL_SENSOR_TICK_SECONDS=str(tick_seconds), KMRL_PREDICT_SECONDS="3600")
+    env.pop("KMRL_BUS_SOCKET", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    import http.client
+
+    # Ready once the startup prediction run is done: it rewrites next maintenance dates, which
+    # changes what the induction plan has to schedule, and would compete with the measurements
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/api/maintenance/predictions")
+            response = conn.getresponse()
+            if response.status == 200 and json.loads(response.read())["lastRun"] is not None:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def drive(client, method, path, trains, concurrency, requests, max_seconds):
+    # `concurrency` coroutines share the request budget; stops early after max_seconds
+    latencies = []
+    state = {"issued": 0, "errors": 0}
+    deadline = time.perf_counter() + max_seconds
+
+    async def worker():
+        while state["issued"] < requests and time.perf_counter() < deadline:
+            state["issued"] += 1
+            url = path.replace("{train}", str(random.randint(1, trains)))
+            started = time.perf_counter()
+            response = await client.request(method, url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                state["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, state["errors"], time.perf_counter() - started
+
+
+async def run_read_endpoints(client, mode, args, results):
+    for method, path in READ_ENDPOINTS:
+        # Warm caches and the materialized plan so the first request's build is not in the percentiles
+        await drive(client, method, path, args.read_trains, 1, 3, args.max_seconds)
+        latencies, errors, elapsed = await drive(
+            client, method, path, args.read_trains, args.concurrency, args.requests, args.max_seconds)
+        name = f"read.{mode}.{method} {path.split('?')[0]}"
+        if "?" in path and method == "GET":
+            name += "?filtered"
+        results[name] = summarize(latencies, len(latencies), elapsed, "req/s", errors=errors)
+        report(name, results[name])
+
+
+def bench_read(args, workdir, results):
+    import httpx
+
+    path = os.environ["KMRL_DB_PATH"]
+    prepare_database(path, args.read_trains)
+
+    # In-process: the app's routes, middleware and handlers without sockets. Startup hooks are
+    # not run, so no sensor generator or prediction job competes with the requests.
+    cwd = os.getcwd()
+    os.chdir(BACKEND)
+    try:
+        import server
+    finally:
+        os.chdir(cwd)
+    server.dashboard.load()
+
+    async def in_process():
+        # What the startup hook would have done first; see start_server
+        await server.run_predictions()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await run_read_endpoints(client, "inprocess", args, results)
+        await asyncio.to_thread(server.repo.close)
+
+    asyncio.run(in_process())
+
+    # Loopback: the same requests through uvicorn's HTTP stack in its own process
+    port = free_port()
+    server = start_server(path, port, 3600)
+
+    async def loopback():
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await run_read_endpoints(client, "loopback", args, results)
+
+    try:
+        asyncio.run(loopback())
+    finally:
+        stop_server(server)
+
+
+def bench_ingestion(args, workdir, results):
+    from anomaly_detector import StreamingAnomalyDetector
+    from dashboard import DashboardAggregate
+    from database import KMRLDatabase
+    from fleet_store import FleetStore, TrainRecord
+    from ingestion import SensorIngestionPipeline
+    from sensor_simulator import FleetSensorSimulator
+
+    for size in args.ingest_fleets:
+        trains, _ = synthetic_fleet(size, 30)
+        database = KMRLDatabase(os.path.join(workdir, f"ingest-{size}.db"))
+        fleet = FleetStore()
+        for row in trains:
+            fleet.add(TrainRecord(*row))
+        dashboard = DashboardAggregate(fleet, database)
+        dashboard.load()
+        detector = StreamingAnomalyDetector()
+        flushes = []
+
+        # Same work per batch as server.persist_sensor_batch
+        def persist(readings):
+            started = time.perf_counter()
+            database.add_sensor_data_batch(readings)
+            dashboard.record_readings(readings)
+            alerts = detector.process(readings)
+            if alerts:
+                database.add_alerts(alerts)
+            flushes.append(time.perf_counter() - started)
+
+        simulator = FleetSensorSimulator([(t[0], t[2], t[5]) for t in trains], seed=5)
+        pipeline = SensorIngestionPipeline(persist, capacity=50000, batch_size=1000, flush_interval=1.0)
+        pipeline.start()
+        now = datetime.now()
+        started = time.perf_counter()
+        for tick in range(args.ticks):
+            values, anomalies = simulator.step()
+            pipeline.put_many(simulator.to_readings(values, anomalies, now + timedelta(seconds=5 * tick)))
+        pipeline.close()
+        elapsed = time.perf_counter() - started
+        stats = pipeline.stats()
+        database.close()
+        name = f"ingestion.{size}_trains"
+        results[name] = summarize(flushes, stats["flushed"], elapsed, "readings/s", dropped=stats["dropped"])
+        report(name, results[name])
+
+
+async def ws_in_process(args):
+    from broadcast import BroadcastHub
+    from sensor_simulator import FleetSensorSimulator
+
+    hub = BroadcastHub()
+    sockets = [SimulatedSocket(0) for _ in range(args.clients)]
+    for websocket in sockets:
+        hub.connect(websocket)
+    simulator = FleetSensorSimulator([(i, "Metro-A1", i % 3 + 1) for i in range(1, args.ws_trains + 1)], seed=5)
+    updates = [simulator.to_updates(simulator.step()[0], datetime.now()) for _ in range(8)]
+    started = time.perf_counter()
+    for tick in range(args.ws_ticks):
+        # Frames are stamped with perf_counter() so SimulatedSocket can time delivery
+        hub.publish_updates("sensor_batch", time.perf_counter(), updates[tick % len(updates)])
+        while hub.stats()["queued"]:
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    for client in list(hub.clients):
+        hub.disconnect(client)
+    await asyncio.sleep(0)
+    latencies = [latency for websocket in sockets for latency in websocket.latencies]
+    return summarize(latencies, len(latencies), elapsed, "frames/s", dropped=hub.dropped)
+
+
+async def ws_loopback(url, args):
+    import websockets
+
+    latencies = []
+    frames = {"count": 0}
+    stop = asyncio.Event()
+
+    async def listen():
+        async with websockets.connect(url, max_size=None) as websocket:
+            while not stop.is_set():
+                try:
+                    text = await asyncio.wait_for(websocket.recv(), 0.5)
+                except asyncio.TimeoutError:
+                    continue
+                message = json.loads(text)
+                if message.get("type") != "sensor_batch" or stop.is_set():
+                    continue
+                # Server and client share the wall clock, so this is end-to-end delivery time
+                latencies.append((datetime.now() - datetime.fromisoformat(message["timestamp"])).total_seconds())
+                frames["count"] += 1
+
+    tasks = [asyncio.create_task(listen()) for _ in range(args.clients)]
+    await asyncio.sleep(args.settle)
+    latencies.clear()
+    frames["count"] = 0
+    started = time.perf_counter()
+    await asyncio.sleep(args.ws_seconds)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return summarize(latencies, frames["count"], elapsed, "frames/s")
+
+
+def bench_websocket(args, workdir, results):
+    name = f"websocket.inprocess.{args.clients}_clients"
+    results[name] = asyncio.run(ws_in_process(args))
+    report(name, results[name])
+
+    path = os.path.join(workdir, "ws.db")
+    prepare_database(path, args.ws_trains)
+    port = free_port()
+    server = start_server(path, port, args.ws_tick)
+    try:
+        name = f"websocket.loopback.{args.clients}_clients"
+        results[name] = asyncio.run(ws_loopback(f"ws://127.0.0.1:{port}/ws", args))
+        report(name, results[name])
+    finally:
+        stop_server(server)
+
+
+def bench_induction(args, workdir, results):
+    from induction_optimizer import InductionOptimizer
+
+    for size in args.plan_fleets:
+        trains, depots = synthetic_fleet(size, 30)
+        optimizer = InductionOptimizer(horizon_days=30)
+        latencies = []
+        deadline = time.perf_counter() + args.max_seconds
+        started = time.perf_counter()
+        while len(latencies) < args.plan_repeats and (not latencies or time.perf_counter() < deadline):
+            run_started = time.perf_counter()
+            optimizer.optimize(trains, depots)
+            latencies.append(time.perf_counter() - run_started)
+        name = f"induction.{size}_trains"
+        results[name] = summarize(latencies, len(latencies), time.perf_counter() - started, "plans/s")
+        report(name, results[name])
+
+
+RUNNERS = {"read": bench_read, "ingestion": bench_ingestion, "websocket": bench_websocket, "induction": bench_induction}
+
+
+def report(name, result):
+    print(f"{name:<58}{result['count']:>7}{result['throughput']:>12.1f} {result['unit']:<11}"
+          f"{result['p50']:>9.2f}{result['p95']:>9.2f}{result['p99']:>9.2f}", flush=True)
+
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, threshold, metrics, min_delta_ms):
+    # Returns the regressed (name, metric, baseline value, value) tuples
+    if baseline.get("environment", {}) != environment():
+        print(f"warning: baseline was recorded on {baseline.get('environment')}, this run is {environment()}")
+    regressions = []
+    print(f"\n{'result':<58}{'metric':>11}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<58}{'(new)':>11}")
+            continue
+        for metric in metrics:
+            old, new = base[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            if metric == "throughput":
+                regressed = change < -threshold
+            else:
+                regressed = change > threshold and new - old >= min_delta_ms
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<58}{metric:>11}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{flag}")
+            if regressed:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--quick", action="store_true", help="smaller fleets and fewer requests, for a fast check")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent requests for the read scenario")
+    parser.add_argument("--requests", type=int, default=400, help="requests per read endpoint")
+    parser.add_argument("--read-trains", type=int, default=1000, help="trains in the database behind the read scenario")
+    parser.add_argument("--ingest-fleets", type=int, nargs="+", default=[20, 1000, 10000])
+    parser.add_argument("--ticks", type=int, default=20, help="sensor ticks per ingestion fleet")
+    parser.add_argument("--clients", type=int, default=200, help="WebSocket clients")
+    parser.add_argument("--ws-trains", type=int, default=20, help="trains per sensor_batch frame")
+    parser.add_argument("--ws-ticks", type=int, default=200, help="frames per client in the in-process fan-out")
+    parser.add_argument("--ws-tick", type=float, default=0.25, help="server sensor tick in seconds for the loopback fan-out")
+    parser.add_argument("--ws-seconds", type=float, default=10.0, help="loopback fan-out measurement window")
+    parser.add_argument("--plan-fleets", type=int, nargs="+", default=[20, 1000, 10000])
+    parser.add_argument("--plan-repeats", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=20.0, help="time cap per read endpoint or plan size")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds WebSocket clients stay connected before measuring")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--baseline", help="compare against this JSON baseline; exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative change, 0.25 = 25%%")
+    parser.add_argument("--metrics", nargs="+", choices=METRICS, default=["throughput", "p95"])
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="latency changes smaller than this never regress")
+    args = parser.parse_args()
+    if args.quick:
+        args.requests = min(args.requests, 100)
+        args.ingest_fleets = [size for size in args.ingest_fleets if size <= 1000]
+        args.plan_fleets = [size for size in args.plan_fleets if size <= 1000]
+        args.ticks = min(args.ticks, 5)
+        args.clients = min(args.clients, 50)
+        args.ws_ticks = min(args.ws_ticks, 50)
+        args.ws_seconds = min(args.ws_seconds, 3.0)
+        args.plan_repeats = min(args.plan_repeats, 3)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="kmrl-suite-")
+    # Before anything imports database.py, whose module-level connection opens KMRL_DB_PATH
+    os.environ["KMRL_DB_PATH"] = os.path.join(workdir, "read.db")
+    print(f"{'result':<58}{'count':>7}{'throughput':>24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    try:
+        for scenario in SCENARIOS:
+            if scenario in args.scenarios:
+                RUNNERS[scenario](args, workdir, results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        settings = {key: value for key, value in vars(args).items() if key not in ("save", "baseline")}
+        with open(args.save, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"), "environment": environment(),
+                       "settings": settings, "results": results}, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.metrics, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\nNo regressions past {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Hold many /ws clients open and measure broadcast fan-out.
+
+By default the BroadcastHub is driven in-process with simulated sockets, a
+share of which are deliberately slow and a share of which subscribe to a
+single train. With --url the script instead opens real
+WebSocket connections to a running backend (requires the ``websockets``
+package) and reports frame delivery and end-to-end latency.
+
+Usage:
+    python benchmarks/ws_load_test.py [--clients 1000] [--ticks 20]
+    python benchmarks/ws_load_test.py --url ws://127.0.0.1:8001/ws --clients 1000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broadcast import BroadcastHub
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class SimulatedSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = 0
+        self.latencies = []
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        # The in-process run stamps frames with perf_counter() instead of wall time
+        self.latencies.append(time.perf_counter() - json.loads(text)["timestamp"])
+        self.received += 1
+
+    async def close(self):
+        pass
+
+
+def sensor_updates(trains):
+    return [
+        {
+            "train_id": train_id,
+            "depot_id": train_id % 3 + 1,
+            "data": {
+                "temperature": 70 + random.uniform(-10, 25),
+                "vibration": 1 + random.uniform(0, 4),
+                "pressure": 7 + random.uniform(-1, 3),
+            },
+        }
+        for train_id in range(1, trains + 1)
+    ]
+
+
+async def run_in_process(args):
+    hub = BroadcastHub(queue_size=args.queue_size, slow_client_policy=args.policy)
+    sockets = []
+    for i in range(args.clients):
+        delay = args.slow_delay if i < args.clients * args.slow_fraction else 0
+        sockets.append(SimulatedSocket(delay))
+        client = hub.connect(sockets[-1])
+        if random.random() < args.subscribe_fraction:
+            hub.subscribe(client, trains=[random.randint(1, args.trains)], sensors=["temperature"])
+
+    broadcast_times = []
+    for _ in range(args.ticks):
+        start = time.perf_counter()
+        hub.publish_updates("sensor_batch", time.perf_counter(), sensor_updates(args.trains))
+        broadcast_times.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(args.slow_delay * 2)
+
+    fast = [s for s in sockets if not s.delay]
+    latencies = [lat * 1000 for s in fast for lat in s.latencies]
+    stats = hub.stats()
+    print(f"clients={args.clients} slow={len(sockets) - len(fast)} subscribed={len(sockets) - stats['wildcard_clients']} "
+          f"ticks={args.ticks} trains/tick={args.trains}")
+    print(f"publish call   p50={percentile(broadcast_times, 50):.2f} ms  p99={percentile(broadcast_times, 99):.2f} ms")
+    print(f"fast client lag  p50={percentile(latencies, 50):.2f} ms  p99={percentile(latencies, 99):.2f} ms")
+    print(f"fast clients received {sum(s.received for s in fast)}/{len(fast) * args.ticks} frames")
+    print(f"hub: sent={stats['sent']} dropped={stats['dropped']} disconnected={stats['disconnected']} still connected={stats['clients']}")
+
+
+async def run_against_server(args):
+    import websockets
+
+    received = [0] * args.clients
+    latencies = []
+
+    async def client(index):
+        async with websockets.connect(args.url, max_queue=None) as ws:
+            deadline = time.monotonic() + args.duration
+            while time.monotonic() < deadline:
+                try:
+                    text = await asyncio.wait_for(ws.recv(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                frame = json.loads(text)
+                received[index] += 1
+                if "timestamp" in frame:
+                    sent = datetime.fromisoformat(frame["timestamp"])
+                    latencies.append((datetime.now() - sent).total_seconds() * 1000)
+
+    results = await asyncio.gather(*(client(i) for i in range(args.clients)), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f"clients={args.clients} failed={len(failures)} duration={args.duration}s")
+    print(f"frames per client min={min(received)} max={max(received)}")
+    print(f"delivery lag p50={percentile(latencies, 50):.2f} ms  p99={percentile(latencies, 99):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--url", help="run against a live server instead of in-process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to stay connected with --url")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between in-process broadcasts")
+    parser.add_argument("--trains", type=int, default=20)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--policy", choices=["drop_oldest", "disconnect"], default="drop_oldest")
+    parser.add_argument("--subscribe-fraction", type=float, default=0.5,
+                        help="share of in-process clients watching a single train")
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    asyncio.run(run_against_server(args) if args.url else run_in_process(args))
+
+
+if __name__ == "__main__":
+    main()
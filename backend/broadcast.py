@@ -0,0 +1,241 @@
+import asyncio
+import json
+import time
+
+
+class BroadcastClient:
+    def __init__(self, hub, websocket, queue_size):
+        self.hub = hub
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.closed = False
+        self.task = None
+        # None means "not filtered on this dimension"
+        self.trains = None
+        self.depots = None
+        self.sensors = None
+
+    def subscriptions(self):
+        return {
+            "trains": sorted(self.trains) if self.trains is not None else "*",
+            "depots": sorted(self.depots) if self.depots is not None else "*",
+            "sensors": sorted(self.sensors) if self.sensors is not None else "*",
+        }
+
+    def enqueue(self, text):
+        if self.closed:
+            return
+        if self.queue.full():
+            if self.hub.slow_client_policy == "disconnect":
+                self.hub.disconnect(self)
+                return
+            # drop_oldest: a slow dashboard skips stale frames rather than lagging behind
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.hub.dropped += 1
+        self.queue.put_nowait(text)
+
+    async def run(self):
+        observe = self.hub.observe_send
+        try:
+            while True:
+                text = await self.queue.get()
+                started = time.perf_counter()
+                await self.websocket.send_text(text)
+                self.hub.sent += 1
+                if observe is not None:
+                    observe(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.hub.disconnect(self)
+
+
+class BroadcastHub:
+    """Fans messages out to WebSocket clients through bounded per-client queues.
+
+    Each message is serialized once; every client has its own sender task, so a
+    slow connection only fills its own queue instead of stalling the caller.
+    When a queue is full the client either loses its oldest frame
+    (``"drop_oldest"``) or is disconnected (``"disconnect"``).
+
+    Clients may narrow what they receive by train id and/or depot (a reading
+    matches if either matches) and by sensor type (fields outside the set are
+    left out). Train and depot subscriptions are kept in topic indexes, so
+    routing a train's update only touches the clients interested in it.
+
+    ``observe_send``, if given, is called with the seconds each frame took to
+    write to its socket.
+    """
+
+    def __init__(self, queue_size=32, slow_client_policy="drop_oldest", observe_send=None):
+        if slow_client_policy not in ("drop_oldest", "disconnect"):
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
+        self.queue_size = queue_size
+        self.slow_client_policy = slow_client_policy
+        self.observe_send = observe_send
+        self.clients = set()
+        # Topic indexes: clients watching every train, or specific trains/depots
+        self.wildcard = set()
+        self.by_train = {}
+        self.by_depot = {}
+        self.sent = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def __len__(self):
+        return len(self.clients)
+
+    def connect(self, websocket):
+        client = BroadcastClient(self, websocket, self.queue_size)
+        client.task = asyncio.create_task(client.run())
+        self.clients.add(client)
+        self.wildcard.add(client)
+        return client
+
+    def _unindex(self, client):
+        self.wildcard.discard(client)
+        for index, keys in ((self.by_train, client.trains), (self.by_depot, client.depots)):
+            for key in keys or ():
+                watchers = index.get(key)
+                if watchers is not None:
+                    watchers.discard(client)
+                    if not watchers:
+                        del index[key]
+
+    def _index(self, client):
+        if client.trains is None and client.depots is None:
+            self.wildcard.add(client)
+            return
+        for index, keys in ((self.by_train, client.trains), (self.by_depot, client.depots)):
+            for key in keys or ():
+                index.setdefault(key, set()).add(client)
+
+    def subscribe(self, client, trains=None, depots=None, sensors=None):
+        # Adds to the client's subscriptions; the first train or depot narrows a
+        # client that was receiving everything
+        self._unindex(client)
+        if trains is not None:
+            client.trains = (client.trains or set()) | set(trains)
+        if depots is not None:
+            client.depots = (client.depots or set()) | set(depots)
+        if sensors is not None:
+            client.sensors = (client.sensors or set()) | set(sensors)
+        self._index(client)
+
+    def unsubscribe(self, client, trains=None, depots=None, sensors=None):
+        # Without arguments, resets the client to receiving everything. Removing the last
+        # topic leaves an empty set, which matches nothing, rather than going back to "*".
+        self._unindex(client)
+        if trains is None and depots is None and sensors is None:
+            client.trains = client.depots = client.sensors = None
+        if trains is not None and client.trains is not None:
+            client.trains = client.trains - set(trains)
+        if depots is not None and client.depots is not None:
+            client.depots = client.depots - set(depots)
+        if sensors is not None and client.sensors is not None:
+            client.sensors = client.sensors - set(sensors)
+        self._index(client)
+
+    def disconnect(self, client, close=True):
+        if client.closed:
+            return
+        client.closed = True
+        self.clients.discard(client)
+        self._unindex(client)
+        self.disconnected += 1
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+        if close:
+            asyncio.ensure_future(self._close(client.websocket))
+
+    async def _close(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def broadcast(self, message):
+        if not self.clients:
+            return 0
+        text = message if isinstance(message, str) else json.dumps(message)
+        for client in list(self.clients):
+            client.enqueue(text)
+        return len(self.clients)
+
+    def handle_message(self, client, text):
+        # {"action": "subscribe" | "unsubscribe", "trains": [...], "depots": [...], "sensors": [...]}
+        try:
+            request = json.loads(text)
+            action = request.get("action")
+            topics = {
+                "trains": [int(t) for t in request["trains"]] if "trains" in request else None,
+                "depots": [int(d) for d in request["depots"]] if "depots" in request else None,
+                "sensors": [str(s) for s in request["sensors"]] if "sensors" in request else None,
+            }
+        except (ValueError, TypeError, AttributeError):
+            client.enqueue(json.dumps({"type": "error", "message": "Invalid subscription message"}))
+            return
+        if action == "subscribe":
+            self.subscribe(client, **topics)
+        elif action == "unsubscribe":
+            self.unsubscribe(client, **topics)
+        elif action != "list":
+            client.enqueue(json.dumps({"type": "error", "message": f"Unknown action: {action}"}))
+            return
+        client.enqueue(json.dumps({"type": "subscriptions", "data": client.subscriptions()}))
+
+    def publish_updates(self, message_type, timestamp, updates):
+        # updates: dicts with train_id, depot_id and a data dict of sensor readings.
+        # Each client gets one frame with just the updates and sensors it asked for;
+        # clients with identical interests share the same serialized frame.
+        if not self.clients:
+            return 0
+        interested = {}
+        for position, update in enumerate(updates):
+            recipients = self.wildcard
+            by_train = self.by_train.get(update["train_id"])
+            by_depot = self.by_depot.get(update.get("depot_id"))
+            if by_train or by_depot:
+                recipients = recipients | (by_train or set()) | (by_depot or set())
+            for client in recipients:
+                interested.setdefault(client, []).append(position)
+
+        fragments = {}
+        frames = {}
+        prefix = json.dumps({"type": message_type, "timestamp": timestamp})[:-1] + ', "updates": ['
+        for client, positions in interested.items():
+            sensors = frozenset(client.sensors) if client.sensors is not None else None
+            key = (tuple(positions), sensors)
+            frame = frames.get(key)
+            if frame is None:
+                parts = []
+                for position in positions:
+                    fragment = fragments.get((position, sensors))
+                    if fragment is None:
+                        fragment = json.dumps(self._project(updates[position], sensors))
+                        fragments[(position, sensors)] = fragment
+                    parts.append(fragment)
+                frame = frames[key] = prefix + ", ".join(parts) + "]}"
+            client.enqueue(frame)
+        return len(interested)
+
+    def _project(self, update, sensors):
+        if sensors is None:
+            return update
+        data = {name: value for name, value in update["data"].items() if name in sensors or name == "timestamp"}
+        return dict(update, data=data)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "wildcard_clients": len(self.wildcard),
+            "train_topics": len(self.by_train),
+            "depot_topics": len(self.by_depot),
+            "queued": sum(client.queue.qsize() for client in self.clients),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "slow_client_policy": self.slow_client_policy,
+        }
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import itertools
+from contextlib import contextmanager
+
+# Pragmas applied to every pooled connection. WAL lets readers run while the
+# writer commits, and synchronous=NORMAL only fsyncs at checkpoints in WAL mode.
+# auto_vacuum only takes effect on a new file, before WAL mode and the first
+# table; it lets retention hand freed pages back with incremental_vacuum.
+DEFAULT_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # ~16 MB page cache per connection
+    "mmap_size": 268435456,
+    "busy_timeout": 5000,
+}
+
+_memory_ids = itertools.count(1)
+
+
+class ConnectionPool:
+    """Per-thread reusable SQLite connections with tuned pragmas.
+
+    Each thread gets one long-lived connection the first time it asks for one,
+    so repeated calls skip connect/pragma setup and reuse the connection's
+    prepared-statement cache (keyed by SQL text).
+    """
+
+    def __init__(self, db_path, pragmas=None, cached_statements=256):
+        self.uri = False
+        self._keeper = None
+        if db_path == ":memory:":
+            # A plain :memory: database is private to one connection, so give
+            # every thread the same shared-cache in-memory database instead.
+            db_path = f"file:kmrl_mem_{next(_memory_ids)}?mode=memory&cache=shared"
+            self.uri = True
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        if self.uri:
+            self._keeper = self._connect()
+
+    def _connect(self, pragmas=None):
+        conn = sqlite3.connect(
+            self.db_path,
+            uri=self.uri,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for name, value in dict(self.pragmas, **(pragmas or {})).items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        yield self.get()
+
+    @contextmanager
+    def transaction(self):
+        # Commits on success and rolls back on error; the connection stays open.
+        conn = self.get()
+        with conn:
+            yield conn
+
+    @contextmanager
+    def dedicated(self, pragmas=None):
+        # A private connection outside the per-thread pool, for long reads such as
+        # streaming exports whose cursor is advanced from different threads
+        conn = self._connect(pragmas)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+        self._local = threading.local()
+        self._keeper = None
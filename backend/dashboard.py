@@ -0,0 +1,200 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from response_cache import dump_json
+
+ANOMALY_BUCKET = 3600  # seconds; matches the coarsest sensor rollup
+
+
+class DashboardAggregate:
+    """Fleet, depot and anomaly figures for the dashboard, kept current in O(1).
+
+    ``load()`` builds everything once: fleet status and depot counts in a
+    single pass over the fleet, and anomaly counts per train and hour from one
+    GROUP BY over the hourly sensor rollups. After that ``on_train_changed``
+    (a FleetStore listener) moves one train between its old and new status and
+    depot counters, and ``record_readings`` (called with each persisted sensor
+    batch) adds that batch's anomalies to the current hour. Hours older than
+    ``window_hours`` fall out of the anomaly totals. ``snapshot()`` and
+    ``body()`` reuse the last result until something changes; ``version`` lets
+    a pusher tell when there is something new to send.
+    """
+
+    def __init__(self, fleet, history, window_hours=24, recent_size=10):
+        self.fleet = fleet
+        self.history = history
+        self.window_hours = window_hours
+        self._lock = threading.RLock()
+        self.status_counts = {}
+        self.depot_counts = {}
+        self.train_state = {}  # train_id -> (status, depot_id)
+        self.depots = []
+        self.anomalies = {}  # hour bucket -> {train_id: count}
+        self.recent = deque(maxlen=recent_size)
+        self.version = 0
+        self.loaded = False
+        self._snapshot = None
+        self._body = None
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+        self._body = None
+
+    def load(self):
+        with self._lock:
+            self.status_counts, self.depot_counts, self.train_state = {}, {}, {}
+            for train in self.fleet.get_trains():
+                self._count(train[0], train[3], train[5], 1)
+            self.depots = self.history.get_depots()
+            since = datetime.now() - timedelta(hours=self.window_hours)
+            self.anomalies = {}
+            for train_id, bucket, count in self.history.anomaly_counts(since):
+                self.anomalies.setdefault(bucket, {})[train_id] = count
+            self.recent.clear()
+            for row in reversed(self.history.recent_anomalies(self.recent.maxlen)):
+                self.recent.append(self._reading_dict(row[0], *row[1:]))
+            self.loaded = True
+            self._changed()
+
+    def _count(self, train_id, status, depot_id, delta):
+        self.status_counts[status] = self.status_counts.get(status, 0) + delta
+        self.depot_counts[depot_id] = self.depot_counts.get(depot_id, 0) + delta
+        if delta > 0:
+            self.train_state[train_id] = (status, depot_id)
+        else:
+            self.train_state.pop(train_id, None)
+
+    def on_train_changed(self, train_id):
+        with self._lock:
+            if not self.loaded:
+                return
+            previous = self.train_state.get(train_id)
+            record = self.fleet.get_train(train_id)
+            current = (record.status, record.depot_id) if record is not None else None
+            if previous == current:
+                return
+            if previous is not None:
+                self._count(train_id, previous[0], previous[1], -1)
+            if current is not None:
+                self._count(train_id, current[0], current[1], 1)
+            self._changed()
+
+    @staticmethod
+    def _reading_dict(reading_id, train_id, sensor_type, value, unit, timestamp, is_anomaly):
+        timestamp = timestamp if isinstance(timestamp, str) else timestamp.isoformat()
+        return {
+            "id": reading_id if reading_id is not None else f"{train_id}-{sensor_type}-{timestamp}",
+            "train_id": train_id,
+            "value": value,
+            "sensor_type": sensor_type,
+            "unit": unit,
+            "timestamp": timestamp,
+            "is_anomaly": bool(is_anomaly),
+        }
+
+    def record_readings(self, readings):
+        # readings: (train_id, sensor_type, value, unit, timestamp, is_anomaly) tuples
+        flagged = [r for r in readings if r[5]]
+        if not flagged:
+            return
+        with self._lock:
+            if not self.loaded:
+                return
+            for reading in flagged:
+                bucket = int(reading[4].timestamp() // ANOMALY_BUCKET) * ANOMALY_BUCKET
+                counts = self.anomalies.setdefault(bucket, {})
+                counts[reading[0]] = counts.get(reading[0], 0) + 1
+                self.recent.append(self._reading_dict(None, *reading))
+            self._changed()
+
+    def _expire(self):
+        oldest = int((datetime.now() - timedelta(hours=self.window_hours)).timestamp() // ANOMALY_BUCKET) * ANOMALY_BUCKET
+        stale = [bucket for bucket in self.anomalies if bucket < oldest]
+        for bucket in stale:
+            del self.anomalies[bucket]
+        if stale:
+            self._changed()
+
+    def snapshot(self):
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            self._expire()
+            if self._snapshot is None:
+                self._snapshot = self._build()
+            return self._snapshot
+
+    def body(self):
+        # {"success": True, "data": snapshot} as JSON bytes, encoded once per version
+        with self._lock:
+            snapshot = self.snapshot()
+            if self._body is None:
+                self._body = dump_json({"success": True, "data": snapshot})
+            return self._body
+
+    def _build(self):
+        total = sum(self.status_counts.values())
+        available = self.status_counts.get("Available", 0)
+        per_train = {}
+        for counts in self.anomalies.values():
+            for train_id, count in counts.items():
+                per_train[train_id] = per_train.get(train_id, 0) + count
+        depot_utilization = []
+        for depot_id, name, capacity, _, _ in self.depots:
+            stabled = self.depot_counts.get(depot_id, 0)
+            depot_utilization.append({
+                "id": depot_id,
+                "name": name,
+                "capacity": capacity,
+                "trains": stabled,
+                "utilization": round(stabled * 100 / capacity) if capacity else 0,
+                "available_slots": max(0, capacity - stabled),
+            })
+        return {
+            "fleet_metrics": {
+                "total_trains": total,
+                "available_trains": available,
+                "maintenance_due": self.status_counts.get("Maintenance", 0),
+                "in_service": self.status_counts.get("In Service", 0),
+                "availability_percentage": (available * 100 / total) if total > 0 else 0,
+            },
+            "anomaly_metrics": {
+                "total_anomalies": sum(per_train.values()),
+                "trains_with_anomalies": sum(1 for count in per_train.values() if count),
+                "window_hours": self.window_hours,
+            },
+            "depot_utilization": depot_utilization,
+            "recent_sensor_data": list(reversed(self.recent)),
+            "version": self.version,
+            "updated_at": datetime.now().isoformat(),
+        }
+
+
+class DashboardMirror:
+    """A worker's copy of a dashboard maintained by another process.
+
+    Only the bus owner sees sensor batches, so it alone keeps a live
+    DashboardAggregate; the other workers ``adopt()`` each snapshot it
+    publishes and serve ``snapshot()`` and ``body()`` from that. ``version``
+    is None until the first snapshot arrives.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._snapshot = None
+        self._body = None
+
+    def adopt(self, snapshot):
+        self._snapshot = snapshot
+        self._body = None
+        self.version = snapshot["version"]
+
+    def snapshot(self):
+        return self._snapshot
+
+    def body(self):
+        if self._body is None:
+            self._body = dump_json({"success": True, "data": self._snapshot})
+        return self._body
@@ -1,18 +1,225 @@
-import sqlite3
-import json
+import functools
+import threading
+import os
+import time
 from datetime import datetime, timedelta
 import random
+from connection_pool import ConnectionPool
+from fleet_import import new_train_error
+from train_query import filter_sql, page_sql
+from timeseries import ROLLUP_RESOLUTIONS, UPSERT_ROLLUP, aggregate_readings, parse_time_range, pick_resolution, rollup_row_to_dict
+from analytics import (
+    BACKFILL_ACTIVITY_DAYS, BACKFILL_ACTIVITY_MONTHS, BACKFILL_MAINTENANCE_DAYS, BACKFILL_MAINTENANCE_MONTHS,
+    UPSERT_ACTIVITY_ROLLUP, UPSERT_MAINTENANCE_ROLLUP, activity_contributions, maintenance_contributions
+)
+
+# Statements kept as constants so every call hits the connection's statement cache
+SELECT_TRAINS = "SELECT * FROM trains"
+INSERT_SENSOR_DATA = '''
+    INSERT INTO sensor_data (train_id, sensor_type, value, unit, timestamp, is_anomaly)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+INSERT_TRAIN = '''
+    INSERT INTO trains (id, train_number, model, status, mileage, depot_id, health_score,
+                        last_maintenance, next_maintenance, manufacturer, year_manufactured)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# Series queries always bind train_id and sensor_type so both walk an index range
+SELECT_RAW_SENSOR_SERIES = '''
+    SELECT id, train_id, sensor_type, value, unit, timestamp, is_anomaly FROM sensor_data
+    WHERE train_id = ? AND sensor_type = ? AND timestamp >= ?
+    ORDER BY timestamp
+'''
+SELECT_ROLLUP_SERIES = '''
+    SELECT resolution, train_id, sensor_type, bucket_start, unit, count, sum, min, max, anomalies FROM sensor_rollups
+    WHERE resolution = ? AND train_id = ? AND sensor_type = ? AND bucket_start >= ?
+    ORDER BY bucket_start
+'''
+SELECT_SENSOR_TYPES = "SELECT DISTINCT sensor_type FROM sensor_rollups WHERE resolution = ? AND train_id = ?"
+# Retention: train-days with raw readings not yet archived, the activity rollups counting every reading
+SELECT_ARCHIVE_CANDIDATES = '''
+    SELECT a.bucket, a.train_id FROM sensor_activity_rollups a
+    LEFT JOIN (
+        SELECT day, train_id, SUM(readings) AS archived FROM sensor_archive_segments WHERE day < ? GROUP BY day, train_id
+    ) s ON s.day = a.bucket AND s.train_id = a.train_id
+    WHERE a.period = 'day' AND a.bucket < ? AND a.readings > COALESCE(s.archived, 0)
+    ORDER BY a.bucket, a.train_id
+'''
+SELECT_DAY_SENSOR_TYPES = '''
+    SELECT DISTINCT sensor_type FROM sensor_rollups
+    WHERE resolution = ? AND train_id = ? AND bucket_start >= ? AND bucket_start < ?
+'''
+SELECT_RAW_SENSOR_DAY = '''
+    SELECT id, train_id, sensor_type, value, unit, timestamp, is_anomaly FROM sensor_data
+    WHERE train_id = ? AND sensor_type = ? AND timestamp >= ? AND timestamp < ?
+'''
+# Rows inserted after the day was read have higher ids and stay for the next run
+DELETE_RAW_SENSOR_DAY = '''
+    DELETE FROM sensor_data WHERE train_id = ? AND sensor_type = ? AND timestamp >= ? AND timestamp < ? AND id <= ?
+'''
+INSERT_ARCHIVE_SEGMENT = '''
+    INSERT INTO sensor_archive_segments (day, train_id, byte_offset, byte_length, readings, first_timestamp, last_timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+SELECT_ARCHIVE_END = "SELECT COALESCE(MAX(byte_offset + byte_length), 0) FROM sensor_archive_segments WHERE day = ?"
+SELECT_TRAIN_ARCHIVE_SEGMENTS = '''
+    SELECT day, byte_offset, byte_length FROM sensor_archive_segments
+    WHERE train_id = ? AND day >= ? AND day <= ? ORDER BY day, byte_offset
+'''
+SELECT_ARCHIVE_SEGMENTS = '''
+    SELECT day, byte_offset, byte_length FROM sensor_archive_segments
+    WHERE day >= ? AND day <= ? ORDER BY day, byte_offset
+'''
+DELETE_EXPIRED_ROLLUPS = '''
+    DELETE FROM sensor_rollups WHERE (resolution, train_id, sensor_type, bucket_start) IN (
+        SELECT resolution, train_id, sensor_type, bucket_start FROM sensor_rollups
+        WHERE resolution = ? AND bucket_start < ? LIMIT ?
+    )
+'''
+INSERT_ALERT = '''
+    INSERT INTO alerts (train_id, type, title, description, status, priority, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+ACKNOWLEDGE_ALERT = "UPDATE alerts SET status = 'acknowledged', acknowledged_at = ? WHERE id = ?"
+SELECT_DEPOTS = "SELECT id, name, capacity, current_occupancy, location FROM depots ORDER BY id"
+SELECT_ALERTS = "SELECT * FROM alerts ORDER BY created_at DESC"
+SELECT_ALERTS_BY_STATUS = "SELECT * FROM alerts WHERE status = ?"
+# Report aggregates; sensor figures come from the hourly rollups, never the raw table
+REPORT_SENSOR_SUMMARY = '''
+    SELECT train_id, sensor_type, unit, SUM(count), SUM(sum) / SUM(count), MIN(min), MAX(max), SUM(anomalies)
+    FROM sensor_rollups WHERE resolution = ? AND bucket_start >= ?
+    GROUP BY train_id, sensor_type ORDER BY train_id, sensor_type
+'''
+REPORT_MAINTENANCE_COSTS = '''
+    SELECT type, status, COUNT(*), COALESCE(SUM(cost), 0), AVG(actual_hours)
+    FROM maintenance_records WHERE scheduled_date >= ?
+    GROUP BY type, status ORDER BY type, status
+'''
+SELECT_ANOMALY_COUNTS = '''
+    SELECT train_id, bucket_start, SUM(anomalies) FROM sensor_rollups
+    WHERE resolution = ? AND bucket_start >= ?
+    GROUP BY train_id, bucket_start
+'''
+SELECT_RECENT_ANOMALIES = '''
+    SELECT id, train_id, sensor_type, value, unit, timestamp, is_anomaly FROM sensor_data
+    WHERE is_anomaly ORDER BY id DESC LIMIT ?
+'''
+INSERT_MAINTENANCE_RECORD = '''
+    INSERT INTO maintenance_records (train_id, type, status, scheduled_date, completed_date, estimated_hours,
+                                     actual_hours, priority, technician, cost, description)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+MAINTENANCE_FIELDS = (
+    "train_id", "type", "status", "scheduled_date", "completed_date", "estimated_hours",
+    "actual_hours", "priority", "technician", "cost", "description"
+)
+# Columns in the order analytics.maintenance_contributions expects
+SELECT_MAINTENANCE_MEASURES = '''
+    SELECT type, status, scheduled_date, completed_date, estimated_hours, actual_hours, cost
+    FROM maintenance_records WHERE id = ?
+'''
+SELECT_MAINTENANCE_RECORDS = f"SELECT id, {', '.join(MAINTENANCE_FIELDS)} FROM maintenance_records ORDER BY id DESC LIMIT ?"
+SELECT_MAINTENANCE_RECORDS_BY_STATUS = f"SELECT id, {', '.join(MAINTENANCE_FIELDS)} FROM maintenance_records WHERE status = ? ORDER BY id DESC LIMIT ?"
+DELETE_EMPTY_MAINTENANCE_ROLLUP = "DELETE FROM maintenance_rollups WHERE period = ? AND bucket = ? AND type = ? AND records = 0"
+# Analytics read straight off the rollup primary keys
+SELECT_MAINTENANCE_ROLLUPS = '''
+    SELECT bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours FROM maintenance_rollups
+    WHERE period = ? AND bucket BETWEEN ? AND ? ORDER BY bucket, type
+'''
+SELECT_ACTIVITY_ROLLUPS = '''
+    SELECT bucket, COUNT(*), SUM(readings), SUM(anomalies) FROM sensor_activity_rollups
+    WHERE period = ? AND bucket BETWEEN ? AND ? GROUP BY bucket
+'''
+# Per train and sensor over a window of hourly rollups: hours, readings, mean and mean square of the
+# hourly means, max, anomalies, and the sums for a least-squares trend (x = days since the window start)
+SELECT_SENSOR_WINDOW_STATS = '''
+    SELECT train_id, sensor_type, COUNT(*), SUM(count), AVG(sum / count), AVG((sum / count) * (sum / count)),
+           MAX(max), SUM(anomalies), SUM(x), SUM(x * x), SUM(x * sum / count)
+    FROM (SELECT *, (bucket_start - ?) / 86400.0 AS x FROM sensor_rollups WHERE resolution = ? AND bucket_start >= ?)
+    GROUP BY train_id, sensor_type
+'''
+# Bulk import upsert keyed on train_number; fields a record leaves out (NULL) keep their stored value
+UPSERT_TRAIN = '''
+    INSERT INTO trains (train_number, model, status, mileage, depot_id, health_score,
+                        last_maintenance, next_maintenance, manufacturer, year_manufactured)
+    VALUES (:train_number, :model, COALESCE(:status, 'Available'), COALESCE(:mileage, 0), :depot_id,
+            COALESCE(:health_score, 100), :last_maintenance, :next_maintenance, :manufacturer, :year_manufactured)
+    ON CONFLICT (train_number) DO UPDATE SET
+        model = COALESCE(excluded.model, model),
+        status = COALESCE(:status, status),
+        mileage = COALESCE(:mileage, mileage),
+        depot_id = COALESCE(excluded.depot_id, depot_id),
+        health_score = COALESCE(:health_score, health_score),
+        last_maintenance = COALESCE(excluded.last_maintenance, last_maintenance),
+        next_maintenance = COALESCE(excluded.next_maintenance, next_maintenance),
+        manufacturer = COALESCE(excluded.manufacturer, manufacturer),
+        year_manufactured = COALESCE(excluded.year_manufactured, year_manufactured)
+'''
+SELECT_TRAIN = "SELECT * FROM trains WHERE id = ?"
+DELETE_TRAIN = "DELETE FROM trains WHERE id = ?"
+SELECT_TRAIN_PREDICTIONS = '''
+    SELECT health_score, next_maintenance, rul_days, predicted_at, id FROM trains
+    WHERE predicted_at IS NOT NULL ORDER BY id
+'''
+UPDATE_TRAIN_PREDICTION = "UPDATE trains SET health_score = ?, next_maintenance = ?, rul_days = ?, predicted_at = ? WHERE id = ?"
+REPORT_ALERT_COUNTS = '''
+    SELECT train_id, COUNT(*), SUM(type = 'critical'), SUM(status = 'active')
+    FROM alerts WHERE created_at >= ? GROUP BY train_id ORDER BY train_id
+'''
+
+def timed(method):
+    # Reports how long each call took to KMRLDatabase.observe_query(name, seconds), when one is set
+    name = method.__name__
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        observe = self.observe_query
+        if observe is None:
+            return method(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            observe(name, time.perf_counter() - started)
+    return call
 
 class KMRLDatabase:
-    def __init__(self, db_path="kmrl.db"):
+    def __init__(self, db_path="kmrl.db", pragmas=None, initialize=True):
+        # initialize=False opens an existing database as is, e.g. from a job running in another process
         self.db_path = db_path
-        self.init_database()
-        self.populate_sample_data()
+        self.observe_query = None  # e.g. a latency histogram; see timed()
+        self.pool = ConnectionPool(db_path, pragmas=pragmas)
+        if initialize:
+            self.init_database()
+            self.populate_sample_data()
+    
+    def connection(self):
+        return self.pool.connection()
+    
+    def transaction(self):
+        return self.pool.transaction()
+    
+    def close(self):
+        self.pool.close_all()
     
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self.transaction() as conn:
+            # Take the write lock up front: workers starting together then migrate one at a time
+            conn.execute("BEGIN IMMEDIATE")
+            self._create_tables(conn.cursor())
+            has_sensor_data = conn.execute("SELECT 1 FROM sensor_data LIMIT 1").fetchone() is not None
+            needs_backfill = has_sensor_data and conn.execute("SELECT 1 FROM sensor_rollups LIMIT 1").fetchone() is None
+            needs_analytics = (
+                (has_sensor_data or conn.execute("SELECT 1 FROM maintenance_records LIMIT 1").fetchone() is not None)
+                and conn.execute("SELECT 1 FROM maintenance_rollups LIMIT 1").fetchone() is None
+                and conn.execute("SELECT 1 FROM sensor_activity_rollups LIMIT 1").fetchone() is None
+            )
+        if needs_backfill:
+            self.backfill_sensor_rollups()
+        if needs_analytics:
+            self.backfill_analytics_rollups()
+    
+    def _create_tables(self, cursor):
         # Trains table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS trains (
@@ -30,6 +237,17 @@ class KMRLDatabase:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Columns added after the first release; SELECT * keeps the original columns first
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(trains)")}
+        for column, kind in (("rul_days", "REAL"), ("predicted_at", "TIMESTAMP")):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE trains ADD COLUMN {column} {kind}")
+        # Indexes backing the filters and sort orders of get_trains
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trains_status ON trains (status COLLATE NOCASE)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trains_depot ON trains (depot_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trains_model ON trains (model)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trains_mileage ON trains (mileage, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trains_health ON trains (health_score, id)")
         
         # Maintenance records
         cursor.execute('''
@@ -64,6 +282,72 @@ class KMRLDatabase:
                 FOREIGN KEY (train_id) REFERENCES trains (id)
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sensor_data_train_type_ts
+            ON sensor_data (train_id, sensor_type, timestamp)
+        ''')
+        
+        # Sensor rollups (min/max/sum/count per 1 min, 15 min and 1 h bucket)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sensor_rollups (
+                resolution INTEGER,
+                train_id INTEGER,
+                sensor_type TEXT,
+                bucket_start INTEGER,
+                unit TEXT,
+                count INTEGER,
+                sum REAL,
+                min REAL,
+                max REAL,
+                anomalies INTEGER,
+                PRIMARY KEY (resolution, train_id, sensor_type, bucket_start)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Archived raw readings: one gzip member per train and day in the archive's day files, see retention.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sensor_archive_segments (
+                day TEXT,
+                train_id INTEGER,
+                byte_offset INTEGER,
+                byte_length INTEGER,
+                readings INTEGER,
+                first_timestamp TIMESTAMP,
+                last_timestamp TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (day, byte_offset)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sensor_archive_train_day
+            ON sensor_archive_segments (train_id, day)
+        ''')
+        
+        # Daily and monthly analytics rollups ("YYYY-MM-DD" / "YYYY-MM" buckets), see analytics.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_rollups (
+                period TEXT,
+                bucket TEXT,
+                type TEXT,
+                records INTEGER,
+                completed INTEGER,
+                on_time INTEGER,
+                cost REAL,
+                estimated_hours INTEGER,
+                actual_hours INTEGER,
+                PRIMARY KEY (period, bucket, type)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sensor_activity_rollups (
+                period TEXT,
+                bucket TEXT,
+                train_id INTEGER,
+                readings INTEGER,
+                anomalies INTEGER,
+                PRIMARY KEY (period, bucket, train_id)
+            ) WITHOUT ROWID
+        ''')
         
         # Alerts
         cursor.execute('''
@@ -92,20 +376,21 @@ class KMRLDatabase:
                 location TEXT
             )
         ''')
-        
-        conn.commit()
-        conn.close()
     
     def populate_sample_data(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Check if data already exists
-        cursor.execute("SELECT COUNT(*) FROM trains")
-        if cursor.fetchone()[0] > 0:
-            conn.close()
-            return
-        
+        with self.transaction() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # so only one of several starting workers sees an empty table
+            cursor = conn.cursor()
+            
+            # Check if data already exists
+            cursor.execute("SELECT COUNT(*) FROM trains")
+            if cursor.fetchone()[0] > 0:
+                return
+            
+            self._insert_sample_data(cursor)
+            self._rebuild_analytics_rollups(conn)
+    
+    def _insert_sample_data(self, cursor):
         # Insert depots
         depots = [
             (1, "Aluva Depot", 15, 12, "Aluva"),
@@ -128,47 +413,409 @@ class KMRLDatabase:
                 ["Alstom", "BEML", "Siemens"][i % 3],
                 2020 + (i % 4)
             )
-            cursor.execute("INSERT INTO trains VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", train_data)
+            cursor.execute(INSERT_TRAIN, train_data)
         
-        conn.commit()
-        conn.close()
+        # A year and a half of maintenance history, roughly one job per train a month
+        types = [("Preventive", 8, 60000), ("Corrective", 5, 90000), ("Inspection", 3, 15000), ("Emergency", 6, 150000)]
+        technicians = ["Ravi Kumar", "Suresh Nair", "Anil Menon", "Deepa Thomas"]
+        today = datetime.now().date()
+        records = []
+        for i in range(1, 21):
+            for month in range(18, -1, -1):
+                kind, hours, cost = types[random.choice((0, 0, 1, 1, 2, 3))]
+                scheduled = today - timedelta(days=month * 30 + random.randint(0, 29))
+                done = scheduled < today - timedelta(days=3)
+                completed = scheduled + timedelta(days=random.choice((0, 0, 0, 1, 2))) if done else None
+                records.append((
+                    i, kind, "Completed" if done else "Scheduled", scheduled, completed, hours,
+                    hours + random.randint(-2, 4) if done else None,
+                    ["High", "Medium", "Low"][random.randint(0, 2)], random.choice(technicians),
+                    round(cost * random.uniform(0.7, 1.4), 2) if done else None,
+                    f"{kind} maintenance"
+                ))
+        cursor.executemany(INSERT_MAINTENANCE_RECORD, records)
     
-    def get_trains(self, status=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if status:
-            cursor.execute("SELECT * FROM trains WHERE status = ?", (status,))
-        else:
-            cursor.execute("SELECT * FROM trains")
-        
-        trains = cursor.fetchall()
-        conn.close()
-        return trains
+    @timed
+    def get_trains(self, status=None, sort="id", limit=None, cursor=None, **filters):
+        # filters: depot_id, model, manufacturer, min_health, max_health, min_mileage, max_mileage
+        clauses, params = filter_sql(status=status, **filters)
+        sql, params = page_sql(clauses, params, sort, limit, cursor)
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
     
     def add_sensor_data(self, train_id, sensor_type, value, unit, is_anomaly=False):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO sensor_data (train_id, sensor_type, value, unit, timestamp, is_anomaly)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (train_id, sensor_type, value, unit, datetime.now(), is_anomaly))
-        
-        conn.commit()
-        conn.close()
+        self.add_sensor_data_batch([(train_id, sensor_type, value, unit, datetime.now(), is_anomaly)])
+    
+    @timed
+    def add_sensor_data_batch(self, readings):
+        # readings: (train_id, sensor_type, value, unit, timestamp, is_anomaly) tuples.
+        # Rollups are updated in the same transaction so they never drift from the raw rows.
+        with self.transaction() as conn:
+            conn.executemany(INSERT_SENSOR_DATA, readings)
+            conn.executemany(UPSERT_ROLLUP, aggregate_readings(readings))
+            conn.executemany(UPSERT_ACTIVITY_ROLLUP, activity_contributions(readings))
+    
+    @timed
+    def backfill_sensor_rollups(self, chunk_size=50000):
+        # Builds rollups for raw rows written before the rollup table existed
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM sensor_rollups")
+            cursor = conn.execute("SELECT train_id, sensor_type, value, unit, timestamp, is_anomaly FROM sensor_data")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                conn.executemany(UPSERT_ROLLUP, aggregate_readings(rows))
+    
+    @timed
+    def add_maintenance_records(self, records):
+        # records: tuples in MAINTENANCE_FIELDS order; returns the new ids
+        with self.transaction() as conn:
+            ids = [conn.execute(INSERT_MAINTENANCE_RECORD, record).lastrowid for record in records]
+            conn.executemany(UPSERT_MAINTENANCE_ROLLUP, maintenance_contributions(
+                (r[1], r[2], r[3], r[4], r[5], r[6], r[9]) for r in records
+            ))
+        return ids
+    
+    @timed
+    def update_maintenance_record(self, record_id, **changes):
+        # Retracts the record's old contribution to the rollups and applies the new one in the same transaction
+        changes = {name: value for name, value in changes.items() if name in MAINTENANCE_FIELDS}
+        with self.transaction() as conn:
+            old = conn.execute(SELECT_MAINTENANCE_MEASURES, (record_id,)).fetchone()
+            if old is None:
+                return False
+            if not changes:
+                return True
+            conn.execute(
+                f"UPDATE maintenance_records SET {', '.join(f'{name} = ?' for name in changes)} WHERE id = ?",
+                (*changes.values(), record_id)
+            )
+            new = conn.execute(SELECT_MAINTENANCE_MEASURES, (record_id,)).fetchone()
+            retracted = maintenance_contributions([old], sign=-1)
+            conn.executemany(UPSERT_MAINTENANCE_ROLLUP, retracted + maintenance_contributions([new]))
+            conn.executemany(DELETE_EMPTY_MAINTENANCE_ROLLUP, [row[:3] for row in retracted])
+        return True
+    
+    @timed
+    def get_maintenance_records(self, status=None, limit=100):
+        with self.connection() as conn:
+            if status:
+                return conn.execute(SELECT_MAINTENANCE_RECORDS_BY_STATUS, (status, limit)).fetchall()
+            return conn.execute(SELECT_MAINTENANCE_RECORDS, (limit,)).fetchall()
+    
+    @timed
+    def backfill_analytics_rollups(self, since=None):
+        # Rebuilds the daily and monthly analytics rollups from the source tables, for
+        # everything from the start of since's month (or all history when since is None)
+        with self.transaction() as conn:
+            self._rebuild_analytics_rollups(conn, since)
+    
+    def _rebuild_analytics_rollups(self, conn, since=None):
+        month = str(since)[:7] if since is not None else ""
+        day = month + "-01" if month else ""
+        # Archived days have no raw readings left to count, so their daily activity stays as it is
+        archived = conn.execute("SELECT MAX(day) FROM sensor_archive_segments").fetchone()[0]
+        activity_day = max(day, (datetime.fromisoformat(archived) + timedelta(days=1)).date().isoformat()) if archived else day
+        for table, first_day in (("maintenance_rollups", day), ("sensor_activity_rollups", activity_day)):
+            conn.execute(f"DELETE FROM {table} WHERE period = 'day' AND bucket >= ?", (first_day,))
+            conn.execute(f"DELETE FROM {table} WHERE period = 'month' AND bucket >= ?", (month,))
+        conn.execute(BACKFILL_MAINTENANCE_DAYS, (day,))
+        conn.execute(BACKFILL_ACTIVITY_DAYS, (activity_day,))
+        conn.execute(BACKFILL_MAINTENANCE_MONTHS, (day,))
+        conn.execute(BACKFILL_ACTIVITY_MONTHS, (day,))
+    
+    @timed
+    def maintenance_rollups(self, period, first, last):
+        # (bucket, type, records, completed, on_time, cost, estimated_hours, actual_hours)
+        with self.connection() as conn:
+            return conn.execute(SELECT_MAINTENANCE_ROLLUPS, (period, first, last)).fetchall()
+    
+    @timed
+    def activity_rollups(self, period, first, last):
+        # (bucket, trains reporting, readings, anomalies)
+        with self.connection() as conn:
+            return conn.execute(SELECT_ACTIVITY_ROLLUPS, (period, first, last)).fetchall()
     
+    @timed
+    def get_sensor_series(self, train_id, time_range="1h", sensor_type=None, max_points=1000):
+        range_seconds = parse_time_range(time_range)
+        resolution = pick_resolution(range_seconds, max_points)
+        since = datetime.now() - timedelta(seconds=range_seconds)
+        with self.connection() as conn:
+            if sensor_type:
+                sensor_types = [sensor_type]
+            else:
+                # The coarsest rollup is a small table, so listing types there is cheap
+                sensor_types = [row[0] for row in conn.execute(SELECT_SENSOR_TYPES, (ROLLUP_RESOLUTIONS[-1], train_id))]
+            
+            series = []
+            if resolution == 0:
+                for sensor in sensor_types:
+                    for row in conn.execute(SELECT_RAW_SENSOR_SERIES, (train_id, sensor, since)):
+                        series.append({
+                            "id": row[0],
+                            "train_id": row[1],
+                            "sensor_type": row[2],
+                            "value": row[3],
+                            "unit": row[4],
+                            "timestamp": datetime.fromisoformat(row[5]).isoformat(),
+                            "is_anomaly": bool(row[6])
+                        })
+                return resolution, series
+            
+            bucket_floor = int(since.timestamp() // resolution) * resolution
+            for sensor in sensor_types:
+                for row in conn.execute(SELECT_ROLLUP_SERIES, (resolution, train_id, sensor, bucket_floor)):
+                    series.append(rollup_row_to_dict(row))
+            return resolution, series
+    
+    @timed
+    def get_depots(self):
+        with self.connection() as conn:
+            return conn.execute(SELECT_DEPOTS).fetchall()
+    
+    @timed
+    def add_alerts(self, alerts):
+        # alerts: (train_id, type, title, description, status, priority, created_at) tuples
+        with self.transaction() as conn:
+            conn.executemany(INSERT_ALERT, alerts)
+    
+    @timed
+    def acknowledge_alert(self, alert_id):
+        with self.transaction() as conn:
+            return conn.execute(ACKNOWLEDGE_ALERT, (datetime.now(), alert_id)).rowcount > 0
+    
+    @timed
     def get_alerts(self, status=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if status:
-            cursor.execute("SELECT * FROM alerts WHERE status = ?", (status,))
-        else:
-            cursor.execute("SELECT * FROM alerts ORDER BY created_at DESC")
-        
-        alerts = cursor.fetchall()
-        conn.close()
-        return alerts
+        with self.connection() as conn:
+            if status:
+                return conn.execute(SELECT_ALERTS_BY_STATUS, (status,)).fetchall()
+            return conn.execute(SELECT_ALERTS).fetchall()
+    
+    def stream_rows(self, sql, params=(), chunk_size=5000):
+        # Yields lists of at most chunk_size rows. mmap is off for this connection so a
+        # full-table scan goes through the bounded page cache instead of mapping the file.
+        with self.pool.dedicated({"mmap_size": 0}) as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    
+    @timed
+    def anomaly_counts(self, since):
+        # (train_id, hour bucket_start, anomalies) from the hourly rollups in one GROUP BY
+        bucket_floor = int(since.timestamp() // ROLLUP_RESOLUTIONS[-1]) * ROLLUP_RESOLUTIONS[-1]
+        with self.connection() as conn:
+            return conn.execute(SELECT_ANOMALY_COUNTS, (ROLLUP_RESOLUTIONS[-1], bucket_floor)).fetchall()
+    
+    @timed
+    def recent_anomalies(self, limit=10):
+        # Newest first; walks the rowid backwards, so it stops after `limit` flagged rows
+        with self.connection() as conn:
+            return conn.execute(SELECT_RECENT_ANOMALIES, (limit,)).fetchall()
+    
+    @timed
+    def sensor_window_stats(self, since, sensors):
+        # SELECT_SENSOR_WINDOW_STATS rows with sensor_type replaced by its index in `sensors`
+        index = {name: i for i, name in enumerate(sensors)}
+        resolution = ROLLUP_RESOLUTIONS[-1]
+        start = since.timestamp()
+        bucket_floor = int(start // resolution) * resolution
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_SENSOR_WINDOW_STATS, (start, resolution, bucket_floor)).fetchall()
+        return [(row[0], index[row[1]]) + row[2:] for row in rows if row[1] in index]
+    
+    @timed
+    def insert_train(self, **fields):
+        # Returns the stored row; the database assigns the id. Raises sqlite3.IntegrityError on a duplicate number.
+        columns = [name for name in fields if fields[name] is not None]
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO trains ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [fields[name] for name in columns]
+            )
+            return conn.execute(SELECT_TRAIN, (cursor.lastrowid,)).fetchone()
+    
+    @timed
+    def get_trains_by_id(self, ids):
+        # Stored rows for the ids that exist, or every train when ids is None
+        rows = []
+        with self.connection() as conn:
+            if ids is None:
+                return conn.execute(SELECT_TRAINS).fetchall()
+            ids = list(ids)
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                rows.extend(conn.execute(f"SELECT * FROM trains WHERE id IN ({', '.join('?' * len(part))})", part))
+        return rows
+    
+    @timed
+    def update_train(self, train_id, **changes):
+        # changes: trains column -> value. Returns the stored row, or None if there is no such train.
+        # Raises sqlite3.IntegrityError when the new train number is taken.
+        with self.transaction() as conn:
+            if changes:
+                conn.execute(
+                    f"UPDATE trains SET {', '.join(f'{name} = ?' for name in changes)} WHERE id = ?",
+                    list(changes.values()) + [train_id]
+                )
+            return conn.execute(SELECT_TRAIN, (train_id,)).fetchone()
+    
+    @timed
+    def delete_train(self, train_id):
+        with self.transaction() as conn:
+            return conn.execute(DELETE_TRAIN, (train_id,)).rowcount > 0
+    
+    @timed
+    def get_train_predictions(self):
+        # (health_score, next_maintenance, rul_days, predicted_at, train_id) rows, as PredictiveMaintenance.score returns them
+        with self.connection() as conn:
+            return conn.execute(SELECT_TRAIN_PREDICTIONS).fetchall()
+    
+    @timed
+    def upsert_trains(self, rows):
+        # rows: dicts keyed by trains column (see fleet_import.IMPORT_COLUMNS), written in one transaction.
+        # Returns (inserted, updated, stored rows, rejected), rejected being (row, message) pairs for new
+        # trains that leave out a field only updates may omit (see fleet_import.new_train_error).
+        numbers = [row["train_number"] for row in rows]
+        with self.transaction() as conn:
+            existing = set()
+            for start in range(0, len(numbers), 500):
+                part = numbers[start:start + 500]
+                existing.update(r[0] for r in conn.execute(
+                    f"SELECT train_number FROM trains WHERE train_number IN ({', '.join('?' * len(part))})", part
+                ))
+            rejected, accepted = [], []
+            for row in rows:
+                message = None if row["train_number"] in existing else new_train_error(row)
+                if message is None:
+                    accepted.append(row)
+                else:
+                    rejected.append((row, message))
+            rows = accepted
+            conn.executemany(UPSERT_TRAIN, rows)
+            stored = {}
+            numbers = [row["train_number"] for row in rows]
+            for start in range(0, len(numbers), 500):
+                part = numbers[start:start + 500]
+                for r in conn.execute(f"SELECT * FROM trains WHERE train_number IN ({', '.join('?' * len(part))})", part):
+                    stored[r[1]] = r
+        inserted = sum(1 for number in stored if number not in existing)
+        # A number repeated within the batch is stored once, so count stored trains rather than input rows
+        return inserted, len(stored) - inserted, list(stored.values()), rejected
+    
+    @timed
+    def update_train_predictions(self, rows):
+        # rows: (health_score, next_maintenance, rul_days, predicted_at, train_id) tuples
+        with self.transaction() as conn:
+            conn.executemany(UPDATE_TRAIN_PREDICTION, rows)
+    
+    @timed
+    def sensor_summary(self, since):
+        # (train_id, sensor_type, unit, readings, avg, min, max, anomalies) per train and sensor
+        bucket_floor = int(since.timestamp() // ROLLUP_RESOLUTIONS[-1]) * ROLLUP_RESOLUTIONS[-1]
+        with self.connection() as conn:
+            return conn.execute(REPORT_SENSOR_SUMMARY, (ROLLUP_RESOLUTIONS[-1], bucket_floor)).fetchall()
+    
+    @timed
+    def sensor_archive_candidates(self, before_day):
+        # (day, train_id) pairs before before_day ("YYYY-MM-DD") with readings still in sensor_data
+        with self.connection() as conn:
+            return conn.execute(SELECT_ARCHIVE_CANDIDATES, (before_day, before_day)).fetchall()
+    
+    @timed
+    def read_sensor_day(self, train_id, day):
+        # One train's raw readings for one local day, by sensor and then time
+        start = datetime.fromisoformat(day)
+        end = start + timedelta(days=1)
+        resolution = ROLLUP_RESOLUTIONS[-1]
+        with self.connection() as conn:
+            sensors = [row[0] for row in conn.execute(
+                SELECT_DAY_SENSOR_TYPES, (resolution, train_id, int(start.timestamp()), int(end.timestamp())))]
+            rows = []
+            for sensor in sorted(sensors):
+                rows.extend(conn.execute(SELECT_RAW_SENSOR_DAY, (train_id, sensor, start, end)).fetchall())
+            return rows
+    
+    @timed
+    def sensor_archive_end(self, day):
+        # Bytes of the day's archive file covered by committed segments
+        with self.connection() as conn:
+            return conn.execute(SELECT_ARCHIVE_END, (day,)).fetchone()[0]
+    
+    @timed
+    def commit_sensor_archive(self, day, train_id, rows, offset, length):
+        # rows (from read_sensor_day) are in the archive file at offset; drops them from sensor_data
+        start = datetime.fromisoformat(day)
+        end = start + timedelta(days=1)
+        max_id = max(row[0] for row in rows)
+        timestamps = [row[5] for row in rows]
+        with self.transaction() as conn:
+            for sensor in sorted({row[2] for row in rows}):
+                conn.execute(DELETE_RAW_SENSOR_DAY, (train_id, sensor, start, end, max_id))
+            conn.execute(INSERT_ARCHIVE_SEGMENT,
+                         (day, train_id, offset, length, len(rows), min(timestamps), max(timestamps)))
+    
+    @timed
+    def sensor_archive_segments(self, train_id, first_day, last_day):
+        # (day, byte_offset, byte_length) of the archived members between two days, inclusive; every train when train_id is None
+        with self.connection() as conn:
+            if train_id is None:
+                return conn.execute(SELECT_ARCHIVE_SEGMENTS, (first_day, last_day)).fetchall()
+            return conn.execute(SELECT_TRAIN_ARCHIVE_SEGMENTS, (train_id, first_day, last_day)).fetchall()
+    
+    @timed
+    def expire_sensor_rollups(self, resolution, before, limit):
+        # Deletes up to limit rollups of one resolution with buckets before the epoch `before`
+        with self.transaction() as conn:
+            return conn.execute(DELETE_EXPIRED_ROLLUPS, (resolution, before, limit)).rowcount
+    
+    def storage_stats(self):
+        with self.connection() as conn:
+            page_size, pages, free, auto_vacuum = (
+                conn.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("page_size", "page_count", "freelist_count", "auto_vacuum")
+            )
+        return {
+            "pageSize": page_size,
+            "pages": pages,
+            "freePages": free,
+            "autoVacuum": ("none", "full", "incremental")[auto_vacuum],
+        }
+    
+    @timed
+    def incremental_vacuum(self, pages):
+        # Returns up to `pages` free pages to the file system; how many were released.
+        # executescript steps the pragma to completion, a plain execute frees a single page.
+        with self.connection() as conn:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            return free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    
+    @timed
+    def maintenance_costs(self, since):
+        # (type, status, records, total cost, average hours)
+        with self.connection() as conn:
+            return conn.execute(REPORT_MAINTENANCE_COSTS, (since.date(),)).fetchall()
+    
+    @timed
+    def alert_counts(self, since):
+        # (train_id, alerts, critical, still active)
+        with self.connection() as conn:
+            return conn.execute(REPORT_ALERT_COUNTS, (since,)).fetchall()
+
+DB_PATH = os.environ.get("KMRL_DB_PATH", "kmrl.db")
+_db_lock = threading.Lock()
 
-db = KMRLDatabase()
\ No newline at end of file
+def __getattr__(name):
+    # The shared `db` is opened, migrated and seeded on first use rather than on import, so worker
+    # processes that only need KMRLDatabase or the SQL constants leave the file alone
+    if name != "db":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _db_lock:
+        if "db" not in globals():
+            globals()["db"] = KMRLDatabase(DB_PATH)
+    return globals()["db"]
\ No newline at end of file
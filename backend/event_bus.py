@@ -0,0 +1,240 @@
+import asyncio
+import fcntl
+import json
+import os
+import struct
+import uuid
+from collections import deque
+
+# Every frame is a 4-byte big-endian length followed by that many bytes of JSON
+HEADER = struct.Struct("!I")
+
+
+def encode_frame(event_type, origin, data):
+    body = json.dumps({"type": event_type, "origin": origin, "data": data}).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader):
+    size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return await reader.readexactly(size)
+
+
+class EventBus:
+    """Publish/subscribe between the worker processes of one deployment.
+
+    The workers agree on a Unix socket ``path``. Whichever takes the
+    exclusive lock on ``path + ".lock"`` first is the owner: it serves the
+    socket and runs the ``on_promote`` callbacks (ingestion, the sensor
+    generator and the other one-per-deployment work). Every other worker
+    connects to it. ``publish()`` sends an event to the owner, which relays
+    it to all connected workers, the sender included, and handles it
+    itself, so every process sees every event exactly once and in the same
+    order. Handlers are called as ``callback(data, local)``, where ``local``
+    says whether this process published the event.
+
+    A worker whose connection drops queues what it publishes (up to
+    ``outbox_size`` events), retries, and takes over if the owner's lock has
+    been released because the owner died. ``on_connect`` callbacks run after
+    every (re)connect, so a worker can resync whatever it missed. An owner
+    drops a worker whose unsent frames exceed ``max_buffer`` bytes rather
+    than buffer without bound; that worker reconnects and resyncs.
+
+    Without a ``path`` the bus is local: this process is the owner and
+    ``publish()`` only calls its own handlers.
+    """
+
+    def __init__(self, path=None, max_buffer=16 << 20, outbox_size=1000, retry_seconds=0.2):
+        self.path = path
+        self.id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.max_buffer = max_buffer
+        self.retry_seconds = retry_seconds
+        self.owner = False
+        self.handlers = {}
+        self.promote_callbacks = []
+        self.connect_callbacks = []
+        self.peers = set()  # owner: stream writers of connected workers
+        self._writer = None  # worker: connection to the owner
+        self._outbox = deque(maxlen=outbox_size)
+        self._lock_file = None
+        self._server = None
+        self._task = None
+        self.published = 0
+        self.received = 0
+        self.relayed = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.connects = 0
+
+    @property
+    def role(self):
+        if self.path is None:
+            return "single"
+        return "owner" if self.owner else "worker"
+
+    def subscribe(self, event_type, callback):
+        self.handlers.setdefault(event_type, []).append(callback)
+
+    def on_promote(self, callback):
+        # callback() runs once, when this process becomes the owner; may be a coroutine function
+        self.promote_callbacks.append(callback)
+
+    def on_connect(self, callback):
+        # callback() runs after every connection to the owner, including the first
+        self.connect_callbacks.append(callback)
+
+    async def start(self):
+        # Returns once this process owns the bus or is connected to the owner
+        if self.path is None:
+            await self._promote()
+            return
+        while True:
+            if self._acquire():
+                await self._promote()
+                return
+            try:
+                reader = await self._connect()
+            except OSError:
+                # The owner holds the lock but is not listening yet
+                await asyncio.sleep(self.retry_seconds)
+                continue
+            self._task = asyncio.create_task(self._follow(reader))
+            return
+
+    def _acquire(self):
+        if self._lock_file is None:
+            self._lock_file = open(self.path + ".lock", "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    async def _promote(self):
+        if self.path is not None:
+            # A socket file left behind by a dead owner would make the bind fail
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._accept, path=self.path)
+        self.owner = True
+        # Events published while there was no owner to send them to
+        while self._outbox:
+            frame = self._outbox.popleft()
+            self._relay(frame)
+            self._dispatch(frame[HEADER.size:])
+        for callback in self.promote_callbacks:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def _connect(self):
+        reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self.connects += 1
+        while self._outbox:
+            self._writer.write(self._outbox.popleft())
+        for callback in self.connect_callbacks:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                asyncio.create_task(result)
+        return reader
+
+    async def _follow(self, reader):
+        while True:
+            try:
+                while True:
+                    self._dispatch(await read_frame(reader))
+                    self.received += 1
+            except (OSError, asyncio.IncompleteReadError):
+                pass
+            self._writer = None
+            # The owner is gone: take over if its lock is free, otherwise wait for the new owner
+            while True:
+                if self._acquire():
+                    await self._promote()
+                    return
+                try:
+                    reader = await self._connect()
+                    break
+                except OSError:
+                    await asyncio.sleep(self.retry_seconds)
+
+    async def _accept(self, reader, writer):
+        self.peers.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                self.received += 1
+                self._relay(HEADER.pack(len(frame)) + frame)
+                self._dispatch(frame)
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.peers.discard(writer)
+            writer.close()
+
+    def _relay(self, frame):
+        for writer in list(self.peers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                # Too far behind to catch up; it reconnects and resyncs instead
+                self.peers.discard(writer)
+                writer.close()
+                self.evicted += 1
+                continue
+            writer.write(frame)
+            self.relayed += 1
+
+    def _dispatch(self, frame):
+        event = json.loads(frame)
+        self._handle(event["type"], event["data"], event["origin"] == self.id)
+
+    def _handle(self, event_type, data, local):
+        for callback in self.handlers.get(event_type, ()):
+            try:
+                callback(data, local)
+            except Exception as e:
+                print(f"Error handling {event_type} event: {e}")
+
+    def publish(self, event_type, data):
+        # data must be JSON-serializable; call from the event loop
+        self.published += 1
+        if self.owner:
+            if self.peers:
+                self._relay(encode_frame(event_type, self.id, data))
+            asyncio.get_running_loop().call_soon(self._handle, event_type, data, True)
+            return
+        frame = encode_frame(event_type, self.id, data)
+        if self._writer is not None:
+            self._writer.write(frame)
+            return
+        if len(self._outbox) == self._outbox.maxlen:
+            self.dropped += 1
+        self._outbox.append(frame)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        for writer in list(self.peers):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock for the next owner
+
+    def stats(self):
+        return {
+            "role": self.role,
+            "id": self.id,
+            "path": self.path,
+            "peers": len(self.peers),
+            "published": self.published,
+            "received": self.received,
+            "relayed": self.relayed,
+            "outbox": len(self._outbox),
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "connects": self.connects,
+        }
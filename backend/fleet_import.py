@@ -0,0 +1,273 @@
+import codecs
+import json
+import time
+from datetime import date
+
+TRAIN_STATUSES = ("Available", "In Service", "Maintenance", "Out of Service")
+
+# Import field -> (trains column, kind); the same camelCase names the API returns
+IMPORT_FIELDS = {
+    "trainNumber": ("train_number", "text"),
+    "model": ("model", "text"),
+    "status": ("status", "status"),
+    "mileage": ("mileage", "count"),
+    "healthScore": ("health_score", "percent"),
+    "lastMaintenance": ("last_maintenance", "date"),
+    "nextMaintenance": ("next_maintenance", "date"),
+    "manufacturer": ("manufacturer", "text"),
+    "yearOfManufacture": ("year_manufactured", "year"),
+}
+IMPORT_COLUMNS = tuple(column for column, _ in IMPORT_FIELDS.values()) + ("depot_id",)
+
+
+def new_train_error(row):
+    # Why a validated row cannot create a train (None if it can); updates may leave these out
+    if row["model"] is None:
+        return "model is required for new trains"
+    if row["depot_id"] is None:
+        return "New trains need currentDepot or depotId"
+    return None
+
+
+class RecordStreamParser:
+    """Incremental parser for a JSON array of train objects or NDJSON.
+
+    Bytes go in through ``feed()`` in whatever chunks they arrive and complete
+    records come out as ``(row_number, object)`` pairs, so a file of any size
+    is parsed in constant memory. The format is picked from the first
+    non-blank character: ``[`` starts an array, anything else is read as one
+    JSON object per line. A malformed NDJSON line becomes that row's error
+    (``object`` is the ValueError); a malformed array cannot be resynchronised
+    and raises ValueError as soon as the bad record is seen. An array record is
+    only held back for the next chunk when it fails to decode at the end of
+    the buffer, and never once it grows past ``max_record`` characters.
+    """
+
+    # A decode error this close to the end of the buffer may be a literal or number cut off by the chunk
+    TRUNCATED_TAIL = 16
+
+    def __init__(self, compact_above=1 << 16, max_record=1 << 20):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.mode = None
+        self.done = False
+        self.rows = 0
+        self.compact_above = compact_above
+        self.max_record = max_record
+
+    def feed(self, data, final=False):
+        self.buffer += self._decoder.decode(data, final)
+        if self.mode is None:
+            stripped = self.buffer.lstrip()
+            if not stripped:
+                return []
+            self.mode = "array" if stripped[0] == "[" else "ndjson"
+            if self.mode == "array":
+                self.position = len(self.buffer) - len(stripped) + 1
+        records = self._array(final) if self.mode == "array" else self._lines(final)
+        if self.position > self.compact_above:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        return records
+
+    def close(self):
+        records = self.feed(b"", final=True)
+        if self.mode == "array" and not self.done:
+            raise ValueError(f"Unterminated JSON array after row {self.rows}")
+        return records
+
+    def _array(self, final):
+        records, buffer = [], self.buffer
+        while not self.done:
+            position = self.position
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            self.position = position
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self.done = True
+                self.position = position + 1
+                break
+            try:
+                value, end = self._json.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # A record split across chunks fails at the end of the buffer, or inside a string still
+                # open there; an error anywhere else is malformed input that more data cannot fix
+                truncated = e.msg.startswith("Unterminated string") or len(buffer) - e.pos <= self.TRUNCATED_TAIL
+                if final or not truncated:
+                    raise ValueError(f"Malformed JSON at row {self.rows + 1}: {e.msg}")
+                if len(buffer) - position > self.max_record:
+                    raise ValueError(f"Row {self.rows + 1} is longer than {self.max_record} characters")
+                break
+            if end == len(buffer) and not final and not isinstance(value, (dict, list)):
+                break  # a bare number may continue in the next chunk
+            self.position = end
+            self.rows += 1
+            records.append((self.rows, value))
+        return records
+
+    def _lines(self, final):
+        records, buffer = [], self.buffer
+        while True:
+            newline = buffer.find("\n", self.position)
+            if newline < 0:
+                if not final or self.position >= len(buffer):
+                    break
+                newline = len(buffer)
+            line = buffer[self.position:newline].strip()
+            self.position = newline + 1
+            if not line:
+                continue
+            self.rows += 1
+            try:
+                records.append((self.rows, json.loads(line)))
+            except ValueError as e:
+                records.append((self.rows, ValueError(f"Malformed JSON: {e}")))
+        self.position = min(self.position, len(buffer))
+        return records
+
+
+class FleetImport:
+    """Validation, batching and bookkeeping for one bulk train import.
+
+    ``take()`` turns parsed ``(row_number, object)`` pairs into lists of
+    ``batch_size`` validated rows (dicts keyed by trains column,
+    ``None`` for fields the record leaves out), recording a per-row error for
+    anything that fails validation. Each batch is written with
+    ``KMRLDatabase.upsert_trains`` and reported back through ``record()``.
+    Ids in the input are ignored; the database assigns them and train numbers
+    identify existing trains. Only the first ``max_errors`` errors are kept.
+    """
+
+    def __init__(self, depots, batch_size=1000, max_errors=1000):
+        # depots: (id, name, ...) rows
+        self.depot_ids = {row[0] for row in depots}
+        self.depot_names = {row[1].lower(): row[0] for row in depots}
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.statuses = {status.lower(): status for status in TRAIN_STATUSES}
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.batches_written = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, row_number, message, train_number=None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "trainNumber": train_number, "error": message})
+
+    def validate(self, row_number, record):
+        if isinstance(record, Exception):
+            self.error(row_number, str(record))
+            return None
+        if not isinstance(record, dict):
+            self.error(row_number, "Record is not a JSON object")
+            return None
+        number = record.get("trainNumber")
+        if not isinstance(number, str) or not number.strip():
+            self.error(row_number, "trainNumber is required")
+            return None
+        row = {column: None for column in IMPORT_COLUMNS}
+        try:
+            for name, (column, kind) in IMPORT_FIELDS.items():
+                value = record.get(name)
+                if value is not None:
+                    row[column] = self.coerce(name, kind, value)
+            row["depot_id"] = self.depot(record)
+        except ValueError as e:
+            self.error(row_number, str(e), number)
+            return None
+        row["train_number"] = number.strip()
+        row["row"] = row_number  # not a column; kept for errors found while writing
+        return row
+
+    def coerce(self, name, kind, value):
+        if kind == "text":
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+            return value
+        if kind == "status":
+            status = self.statuses.get(str(value).lower())
+            if status is None:
+                raise ValueError(f"status must be one of {', '.join(TRAIN_STATUSES)}")
+            return status
+        if kind == "date":
+            try:
+                return date.fromisoformat(str(value)[:10]).isoformat()
+            except ValueError:
+                raise ValueError(f"{name} must be an ISO date")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"{name} must be a whole number")
+        value = int(value)
+        if kind == "count" and value < 0:
+            raise ValueError(f"{name} cannot be negative")
+        if kind == "percent" and not 0 <= value <= 100:
+            raise ValueError(f"{name} must be between 0 and 100")
+        if kind == "year" and not 1900 <= value <= date.today().year + 1:
+            raise ValueError(f"{name} is out of range")
+        return value
+
+    def depot(self, record):
+        # currentDepot by name (as the API returns it) or depotId
+        if record.get("depotId") is not None:
+            if record["depotId"] not in self.depot_ids:
+                raise ValueError(f"Unknown depotId {record['depotId']}")
+            return record["depotId"]
+        if record.get("currentDepot") is not None:
+            depot_id = self.depot_names.get(str(record["currentDepot"]).lower())
+            if depot_id is None:
+                raise ValueError(f"Unknown depot {record['currentDepot']}")
+            return depot_id
+        return None
+
+    def take(self, records, batch):
+        # Validates records into the pending `batch` and returns the full batches split off it
+        full = []
+        for row_number, record in records:
+            self.rows += 1
+            row = self.validate(row_number, record)
+            if row is not None:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    full.append(batch[:])
+                    batch.clear()
+        return full
+
+    def record(self, inserted, updated):
+        self.inserted += inserted
+        self.updated += updated
+        self.batches_written += 1
+
+    def report(self):
+        seconds = time.perf_counter() - self.started
+        imported = self.inserted + self.updated
+        return {
+            "rows": self.rows,
+            "imported": imported,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "batches": self.batches_written,
+            "seconds": round(seconds, 3),
+            "rowsPerSecond": round(self.rows / seconds) if seconds > 0 else None,
+            "errors": sorted(self.errors, key=lambda e: (e["row"] is None, e["row"] or 0)),
+            "errorsTruncated": self.failed > len(self.errors),
+        }
+
+
+def read_file(path, chunk_size=1 << 20):
+    # Lists of (row_number, object) pairs from a JSON array or NDJSON file, one per chunk_size bytes read
+    parser = RecordStreamParser()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield parser.feed(data)
+    yield parser.close()
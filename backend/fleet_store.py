@@ -0,0 +1,198 @@
+import threading
+
+# Same column order as the trains table, so records can stand in for SQLite rows
+TRAIN_FIELDS = (
+    "id", "train_number", "model", "status", "mileage", "depot_id", "health_score",
+    "last_maintenance", "next_maintenance", "manufacturer", "year_manufactured",
+)
+
+
+class TrainRecord:
+    __slots__ = TRAIN_FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(TRAIN_FIELDS, values):
+            setattr(self, name, value)
+
+    # Positional access keeps train_row_to_dict and friends working unchanged
+    def __getitem__(self, index):
+        return getattr(self, TRAIN_FIELDS[index])
+
+    def __len__(self):
+        return len(TRAIN_FIELDS)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in TRAIN_FIELDS)
+
+    def __repr__(self):
+        return f"TrainRecord{tuple(self)!r}"
+
+
+class FleetStore:
+    """In-memory fleet with hash indexes instead of tuple scans.
+
+    Trains are indexed by id and train number, and by status (case-insensitive),
+    depot and model. Secondary indexes map a key to an insertion-ordered dict
+    of id -> record, so filtered listings cost O(matches) and every index is
+    updated in O(1) on create, update and delete.
+    """
+
+    SECONDARY = ("status", "depot_id", "model")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.by_id = {}
+        self.by_number = {}
+        self.indexes = {field: {} for field in self.SECONDARY}
+        self._next_id = 1
+        self.listeners = []
+
+    def load(self, rows):
+        # rows: trains-table rows; columns past TRAIN_FIELDS are ignored
+        for row in rows:
+            self.add(TrainRecord(*row[:len(TRAIN_FIELDS)]))
+
+    def upsert(self, row):
+        # Adds the train or updates it in place, keyed by id; returns the record
+        values = dict(zip(TRAIN_FIELDS, row[:len(TRAIN_FIELDS)]))
+        if values["id"] in self.by_id:
+            return self.update_train(values.pop("id"), **values)
+        return self.add(TrainRecord(*values.values()))
+
+    def sync(self, rows, ids=None):
+        # Makes the trains in `ids` (every train when None) match trains-table rows: changed rows
+        # are upserted, trains without a row are deleted. Returns how many trains changed.
+        rows = {row[0]: tuple(row[:len(TRAIN_FIELDS)]) for row in rows}
+        ids = set(self.by_id) | set(rows) if ids is None else set(ids)
+        changed = 0
+        retry = []
+        for train_id in ids:
+            record = self.by_id.get(train_id)
+            row = rows.get(train_id)
+            if row is None:
+                if record is not None:
+                    self.delete_train(train_id)
+                    changed += 1
+            elif record is None or tuple(record) != row:
+                try:
+                    self.upsert(row)
+                    changed += 1
+                except ValueError:
+                    retry.append(row)  # a train number still held by a train not synced yet
+        for row in retry:
+            self.upsert(row)
+            changed += 1
+        return changed
+
+    @staticmethod
+    def _key(field, value):
+        return value.lower() if field == "status" and isinstance(value, str) else value
+
+    def _index(self, record):
+        self.by_id[record.id] = record
+        self.by_number[record.train_number] = record
+        for field in self.SECONDARY:
+            key = self._key(field, getattr(record, field))
+            self.indexes[field].setdefault(key, {})[record.id] = record
+
+    def _unindex(self, record):
+        del self.by_id[record.id]
+        self.by_number.pop(record.train_number, None)
+        for field in self.SECONDARY:
+            key = self._key(field, getattr(record, field))
+            bucket = self.indexes[field].get(key)
+            if bucket is not None:
+                bucket.pop(record.id, None)
+                if not bucket:
+                    del self.indexes[field][key]
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add_listener(self, callback):
+        # callback(train_id) runs after every create, update and delete
+        self.listeners.append(callback)
+
+    def _notify(self, train_id):
+        for callback in self.listeners:
+            callback(train_id)
+
+    @property
+    def trains(self):
+        return list(self.by_id.values())
+
+    def add(self, record):
+        with self._lock:
+            if record.id is None:
+                record.id = self._next_id
+            if record.id in self.by_id:
+                raise ValueError(f"Train id {record.id} already exists")
+            if record.train_number in self.by_number:
+                raise ValueError(f"Train number {record.train_number} already exists")
+            self._index(record)
+            self._next_id = max(self._next_id, record.id + 1)
+        self._notify(record.id)
+        return record
+
+    def get_train(self, train_id):
+        return self.by_id.get(train_id)
+
+    def get_train_by_number(self, train_number):
+        return self.by_number.get(train_number)
+
+    def get_trains(self, status=None, depot_id=None, model=None):
+        # Equality filters on the secondary indexes; listing queries with sorting and paging go to SQL
+        buckets = [
+            self.indexes[field].get(self._key(field, value), {})
+            for field, value in (("status", status), ("depot_id", depot_id), ("model", model))
+            if value
+        ]
+        if not buckets:
+            return list(self.by_id.values())
+        # Walk the smallest matching bucket and keep the records present in every other one
+        smallest = min(buckets, key=len)
+        return [record for record in smallest.values() if all(record.id in bucket for bucket in buckets)]
+
+    def get_trains_without_status(self, status):
+        # The complement of a status lookup: every other status bucket, without visiting the excluded trains
+        excluded = self._key("status", status)
+        return [record for key, bucket in self.indexes["status"].items() if key != excluded for record in bucket.values()]
+
+    def update_train(self, train_id, **changes):
+        with self._lock:
+            record = self.by_id.get(train_id)
+            if record is None:
+                return None
+            unknown = set(changes) - set(TRAIN_FIELDS[1:])
+            if unknown:
+                raise ValueError(f"Unknown train fields: {', '.join(sorted(unknown))}")
+            number = changes.get("train_number")
+            if number is not None and number != record.train_number and number in self.by_number:
+                raise ValueError(f"Train number {number} already exists")
+            # Only move the index entries whose key actually changed; by_id keeps its order
+            if number is not None and number != record.train_number:
+                del self.by_number[record.train_number]
+                self.by_number[number] = record
+            for field in self.SECONDARY:
+                if field in changes:
+                    old_key = self._key(field, getattr(record, field))
+                    new_key = self._key(field, changes[field])
+                    if old_key != new_key:
+                        bucket = self.indexes[field][old_key]
+                        del bucket[record.id]
+                        if not bucket:
+                            del self.indexes[field][old_key]
+                        self.indexes[field].setdefault(new_key, {})[record.id] = record
+            for name, value in changes.items():
+                setattr(record, name, value)
+        self._notify(train_id)
+        return record
+
+    def delete_train(self, train_id):
+        with self._lock:
+            record = self.by_id.get(train_id)
+            if record is None:
+                return None
+            self._unindex(record)
+        self._notify(train_id)
+        return record
@@ -0,0 +1,47 @@
+import asyncio
+
+
+class FleetSync:
+    """Keeps one worker's FleetStore in line with the trains table.
+
+    With several workers each holds its own fleet, and the trains table is
+    the one ordered record of what changed. Whoever changes trains publishes
+    their ids; every worker, the publisher included, passes them to
+    ``request()`` and re-reads those rows with ``read_rows(ids)`` (an async
+    callable; ``ids=None`` means every train). Requests are coalesced and
+    applied one read at a time, so an older read can never land after a
+    newer one, and whatever order events arrive in each worker ends up on the
+    committed state.
+    """
+
+    def __init__(self, fleet, read_rows):
+        self.fleet = fleet
+        self.read_rows = read_rows
+        self._pending = set()
+        self._everything = False
+        self._task = None
+        self.syncs = 0
+        self.changed = 0
+
+    def request(self, ids=None):
+        if ids is None:
+            self._everything = True
+        else:
+            self._pending.update(ids)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._everything or self._pending:
+            ids = None if self._everything else sorted(self._pending)
+            self._everything = False
+            self._pending = set()
+            try:
+                rows = await self.read_rows(ids)
+                self.changed += self.fleet.sync(rows, ids)
+                self.syncs += 1
+            except Exception as e:
+                print(f"Error syncing fleet: {e}")
+
+    def stats(self):
+        return {"syncs": self.syncs, "changed": self.changed, "pending": len(self._pending)}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Bulk-load trains from a JSON array or NDJSON file.
+
+Writes straight into the database at KMRL_DB_PATH (default kmrl.db), or
+streams the file to a running server's POST /api/trains/import with --url so
+the live fleet picks the trains up immediately. Records are matched on
+trainNumber: known trains are updated, new ones get database-assigned ids.
+
+Usage: python import_fleet.py FILE [--batch-size 1000] [--url http://localhost:8001]
+"""
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+
+def import_local(path, batch_size):
+    from database import db
+    from fleet_import import FleetImport, read_file
+
+    importer = FleetImport(db.get_depots(), batch_size=batch_size)
+    pending = []
+
+    def write(batch):
+        inserted, updated, _, rejected = db.upsert_trains(batch)
+        for row, message in rejected:
+            importer.error(row["row"], message, row["train_number"])
+        importer.record(inserted, updated)
+
+    try:
+        for records in read_file(path):
+            for batch in importer.take(records, pending):
+                write(batch)
+        if pending:
+            write(pending)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        if pending:
+            write(pending)
+    return importer.report()
+
+
+def import_remote(path, batch_size, url):
+    size = os.path.getsize(path)
+    with open(path, "rb") as body:
+        request = urllib.request.Request(
+            f"{url.rstrip('/')}/api/trains/import?batchSize={batch_size}", data=body, method="POST",
+            headers={"Content-Type": "application/x-ndjson" if path.endswith((".ndjson", ".jsonl")) else "application/json",
+                     "Content-Length": str(size)},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.load(response)["data"]
+        except urllib.error.HTTPError as e:
+            payload = json.load(e)
+            print(f"error: {payload.get('detail')}", file=sys.stderr)
+            return payload.get("data") or {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--url", help="import through a running server instead of writing the database directly")
+    parser.add_argument("--max-errors", type=int, default=20, help="errors to print")
+    args = parser.parse_args()
+
+    report = import_remote(args.file, args.batch_size, args.url) if args.url else import_local(args.file, args.batch_size)
+    print(f"{report.get('rows', 0)} rows: {report.get('inserted', 0)} inserted, {report.get('updated', 0)} updated, "
+          f"{report.get('failed', 0)} failed in {report.get('seconds', 0)}s ({report.get('rowsPerSecond')} rows/s)")
+    for error in report.get("errors", [])[:args.max_errors]:
+        print(f"  row {error['row']} {error['trainNumber'] or ''}: {error['error']}")
+    if report.get("failed", 0) > args.max_errors:
+        print(f"  ... {report['failed'] - args.max_errors} more")
+    return 1 if report.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import time
+from datetime import date, datetime, timedelta, time as clock
+
+from scoring import PriorityScorer
+
+
+class _SlotGrid:
+    # Free bays per (depot, day) plus the fleet-wide per-day induction cap
+    def __init__(self, depots, horizon, service_days, daily_cap):
+        self.horizon = horizon
+        self.service_days = service_days
+        self.daily_cap = daily_cap
+        self.depot_ids = [d[0] for d in depots]
+        self.free = {d[0]: [max(0, d[2] - d[3])] * horizon for d in depots}
+        self.free_total = [sum(max(0, d[2] - d[3]) for d in depots)] * horizon
+        self.per_day = [0] * horizon
+
+    def fits(self, day, depot):
+        free = self.free[depot]
+        return all(free[d] > 0 for d in range(day, min(day + self.service_days, self.horizon)))
+
+    def best_depot(self, day, home):
+        if self.per_day[day] >= self.daily_cap or self.free_total[day] <= 0:
+            return None
+        if home in self.free and self.fits(day, home):
+            return home
+        for depot in self.depot_ids:
+            if depot != home and self.fits(day, depot):
+                return depot
+        return None
+
+    def occupy(self, day, depot, delta):
+        self.per_day[day] += delta
+        for d in range(day, min(day + self.service_days, self.horizon)):
+            self.free[depot][d] -= delta
+            self.free_total[d] -= delta
+
+
+class InductionOptimizer:
+    """Assigns trains to (day, depot) induction slots under hard constraints.
+
+    Constraints:
+      * depot capacity - each depot has ``capacity - current_occupancy`` free
+        bays per day, and an inducted train holds its bay for ``service_days``;
+      * maintenance windows - a train is never inducted before its window opens
+        (``min_days_between`` after its last maintenance) and is penalised for
+        every day it runs past its next maintenance date;
+      * mileage balancing - at most ``max_daily_share`` of the fleet is taken out
+        of service on one day, and higher mileage raises a train's priority so
+        heavily used trains rotate through the depots first.
+
+    The objective is priority-weighted waiting time plus lateness and
+    cross-depot shunting penalties. A deterministic earliest-deadline greedy
+    pass builds a feasible plan, then up to ``max_passes`` rounds of local
+    search (earlier relocations and pairwise swaps) improve it. Pass
+    ``time_budget`` (seconds) for anytime behaviour: the best plan found when
+    the budget runs out is returned. Without a budget the result depends only
+    on the inputs, so the same fleet always gets the same plan.
+    """
+
+    def __init__(self, horizon_days=30, service_days=1, min_days_between=7, max_daily_share=0.25,
+                 cross_depot_penalty=15.0, late_penalty=100.0, swap_window=64, max_passes=10, scorer=None):
+        self.horizon_days = horizon_days
+        self.service_days = service_days
+        self.min_days_between = min_days_between
+        self.max_daily_share = max_daily_share
+        self.cross_depot_penalty = cross_depot_penalty
+        self.late_penalty = late_penalty
+        self.swap_window = swap_window
+        self.max_passes = max_passes
+        self.scorer = scorer or PriorityScorer(horizon_days=horizon_days)
+
+    @staticmethod
+    def _as_date(value):
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+    def priority(self, mileage, health_score, days_to_due):
+        return self.scorer.score(mileage, health_score, days_to_due)
+
+    def job_for(self, row, start):
+        # Planning job for one train row, or None when it needs no induction in the horizon.
+        # Day index d is the date start + d + 1.
+        if str(row[3]).lower() == "maintenance":
+            return None  # already in the shop
+        last = self._as_date(row[7])
+        due = self._as_date(row[8])
+        earliest = 0
+        if last is not None:
+            earliest = max(0, (last - start).days + self.min_days_between - 1)
+        deadline = (due - start).days - 1 if due is not None else self.horizon_days
+        if earliest >= self.horizon_days or deadline >= self.horizon_days:
+            return None
+        return {
+            "row": row,
+            "home": row[5],
+            "earliest": earliest,
+            "deadline": max(deadline, earliest),
+            "priority": self.priority(row[4], row[6], deadline),
+        }
+
+    def _prepare(self, trains, start):
+        # trains: rows in trains-table column order
+        jobs = []
+        for row in trains:
+            job = self.job_for(row, start)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+
+    def place(self, job, grid):
+        # Earliest day with a free bay, home depot preferred; False when nothing fits
+        for day in range(job["earliest"], self.horizon_days):
+            depot = grid.best_depot(day, job["home"])
+            if depot is not None:
+                job["day"], job["depot"] = day, depot
+                grid.occupy(day, depot, 1)
+                return True
+        return False
+
+    def _cost(self, job, day, depot):
+        cost = job["priority"] * (day + 1)
+        if day > job["deadline"]:
+            cost += self.late_penalty * (day - job["deadline"])
+        if depot != job["home"]:
+            cost += self.cross_depot_penalty
+        return cost
+
+    def optimize(self, trains, depots, start=None, time_budget=None):
+        # depots: (id, name, capacity, current_occupancy, ...) rows
+        started = time.perf_counter()
+        deadline_at = started + time_budget if time_budget else None
+        start = start or date.today()
+        daily_cap = max(1, int(len(trains) * self.max_daily_share))
+        grid = _SlotGrid(depots, self.horizon_days, self.service_days, daily_cap)
+
+        jobs = self._prepare(trains, start)
+        # Earliest deadline first, highest priority first among equal deadlines, id for determinism
+        jobs.sort(key=lambda j: (j["deadline"], -j["priority"], j["row"][0]))
+
+        assigned, unscheduled = [], []
+        for job in jobs:
+            (assigned if self.place(job, grid) else unscheduled).append(job)
+
+        iterations, complete = self._improve(assigned, grid, deadline_at)
+        total = sum(self._cost(j, j["day"], j["depot"]) for j in assigned)
+        assigned.sort(key=lambda j: (j["day"], -j["priority"], j["row"][0]))
+        return {
+            "assignments": assigned,
+            "unscheduled": unscheduled,
+            "objective": total,
+            "iterations": iterations,
+            "optimal_locally": complete,
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+            "start": start,
+            "grid": grid,
+        }
+
+    def _improve(self, assigned, grid, deadline_at):
+        iterations = 0
+        for _ in range(self.max_passes):
+            improved = False
+            # Relocate: pull each train into a cheaper free slot, highest priority first
+            for job in sorted(assigned, key=lambda j: (-j["priority"], j["row"][0])):
+                if deadline_at and time.perf_counter() > deadline_at:
+                    return iterations, False
+                current = self._cost(job, job["day"], job["depot"])
+                grid.occupy(job["day"], job["depot"], -1)
+                best = (current, job["day"], job["depot"])
+                for day in range(job["earliest"], job["day"] + 1):
+                    depot = grid.best_depot(day, job["home"])
+                    if depot is not None:
+                        cost = self._cost(job, day, depot)
+                        if cost < best[0] - 1e-9:
+                            best = (cost, day, depot)
+                job["day"], job["depot"] = best[1], best[2]
+                grid.occupy(job["day"], job["depot"], 1)
+                if best[0] < current - 1e-9:
+                    improved = True
+                iterations += 1
+
+            # Swap: exchange slots between nearby assignments when both windows allow it
+            ordered = sorted(assigned, key=lambda j: (j["day"], j["row"][0]))
+            for i, a in enumerate(ordered):
+                if deadline_at and time.perf_counter() > deadline_at:
+                    return iterations, False
+                for b in ordered[i + 1:i + 1 + self.swap_window]:
+                    if a["day"] == b["day"] and a["depot"] == b["depot"]:
+                        continue
+                    if b["day"] < a["earliest"] or a["day"] < b["earliest"]:
+                        continue
+                    before = self._cost(a, a["day"], a["depot"]) + self._cost(b, b["day"], b["depot"])
+                    after = self._cost(a, b["day"], b["depot"]) + self._cost(b, a["day"], a["depot"])
+                    if after < before - 1e-9:
+                        a["day"], b["day"] = b["day"], a["day"]
+                        a["depot"], b["depot"] = b["depot"], a["depot"]
+                        improved = True
+                    iterations += 1
+            if not improved:
+                return iterations, True
+        return iterations, False
+
+    @staticmethod
+    def reasoning(job):
+        row = job["row"]
+        mileage, health_score = row[4], row[6]
+        reasons = []
+        if mileage > 40000:
+            reasons.append(f"High mileage ({mileage:,} km)")
+        if health_score < 80:
+            reasons.append(f"Health score below optimal ({health_score}%)")
+        if mileage > 50000:
+            reasons.append("Approaching maintenance limit")
+        if job["deadline"] <= 0:
+            reasons.append("Maintenance overdue")
+        elif job["day"] > job["deadline"]:
+            reasons.append(f"Scheduled {job['day'] - job['deadline']} day(s) after due date (depot capacity)")
+        if job["depot"] != job["home"]:
+            reasons.append("Moved to another depot for capacity")
+        if not reasons:
+            reasons.append("Scheduled maintenance due")
+        return "; ".join(reasons)
+
+    def to_plan(self, job, start):
+        return {
+            "train_id": job["row"][0],
+            "train_number": job["row"][1],
+            "priority_score": round(job["priority"], 1),
+            "scheduled_date": datetime.combine(start + timedelta(days=job["day"] + 1), clock(6)).isoformat(),
+            "depot_id": job["depot"],
+            "reasoning": self.reasoning(job),
+        }
+
+    def to_plans(self, result):
+        return [self.to_plan(job, result["start"]) for job in result["assignments"]]
@@ -0,0 +1,359 @@
+import asyncio
+import bisect
+import threading
+from datetime import date, datetime
+
+from response_cache import dump_json
+
+
+class IndexedHeap:
+    """Binary min-heap with a position map, so any item can be re-keyed or
+    removed in O(log n) instead of being pushed again and skipped later."""
+
+    def __init__(self):
+        self.heap = []  # [key, item]
+        self.position = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def peek(self):
+        return self.heap[0][1] if self.heap else None
+
+    def push(self, item, key):
+        if item in self.position:
+            self.update(item, key)
+            return
+        self.heap.append([key, item])
+        self.position[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def update(self, item, key):
+        index = self.position[item]
+        old = self.heap[index][0]
+        self.heap[index][0] = key
+        if key < old:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def remove(self, item):
+        index = self.position.pop(item, None)
+        if index is None:
+            return False
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.position[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self.position[last[1]])
+        return True
+
+    def pop(self):
+        item = self.peek()
+        if item is not None:
+            self.remove(item)
+        return item
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.position[heap[i][1]] = i
+        self.position[heap[j][1]] = j
+
+    def _sift_up(self, index):
+        while index > 0:
+            parent = (index - 1) // 2
+            if self.heap[index][0] < self.heap[parent][0]:
+                self._swap(index, parent)
+                index = parent
+            else:
+                break
+
+    def _sift_down(self, index):
+        size = len(self.heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self.heap[child][0] < self.heap[smallest][0]:
+                    smallest = child
+            if smallest == index:
+                return
+            self._swap(index, smallest)
+            index = smallest
+
+
+class SortedKeyList:
+    """Values kept in key order, stored as blocks of at most ``2 * load`` entries.
+
+    Insert and remove bisect the block maxima and then one block, so an
+    update shifts a block of at most ``2 * load`` entries rather than the
+    whole list: O(log n + load), plus an O(n / load) splice of the block
+    index when a block splits or empties. Keys must be unique.
+    """
+
+    def __init__(self, pairs=(), load=128):
+        # pairs: (key, value) already sorted by key
+        self.load = load
+        self.maxes = []
+        self.key_blocks = []
+        self.value_blocks = []
+        pairs = list(pairs)
+        for i in range(0, len(pairs), load):
+            chunk = pairs[i:i + load]
+            self.key_blocks.append([key for key, _ in chunk])
+            self.value_blocks.append([value for _, value in chunk])
+            self.maxes.append(chunk[-1][0])
+        self.size = len(pairs)
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, key, value):
+        if not self.maxes:
+            self.maxes.append(key)
+            self.key_blocks.append([key])
+            self.value_blocks.append([value])
+            self.size = 1
+            return
+        block = min(bisect.bisect_left(self.maxes, key), len(self.maxes) - 1)
+        keys, values = self.key_blocks[block], self.value_blocks[block]
+        index = bisect.bisect_left(keys, key)
+        keys.insert(index, key)
+        values.insert(index, value)
+        self.size += 1
+        if len(keys) > 2 * self.load:
+            self.key_blocks.insert(block + 1, keys[self.load:])
+            self.value_blocks.insert(block + 1, values[self.load:])
+            del keys[self.load:], values[self.load:]
+            self.maxes.insert(block + 1, self.key_blocks[block + 1][-1])
+        self.maxes[block] = keys[-1]
+
+    def remove(self, key):
+        block = bisect.bisect_left(self.maxes, key)
+        keys = self.key_blocks[block] if block < len(self.maxes) else ()
+        index = bisect.bisect_left(keys, key)
+        if index == len(keys) or keys[index] != key:
+            raise KeyError(key)
+        values = self.value_blocks[block]
+        del keys[index], values[index]
+        self.size -= 1
+        if keys:
+            self.maxes[block] = keys[-1]
+        else:
+            del self.maxes[block], self.key_blocks[block], self.value_blocks[block]
+
+    def values(self, limit=None):
+        # The first `limit` values (all when None) in key order, as a new list
+        found = []
+        for values in self.value_blocks:
+            if limit is not None and len(found) + len(values) >= limit:
+                found.extend(values[:limit - len(found)])
+                break
+            found.extend(values)
+        return found
+
+
+class MaterializedInductionPlan:
+    """The current induction plan, kept up to date one train at a time.
+
+    ``rebuild()`` runs the full optimizer once. After that a FleetStore
+    listener re-plans only the train that changed: its old bay is released,
+    its job and priority are recomputed, and it is placed in the earliest free
+    slot, or parked in a waiting heap keyed on priority when nothing fits.
+    A freed bay goes to the highest-priority waiting train. Plan entries are
+    held in a SortedKeyList in (day, -priority, id) order and waiting ids in
+    one keyed on id, so an update costs O(log n) and a read returns the plan
+    list, summary and JSON body materialized once per version, without
+    re-scoring or re-sorting anything. The plan is rebuilt when the date
+    rolls over (``await refresh()`` before a read) or on an explicit
+    regenerate; rebuilds run off the event loop and never block reads or
+    listeners for longer than it takes to swap the new plan in.
+    """
+
+    def __init__(self, fleet, load_depots, optimizer):
+        self.fleet = fleet
+        self.load_depots = load_depots
+        self.optimizer = optimizer
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._changed_during = None  # train ids changed while a rebuild is optimizing
+        self._refresh = None
+        self.start = None
+        self.grid = None
+        self.jobs = {}  # train_id -> job, scheduled or waiting
+        self.schedule = SortedKeyList()  # (day, -priority, id) -> plan dict of scheduled jobs
+        self.waiting = IndexedHeap()  # unscheduled train ids keyed on -priority
+        self.unscheduled = SortedKeyList()  # the same ids in id order, for the summary
+        self.objective = 0.0
+        self.optimal_locally = False
+        self.version = 0
+        self.rebuilds = 0
+        self.updates = 0
+        self.updated_at = None
+        self._plans = None
+        self._summary = None
+        self._body = None
+
+    @staticmethod
+    def _order(job):
+        return (job["day"], -job["priority"], job["row"][0])
+
+    def _insert(self, job):
+        self.schedule.insert(self._order(job), self.optimizer.to_plan(job, self.start))
+        self.objective += self.optimizer._cost(job, job["day"], job["depot"])
+
+    def _remove(self, job):
+        self.schedule.remove(self._order(job))
+        self.objective -= self.optimizer._cost(job, job["day"], job["depot"])
+
+    def _wait(self, job):
+        train_id = job["row"][0]
+        self.waiting.push(train_id, -job["priority"])
+        self.unscheduled.insert(train_id, train_id)
+
+    def _unwait(self, train_id):
+        self.waiting.remove(train_id)
+        self.unscheduled.remove(train_id)
+
+    def _changed(self):
+        self.version += 1
+        self.updated_at = datetime.now()
+        self._plans = None
+        self._summary = None
+        self._body = None
+
+    def rebuild(self, start=None, time_budget=None, optimizer=None):
+        # Blocking: call it from a thread (see refresh()). The optimizer runs outside the plan
+        # lock, so fleet listeners aren't held up by it; trains that change meanwhile are
+        # re-planned on top of the new result before it is swapped in.
+        with self._rebuild_lock:
+            with self._lock:
+                optimizer = optimizer or self.optimizer
+                trains = self.fleet.get_trains()
+                self._changed_during = set()
+            try:
+                result = optimizer.optimize(trains, self.load_depots(), start, time_budget)
+            finally:
+                with self._lock:
+                    changed, self._changed_during = self._changed_during, None
+            with self._lock:
+                self.optimizer = optimizer
+                self.start = result["start"]
+                self.grid = result["grid"]
+                self.jobs = {}
+                self.waiting = IndexedHeap()
+                self.unscheduled = SortedKeyList()
+                # Assignments come back in (day, -priority, id) order already
+                self.schedule = SortedKeyList(zip(map(self._order, result["assignments"]), optimizer.to_plans(result)))
+                for job in result["assignments"]:
+                    self.jobs[job["row"][0]] = job
+                for job in result["unscheduled"]:
+                    self.jobs[job["row"][0]] = job
+                    self._wait(job)
+                self.objective = result["objective"]
+                self.optimal_locally = result["optimal_locally"]
+                for train_id in changed:
+                    self._replan(train_id)
+                self.rebuilds += 1
+                self._changed()
+                return result
+
+    def stale(self):
+        return self.grid is None or self.start != date.today()
+
+    async def refresh(self):
+        # Makes sure there is a plan for today, rebuilding on a thread if not; callers that
+        # arrive during a rebuild wait for that one instead of starting their own
+        if not self.stale():
+            return
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(asyncio.to_thread(self.rebuild))
+        await asyncio.shield(self._refresh)
+
+    def on_train_changed(self, train_id):
+        # FleetStore listener; a no-op until the first plan has been built
+        with self._lock:
+            if self._changed_during is not None:
+                self._changed_during.add(train_id)
+            if self.grid is not None and self._replan(train_id):
+                self.optimal_locally = False
+                self.updates += 1
+                self._changed()
+
+    def _replan(self, train_id):
+        # Re-places one train in the current plan; False when it was and still is out of the plan
+        freed = False
+        old = self.jobs.pop(train_id, None)
+        if old is not None:
+            if train_id in self.waiting:
+                self._unwait(train_id)
+            else:
+                self._remove(old)
+                self.grid.occupy(old["day"], old["depot"], -1)
+                freed = True
+
+        record = self.fleet.get_train(train_id)
+        job = self.optimizer.job_for(record, self.start) if record is not None else None
+        if job is not None:
+            self.jobs[train_id] = job
+            if self.optimizer.place(job, self.grid):
+                self._insert(job)
+            else:
+                self._wait(job)
+
+        if freed and self.waiting:
+            # Offer the released bay to the most urgent train still waiting
+            candidate = self.jobs[self.waiting.peek()]
+            if self.optimizer.place(candidate, self.grid):
+                self._unwait(candidate["row"][0])
+                self._insert(candidate)
+
+        return old is not None or job is not None
+
+    def read(self, limit=None):
+        # (plans, summary); an unlimited read returns the materialized list, so don't mutate it
+        with self._lock:
+            plans = self.schedule.values(limit) if limit else self.plans()
+            return plans, dict(self.summary())
+
+    def plans(self):
+        # Plan dicts in schedule order, materialized once per version
+        with self._lock:
+            if self._plans is None:
+                self._plans = self.schedule.values()
+            return self._plans
+
+    def body(self):
+        # Full plan response as JSON bytes, encoded once per plan version
+        with self._lock:
+            if self._body is None:
+                self._body = dump_json({"success": True, "data": self.plans(), "summary": self.summary()})
+            return self._body
+
+    def summary(self):
+        # Materialized once per version; the waiting ids are already in id order
+        with self._lock:
+            if self._summary is None:
+                self._summary = {
+                    "scheduled": len(self.schedule),
+                    "unscheduled": self.unscheduled.values(),
+                    "objective": round(self.objective, 1),
+                    "optimal_locally": self.optimal_locally,
+                    "version": self.version,
+                    "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+                }
+            return self._summary
+
+    def stats(self):
+        return {
+            "scheduled": len(self.schedule),
+            "waiting": len(self.waiting),
+            "version": self.version,
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.updates,
+            "start": self.start.isoformat() if self.start else None,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class SensorIngestionPipeline:
+    """Buffers sensor readings in memory and writes them to a sink in batches.
+
+    Readings are tuples in the column order of ``INSERT_SENSOR_DATA``:
+    (train_id, sensor_type, value, unit, timestamp, is_anomaly). A writer
+    thread hands the sink up to ``batch_size`` readings at a time, either when
+    that many are queued or ``flush_interval`` seconds after the last flush.
+
+    When the buffer is full, ``overflow="block"`` makes producers wait for the
+    writer (up to their timeout, after which the reading is dropped) and
+    ``overflow="drop_oldest"`` evicts the oldest queued reading instead.
+    """
+
+    def __init__(self, sink, capacity=10000, batch_size=500, flush_interval=1.0, overflow="block"):
+        if overflow not in ("block", "drop_oldest"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.counters = {
+            "accepted": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="sensor-ingestion", daemon=True)
+            self._thread.start()
+
+    def put(self, reading, timeout=None):
+        return self.put_many([reading], timeout) == 1
+
+    def put_many(self, readings, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        accepted = 0
+        with self._cond:
+            for reading in readings:
+                if self._closed:
+                    self.counters["dropped"] += 1
+                    continue
+                if len(self._buffer) >= self.capacity:
+                    if self.overflow == "drop_oldest":
+                        self._buffer.popleft()
+                        self.counters["dropped"] += 1
+                    elif not self._wait_for_space(deadline):
+                        self.counters["dropped"] += 1
+                        continue
+                self._buffer.append(reading)
+                accepted += 1
+            self.counters["accepted"] += accepted
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        return accepted
+
+    async def aput_many(self, readings, timeout=None):
+        # Fast path without leaving the event loop; only a full buffer makes the
+        # caller wait, and then in a worker thread so the loop keeps running.
+        with self._cond:
+            has_room = self.overflow == "drop_oldest" or len(self._buffer) + len(readings) <= self.capacity
+        if has_room:
+            return self.put_many(readings, timeout)
+        return await asyncio.to_thread(self.put_many, readings, timeout)
+
+    def _wait_for_space(self, deadline):
+        self._cond.notify_all()
+        while len(self._buffer) >= self.capacity and not self._closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return not self._closed
+
+    def _take_batch(self):
+        count = min(len(self._buffer), self.batch_size)
+        batch = [self._buffer.popleft() for _ in range(count)]
+        self._cond.notify_all()
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            self.sink(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} sensor readings: {e}")
+            with self._cond:
+                self.counters["failed"] += len(batch)
+            return
+        with self._cond:
+            self.counters["flushed"] += len(batch)
+            self.counters["batches"] += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._buffer) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed and not self._buffer:
+                    return
+                batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        # Synchronous drain for callers that need everything persisted now
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=10.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self.counters,
+                queued=len(self._buffer),
+                capacity=self.capacity,
+                last_flush_ms=round(self.last_flush_ms, 3),
+            )
@@ -0,0 +1,236 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def no_progress(fraction, message=None):
+    # Progress callback for handlers running in worker processes
+    pass
+
+
+class Job:
+    """One submitted unit of background work and its outcome."""
+
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = job_type
+        self.params = params
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.future = Future()  # resolves with the result, for callers that want to await it
+        self._cancel = threading.Event()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, fraction, message=None):
+        # Handlers call this between steps; it doubles as the cancellation point
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if fraction is not None:  # None: the total is unknown, only the message changes
+            self.progress = round(min(max(fraction, 0.0), 1.0), 4)
+        if message is not None:
+            self.message = message
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "createdAt": self.created_at.isoformat(),
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobQueue:
+    """Background jobs kept off the event loop, with a concurrency cap per type.
+
+    Handlers are registered per job type as ``handler(params, progress)`` and
+    run on a thread pool, or on a process pool when registered with
+    ``process=True`` (CPU-bound work that would otherwise hold the GIL; those
+    handlers get a no-op progress callback and must take picklable params).
+    Each type runs at most ``concurrency`` jobs at once and holds up to
+    ``max_queued`` more; the rest are rejected. Every running job holds a
+    thread, process jobs included, so the thread pool is sized to the sum of
+    the per-type limits: a job admitted by its type's cap never waits behind
+    another type. Register all types before the first submit. Cancelling a queued job drops
+    it, cancelling a running thread job stops it at its next progress report,
+    and a running process job has its result discarded. Finished jobs and
+    their results are kept by id until ``max_finished`` newer ones push them out.
+    """
+
+    def __init__(self, processes=0, max_finished=200):
+        self.processes = processes
+        self.max_finished = max_finished
+        self.handlers = {}
+        self.jobs = OrderedDict()
+        self.queued = {}
+        self.running = {}
+        self.finished = deque()
+        self.counts = {status: 0 for status in FINISHED}
+        self._lock = threading.Lock()
+        self._threads = None
+        self._processes = None
+
+    def register(self, job_type, handler, concurrency=1, process=False, max_queued=100):
+        if self._threads is not None:
+            raise RuntimeError("Job types must be registered before the first job is submitted")
+        self.handlers[job_type] = {
+            "handler": handler,
+            "concurrency": concurrency,
+            "process": process and self.processes > 0,
+            "max_queued": max_queued,
+        }
+        self.queued[job_type] = deque()
+        self.running[job_type] = 0
+
+    def _thread_pool(self):
+        if self._threads is None:
+            workers = sum(spec["concurrency"] for spec in self.handlers.values())
+            self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        return self._threads
+
+    def _process_pool(self):
+        if self._processes is None:
+            # spawn rather than fork: the API process runs writer and event-loop threads
+            self._processes = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+    def submit(self, job_type, params=None):
+        if job_type not in self.handlers:
+            raise KeyError(f"Unknown job type {job_type}")
+        job = Job(job_type, params or {})
+        with self._lock:
+            if len(self.queued[job_type]) >= self.handlers[job_type]["max_queued"]:
+                raise OverflowError(f"Too many queued {job_type} jobs")
+            self.jobs[job.id] = job
+            self.queued[job_type].append(job)
+            self._dispatch(job_type)
+        return job
+
+    def _dispatch(self, job_type):
+        # Caller holds the lock
+        spec = self.handlers[job_type]
+        queue = self.queued[job_type]
+        while queue and self.running[job_type] < spec["concurrency"]:
+            job = queue.popleft()
+            self.running[job_type] += 1
+            job.status = "running"
+            job.started_at = datetime.now()
+            self._thread_pool().submit(self._run, job, spec)
+
+    def _run(self, job, spec):
+        try:
+            if spec["process"]:
+                future = self._process_pool().submit(spec["handler"], job.params, no_progress)
+                while True:
+                    try:
+                        result = future.result(timeout=0.2)
+                        break
+                    except TimeoutError:
+                        if job.cancel_requested:
+                            future.cancel()
+                            raise JobCancelled()
+                if job.cancel_requested:
+                    raise JobCancelled()
+            else:
+                result = spec["handler"](job.params, job.report)
+            job.result = result
+            job.progress = 1.0
+            self._finish(job, "succeeded")
+            job.future.set_result(result)
+        except JobCancelled as e:
+            self._finish(job, "cancelled")
+            job.future.set_exception(e)
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, "failed")
+            job.future.set_exception(e)
+
+    def _finish(self, job, status):
+        with self._lock:
+            job.status = status
+            job.finished_at = datetime.now()
+            self.counts[status] += 1
+            if job.started_at is not None:
+                self.running[job.type] -= 1
+            self.finished.append(job.id)
+            while len(self.finished) > self.max_finished:
+                self.jobs.pop(self.finished.popleft(), None)
+            self._dispatch(job.type)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self, job_type=None, status=None, limit=50):
+        # Newest first
+        with self._lock:
+            jobs = [
+                job for job in reversed(self.jobs.values())
+                if (job_type is None or job.type == job_type) and (status is None or job.status == status)
+            ]
+        return jobs[:limit]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job._cancel.set()
+            queue = self.queued[job.type]
+            if job in queue:
+                queue.remove(job)
+            else:
+                return job  # running; stops at its next progress report
+        self._finish(job, "cancelled")
+        job.future.set_exception(JobCancelled())
+        return job
+
+    def stats(self):
+        with self._lock:
+            return {
+                "types": {
+                    job_type: {
+                        "queued": len(self.queued[job_type]),
+                        "running": self.running[job_type],
+                        "concurrency": spec["concurrency"],
+                        "process": spec["process"],
+                    }
+                    for job_type, spec in self.handlers.items()
+                },
+                "finished": dict(self.counts),
+                "retained": len(self.jobs),
+            }
+
+    def shutdown(self, timeout=5.0):
+        # Cancel everything still queued or running, then stop the pools
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        deadline = time.monotonic() + timeout
+        while any(self.running.values()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
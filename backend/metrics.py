@@ -0,0 +1,282 @@
+import asyncio
+import bisect
+import math
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self, lock):
+        self.value = 0
+        self.lock = lock
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds, lock):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, the last one is +Inf
+        self.sum = 0.0
+        self.lock = lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        # with histogram.time(): ... observes the block's duration in seconds
+        return _Timer(self)
+
+
+class Metric:
+    """One metric family: a counter, gauge or histogram, optionally labelled.
+
+    ``labels(*values)`` returns the child for one set of label values (created
+    on first use); a metric without label names is its own only child, so
+    ``inc()``, ``set()`` and ``observe()`` can be called on it directly.
+    Updates are a lock and an addition, safe from any thread.
+    """
+
+    def __init__(self, name, kind, help, label_names=(), buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets) if buckets else None
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.label_names:
+            self._only = self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = _Histogram(self.buckets, self._lock) if self.kind == "histogram" else _Value(self._lock)
+                    self._children[values] = child
+        return child
+
+    def inc(self, amount=1):
+        self._only.inc(amount)
+
+    def dec(self, amount=1):
+        self._only.dec(amount)
+
+    def set(self, value):
+        self._only.set(value)
+
+    def observe(self, value):
+        self._only.observe(value)
+
+    def time(self):
+        return self._only.time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = [(values, child, list(getattr(child, "counts", ())), getattr(child, "sum", None))
+                        for values, child in self._children.items()]
+        for values, child, counts, total in children:
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{format_labels(self.label_names, values)} {format_value(child.value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = ("le", format_value(float(bound)))
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, values, le)} {cumulative}")
+            labels = format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class CallbackMetric:
+    """A counter or gauge read from elsewhere when scraped, e.g. a queue length.
+
+    ``read()`` returns a number, or a dict of label-value tuples to numbers
+    for a labelled metric; None leaves the metric out of that scrape.
+    """
+
+    def __init__(self, name, kind, help, read, label_names=()):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.read = read
+        self.label_names = tuple(label_names)
+
+    def render(self):
+        value = self.read()
+        if value is None:
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        for values, sample in samples:
+            if sample is not None:
+                lines.append(f"{self.name}{format_labels(self.label_names, values)} {format_value(sample)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics for the Prometheus text exposition format (version 0.0.4).
+
+    Metrics recorded on the hot path (``counter``, ``gauge``, ``histogram``)
+    cost one lock and an addition per update. Anything another component
+    already counts is registered with ``counter_callback``/``gauge_callback``
+    instead and only read when ``/metrics`` is scraped, so it costs nothing
+    between scrapes.
+    """
+
+    def __init__(self, prefix="kmrl_"):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Metric(self.prefix + name, "counter", help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Metric(self.prefix + name, "gauge", help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Metric(self.prefix + name, "histogram", help, labels, buckets))
+
+    def counter_callback(self, name, help, read, labels=()):
+        return self._add(CallbackMetric(self.prefix + name, "counter", help, read, labels))
+
+    def gauge_callback(self, name, help, read, labels=()):
+        return self._add(CallbackMetric(self.prefix + name, "gauge", help, read, labels))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and measuring its response body.
+
+    Requests are labelled by method and route template (``/api/trains/{train_id}``,
+    not the concrete path), so the number of series stays bounded; requests
+    no route matched are counted under ``"unmatched"``. WebSocket and
+    lifespan traffic passes straight through.
+    """
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.routes = None
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "Time from request start to the end of the response body.", ("method", "route"))
+        self.size = registry.histogram(
+            "http_response_size_bytes", "Response body size.", ("method", "route"), buckets=SIZE_BUCKETS)
+        self.requests = registry.counter("http_requests_total", "HTTP requests by status code.", ("method", "route", "status"))
+        self.in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled.")
+
+    def route(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self.routes is None or endpoint not in self.routes:
+            # Built on first use, once every route is registered
+            self.routes = {getattr(route, "endpoint", None): route.path for route in scope["app"].routes}
+        return self.routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        response = {"status": 500, "bytes": 0}
+
+        async def measured_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        self.in_progress.inc()
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            self.in_progress.dec()
+            method, route = scope["method"], self.route(scope)
+            self.duration.labels(method, route).observe(time.perf_counter() - started)
+            self.size.labels(method, route).observe(response["bytes"])
+            self.requests.labels(method, route, str(response["status"])).inc()
+
+
+async def sample_loop_lag(histogram, gauge, interval=0.5):
+    # How late the event loop wakes a sleeper; anything that blocks the loop shows up here
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        histogram.observe(lag)
+        gauge.set(lag)
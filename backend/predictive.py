@@ -0,0 +1,246 @@
+import json
+import math
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from sensor_simulator import SENSOR_PROFILES
+
+SENSORS = tuple(profile[0] for profile in SENSOR_PROFILES)
+SENSOR_STATS = ("mean", "std", "max", "anomaly_rate", "slope")
+TRAIN_FEATURES = ("mileage", "days_since_maintenance", "age_years")
+FEATURE_NAMES = tuple(f"{sensor}_{stat}" for sensor in SENSORS for stat in SENSOR_STATS) + TRAIN_FEATURES
+
+MODEL_PATH = os.environ.get(
+    "KMRL_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "predictive_model.json")
+)
+
+# Standardized features are clipped so one extreme input cannot swing a linear model arbitrarily far
+FEATURE_CLIP = 4.0
+MAX_RUL_DAYS = 365
+# Below this many hours of rollups a train's sensor statistics are treated as unknown
+MIN_WINDOW_HOURS = 6
+
+
+def window_stat_columns(stats):
+    # stats: rows of database.SELECT_SENSOR_WINDOW_STATS as a float array, columns
+    # train_id, sensor index, hours, readings, mean, mean of squares, max, anomalies, sx, sxx, sxy.
+    # Returns (mean, std, max, anomaly_rate, slope) with the same row order.
+    hours, readings, mean, mean_sq, high, anomalies, sx, sxx, sxy = stats[:, 2:].T
+    std = np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+    # Least-squares slope of the hourly means per day: (n*Sxy - Sx*Sy) / (n*Sxx - Sx^2), with Sy = n*mean
+    denominator = hours * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (hours * sxy - sx * hours * mean) / denominator, 0.0)
+        rate = np.where(readings > 0, anomalies / readings, 0.0)
+    return np.column_stack((mean, std, high, rate, slope))
+
+
+def feature_matrix(trains, stats, today=None):
+    # trains: (train_id, mileage, last_maintenance, year_manufactured) tuples.
+    # stats: sensor window stats rows (see window_stat_columns); train/sensor pairs without
+    # MIN_WINDOW_HOURS of readings stay NaN and count as "typical" once the model standardizes them.
+    today = today or date.today()
+    ids = np.array([t[0] for t in trains], dtype=np.int64)
+    X = np.full((len(trains), len(FEATURE_NAMES)), np.nan)
+    if len(stats) and len(ids):
+        stats = np.asarray(stats, dtype=float)
+        order = np.argsort(ids)
+        position = np.searchsorted(ids, stats[:, 0], sorter=order)
+        position = np.minimum(position, len(ids) - 1)
+        rows = order[position]
+        known = (ids[rows] == stats[:, 0]) & (stats[:, 2] >= MIN_WINDOW_HOURS)
+        columns = stats[known, 1].astype(np.int64)[:, None] * len(SENSOR_STATS) + np.arange(len(SENSOR_STATS))
+        X[rows[known][:, None], columns] = window_stat_columns(stats[known])
+    offset = len(SENSORS) * len(SENSOR_STATS)
+    for i, (_, mileage, last_maintenance, year) in enumerate(trains):
+        X[i, offset] = mileage if mileage is not None else np.nan
+        if last_maintenance:
+            X[i, offset + 1] = min((today - date.fromisoformat(str(last_maintenance)[:10])).days, MAX_RUL_DAYS)
+        X[i, offset + 2] = today.year - year if year else np.nan
+    return ids, X
+
+
+class PredictiveModel:
+    """Health score and remaining useful life from sensor and train features.
+
+    Two linear models over standardized features: health is
+    ``100 * sigmoid(X @ health_weights + health_bias)`` and remaining useful
+    life in days is ``exp(X @ rul_weights + rul_bias)``, capped at
+    ``MAX_RUL_DAYS``. Weights are fitted offline by train_predictive_model.py
+    and stored as JSON; ``predict`` is two matrix-vector products per batch.
+    """
+
+    def __init__(self, features, mean, scale, health_weights, health_bias, rul_weights, rul_bias, version=None, trained_at=None):
+        if tuple(features) != FEATURE_NAMES:
+            raise ValueError("Model was trained on a different feature set")
+        self.features = tuple(features)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.health_weights = np.asarray(health_weights, dtype=float)
+        self.health_bias = float(health_bias)
+        self.rul_weights = np.asarray(rul_weights, dtype=float)
+        self.rul_bias = float(rul_bias)
+        self.version = version
+        self.trained_at = trained_at
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+            f.write("\n")
+
+    def to_dict(self):
+        return {
+            "features": list(self.features),
+            "mean": [round(float(v), 6) for v in self.mean],
+            "scale": [round(float(v), 6) for v in self.scale],
+            "health_weights": [round(float(v), 6) for v in self.health_weights],
+            "health_bias": round(self.health_bias, 6),
+            "rul_weights": [round(float(v), 6) for v in self.rul_weights],
+            "rul_bias": round(self.rul_bias, 6),
+            "version": self.version,
+            "trained_at": self.trained_at,
+        }
+
+    def standardize(self, X):
+        Z = (X - self.mean) / self.scale
+        return np.clip(np.nan_to_num(Z, nan=0.0), -FEATURE_CLIP, FEATURE_CLIP)
+
+    def predict(self, X):
+        # -> (health 0-100, remaining useful life in days) arrays
+        Z = self.standardize(X)
+        health = 100.0 / (1.0 + np.exp(-(Z @ self.health_weights + self.health_bias)))
+        rul = np.minimum(np.exp(np.minimum(Z @ self.rul_weights + self.rul_bias, math.log(MAX_RUL_DAYS))), MAX_RUL_DAYS)
+        return health, rul
+
+
+def fit_model(X, health, rul, l2=1.0, version=None):
+    # Ridge regressions on the link scale: logit(health / 100) and log(rul)
+    mean = np.nanmean(X, axis=0)
+    scale = np.nanstd(X, axis=0)
+    scale[scale == 0] = 1.0
+    Z = np.clip(np.nan_to_num((X - mean) / scale, nan=0.0), -FEATURE_CLIP, FEATURE_CLIP)
+    A = np.column_stack((Z, np.ones(len(Z))))
+    penalty = l2 * np.eye(A.shape[1])
+    penalty[-1, -1] = 0.0  # leave the intercept unpenalized
+
+    def ridge(y):
+        coef = np.linalg.solve(A.T @ A + penalty, A.T @ y)
+        return coef[:-1], coef[-1]
+
+    fraction = np.clip(np.asarray(health, dtype=float) / 100, 0.01, 0.99)
+    health_weights, health_bias = ridge(np.log(fraction / (1 - fraction)))
+    rul_weights, rul_bias = ridge(np.log(np.clip(np.asarray(rul, dtype=float), 1.0, MAX_RUL_DAYS)))
+    return PredictiveModel(FEATURE_NAMES, mean, scale, health_weights, health_bias, rul_weights, rul_bias,
+                           version=version, trained_at=datetime.now().isoformat(timespec="seconds"))
+
+
+class ModelCache:
+    """The loaded model, read from disk once and again only when the file changes."""
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+        self.loads = 0
+
+    def get(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if self._model is None or mtime != self._mtime:
+                self._model = PredictiveModel.load(self.path)
+                self._mtime = mtime
+                self.loads += 1
+            return self._model
+
+
+class PredictiveMaintenance:
+    """Batch inference of train health and remaining useful life.
+
+    ``score()`` reads one window of sensor statistics for the whole fleet (a
+    single GROUP BY over the hourly sensor rollups), builds the feature
+    matrix with numpy, predicts in batches of ``batch_size`` trains and
+    writes health, remaining useful life and the resulting next-maintenance
+    date back to the trains table. ``apply()`` then updates the trains whose
+    health or due date changed in the fleet store, so API responses, the induction
+    plan and the dashboard pick up the new values through the usual
+    listeners. Requests only ever read the stored results.
+    """
+
+    def __init__(self, fleet, history, cache=None, window_days=7, batch_size=4096):
+        self.fleet = fleet
+        self.history = history
+        self.cache = cache or ModelCache()
+        self.window_days = window_days
+        self.batch_size = batch_size
+        self.predictions = {}  # train_id -> prediction dict from the last run
+        self.last_run = None
+
+    def snapshot(self):
+        # The fleet fields score() needs, copied where the fleet store is mutated (the event loop)
+        return [(t.id, t.mileage, t.last_maintenance, t.year_manufactured) for t in self.fleet.trains]
+
+    def score(self, trains, progress=None):
+        # The heavy half: features, inference and the trains-table write. Safe to run off the event
+        # loop, as it only reads the snapshot() it is given, never the live fleet store.
+        progress = progress or (lambda fraction, message=None: None)
+        model = self.cache.get()
+        now = datetime.now()
+        today = now.date()
+        stats = self.history.sensor_window_stats(now - timedelta(days=self.window_days), SENSORS)
+        progress(0.2, f"Sensor statistics for {len(trains)} trains loaded")
+        ids, X = feature_matrix(trains, stats, today)
+        # A train with no sensor that has MIN_WINDOW_HOURS of rollups (a cold start, or a new train) would
+        # standardize to an all-typical row and overwrite its health and due date with the model's average.
+        # Those trains keep their current values until they have enough history.
+        known = ~np.isnan(X[:, :len(SENSORS) * len(SENSOR_STATS)]).all(axis=1)
+        ids, X = ids[known], X[known]
+
+        health = np.empty(len(ids))
+        rul = np.empty(len(ids))
+        for start in range(0, len(ids), self.batch_size):
+            stop = start + self.batch_size
+            health[start:stop], rul[start:stop] = model.predict(X[start:stop])
+            progress(0.2 + 0.6 * min(stop, len(ids)) / max(len(ids), 1), "Scoring fleet")
+
+        predicted_at = now.isoformat(timespec="seconds")
+        rows = [
+            (score, (today + timedelta(days=int(days))).isoformat(), round(days, 1), predicted_at, train_id)
+            for train_id, score, days in zip(ids.tolist(), np.rint(health).astype(int).tolist(), rul.tolist())
+        ]
+        self.history.update_train_predictions(rows)
+        progress(0.9, "Predictions stored")
+        return model.version, rows
+
+    def apply(self, version, rows):
+        # Copies changed values into the fleet store; call it where fleet updates normally happen
+        changed = 0
+        for score, due, _, _, train_id in rows:
+            record = self.fleet.get_train(train_id)
+            if record is not None and (record.health_score != score or record.next_maintenance != due):
+                self.fleet.update_train(train_id, health_score=score, next_maintenance=due)
+                changed += 1
+        self.predictions = {
+            train_id: {
+                "trainId": train_id, "healthScore": score, "remainingUsefulLifeDays": days,
+                "nextMaintenance": due, "predictedAt": predicted_at, "modelVersion": version,
+            }
+            for score, due, days, predicted_at, train_id in rows
+        }
+        self.last_run = {
+            "at": rows[0][3] if rows else datetime.now().isoformat(timespec="seconds"),
+            "trains": len(rows), "changed": changed, "modelVersion": version,
+        }
+        return self.last_run
+
+    def run(self, progress=None):
+        return self.apply(*self.score(self.snapshot(), progress))
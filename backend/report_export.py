@@ -0,0 +1,226 @@
+import csv
+import io
+import itertools
+import json
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+from database import KMRLDatabase
+from retention import ARCHIVE_DIR, SensorArchive, archive_days
+
+# Output format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Exportable tables: columns with their Parquet types, the time column and the equality filters
+EXPORT_DATASETS = {
+    "sensor-data": {
+        "table": "sensor_data",
+        "columns": (
+            ("id", "int64"), ("train_id", "int64"), ("sensor_type", "string"), ("value", "float64"),
+            ("unit", "string"), ("timestamp", "string"), ("is_anomaly", "bool_"),
+        ),
+        "time_column": "timestamp",
+        "time_is_date": False,
+        "filters": ("train_id", "sensor_type"),
+        "archived": True,  # older readings live in the retention archive, see retention.py
+    },
+    "maintenance-records": {
+        "table": "maintenance_records",
+        "columns": (
+            ("id", "int64"), ("train_id", "int64"), ("type", "string"), ("status", "string"),
+            ("scheduled_date", "string"), ("completed_date", "string"), ("estimated_hours", "int64"),
+            ("actual_hours", "int64"), ("priority", "string"), ("technician", "string"), ("cost", "float64"),
+            ("description", "string"), ("created_at", "string"),
+        ),
+        "time_column": "scheduled_date",
+        "time_is_date": True,
+        "filters": ("train_id", "status"),
+    },
+}
+
+# API filter name -> column; GET /api/exports and export jobs from POST /api/reports/generate take the same names
+EXPORT_FILTERS = {"trainId": "train_id", "sensorType": "sensor_type", "status": "status"}
+
+EXPORT_DIR = os.environ.get("KMRL_EXPORT_DIR", "exports")
+
+archive = SensorArchive(ARCHIVE_DIR)
+
+
+def export_sql(dataset, since=None, until=None, **filters):
+    # since/until: datetimes; DATE columns compare against the date part only
+    spec = EXPORT_DATASETS[dataset]
+    clauses, params = [], []
+    for op, bound in ((">=", since), ("<", until)):
+        if bound is not None:
+            clauses.append(f"{spec['time_column']} {op} ?")
+            params.append(bound.date() if spec["time_is_date"] else bound)
+    for name in spec["filters"]:
+        if filters.get(name) is not None:
+            clauses.append(f"{name} = ?")
+            params.append(filters[name])
+    sql = f"SELECT {', '.join(c[0] for c in spec['columns'])} FROM {spec['table']}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    # No ORDER BY: rows leave in rowid (insertion) order, so SQLite never sorts the full result
+    return sql, params
+
+
+def export_filters(dataset, values):
+    # values: API filter names -> values (query parameters or a request body). Returns the set ones that
+    # `dataset` filters on, keyed by column, as stream_export and export_to_file take them.
+    columns = EXPORT_DATASETS[dataset]["filters"] if dataset in EXPORT_DATASETS else ()
+    return {
+        column: values[name] for name, column in EXPORT_FILTERS.items()
+        if column in columns and values.get(name) is not None
+    }
+
+
+def encode_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns, chunks):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for rows in chunks:
+        yield "".join(dumps(dict(zip(columns, row))) + "\n" for row in rows).encode("utf-8")
+
+
+class _ChunkSink:
+    # Write-only file object for ParquetWriter that hands back what was written since the last drain
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _arrow_column(values, kind):
+    if kind == pyarrow.bool_():
+        # SQLite stores booleans as 0/1
+        return pyarrow.array(values, type=pyarrow.int8()).cast(kind)
+    return pyarrow.array(values, type=kind)
+
+
+def encode_parquet(columns, chunks, types):
+    # One row group per chunk, flushed to the client before the next chunk is read
+    schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in zip(columns, types)])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for rows in chunks:
+            arrays = [_arrow_column(values, field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(database, dataset, fmt, since=None, until=None, chunk_size=5000, on_chunk=None, **filters):
+    # Generator of encoded bytes: SQLite cursor on `database` (a KMRLDatabase) -> row chunks -> encoder.
+    # on_chunk(rows_so_far) is called after every chunk, e.g. for job progress.
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset {dataset}; use one of {', '.join(EXPORT_DATASETS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format {fmt}; use one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet export needs pyarrow installed")
+    spec = EXPORT_DATASETS[dataset]
+    columns = [c[0] for c in spec["columns"]]
+    sql, params = export_sql(dataset, since, until, **filters)
+    chunks = database.stream_rows(sql, params, chunk_size)
+    if spec.get("archived"):
+        # Archived readings are older than anything still in the table, so they go first
+        chunks = itertools.chain(archived_chunks(database, since, until, filters.get("train_id"), filters.get("sensor_type")), chunks)
+    if on_chunk is not None:
+        chunks = _counted(chunks, on_chunk)
+    if fmt == "csv":
+        return encode_csv(columns, chunks)
+    if fmt == "ndjson":
+        return encode_ndjson(columns, chunks)
+    return encode_parquet(columns, chunks, [c[1] for c in spec["columns"]])
+
+
+def archived_chunks(database, since, until, train_id=None, sensor_type=None):
+    # Lazy like stream_rows: nothing is read until the export starts
+    segments = database.sensor_archive_segments(train_id, *archive_days(since, until))
+    yield from archive.scan(segments, since, until, sensor_type)
+
+
+def _counted(chunks, on_chunk):
+    total = 0
+    for rows in chunks:
+        total += len(rows)
+        yield rows
+        on_chunk(total)
+
+
+def export_filename(dataset, fmt, stamp):
+    return f"{dataset}-{stamp}.{EXPORT_FORMATS[fmt][1]}"
+
+
+def export_to_file(params, progress):
+    # Job handler: params = {"dataset", "format", "since", "until", "filters", "filename", "database"};
+    # params["database"] is the SQLite path, opened here so a worker process imports nothing that touches it
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, params["filename"])
+    counts = {"rows": 0}
+
+    def on_chunk(rows):
+        counts["rows"] = rows
+        progress(None, f"{rows} rows written")
+
+    partial = path + ".part"
+    database = KMRLDatabase(params["database"], initialize=False)
+    try:
+        with open(partial, "wb") as out:
+            for data in stream_export(database, params["dataset"], params["format"], params.get("since"),
+                                      params.get("until"), on_chunk=on_chunk, **params.get("filters", {})):
+                out.write(data)
+        os.replace(partial, path)
+    finally:
+        database.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+    return {
+        "name": params["filename"],
+        "path": path,
+        "format": params["format"],
+        "rows": counts["rows"],
+        "bytes": os.path.getsize(path),
+    }
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from database import KMRLDatabase
+
+# API report type -> display name
+REPORT_TYPES = {
+    "fleet-performance": "Fleet Performance",
+    "maintenance-cost": "Cost Analysis",
+    "sensor-health": "Sensor Health",
+}
+
+
+def fleet_performance(database, trains, since, progress):
+    # trains: rows in trains-table column order
+    alerts = {row[0]: row[1:] for row in database.alert_counts(since)}
+    progress(0.4, "Alert counts loaded")
+    anomalies = {}
+    for row in database.sensor_summary(since):
+        anomalies[row[0]] = anomalies.get(row[0], 0) + (row[7] or 0)
+    progress(0.7, "Sensor summary loaded")
+
+    rows, by_status = [], {}
+    for t in trains:
+        total, critical, active = alerts.get(t[0], (0, 0, 0))
+        by_status[t[3]] = by_status.get(t[3], 0) + 1
+        rows.append({
+            "trainId": t[0],
+            "trainNumber": t[1],
+            "status": t[3],
+            "mileage": t[4],
+            "healthScore": t[6],
+            "depotId": t[5],
+            "alerts": total,
+            "criticalAlerts": critical or 0,
+            "activeAlerts": active or 0,
+            "sensorAnomalies": anomalies.get(t[0], 0),
+        })
+    count = len(trains)
+    summary = {
+        "totalTrains": count,
+        "byStatus": by_status,
+        "averageHealth": round(sum(t[6] for t in trains) / count, 1) if count else None,
+        "averageMileage": round(sum(t[4] for t in trains) / count) if count else None,
+        "totalAlerts": sum(r["alerts"] for r in rows),
+        "totalSensorAnomalies": sum(r["sensorAnomalies"] for r in rows),
+    }
+    return summary, rows
+
+
+def maintenance_cost(database, trains, since, progress):
+    rows = [
+        {"type": r[0], "status": r[1], "records": r[2], "totalCost": round(r[3], 2),
+         "averageHours": round(r[4], 1) if r[4] is not None else None}
+        for r in database.maintenance_costs(since)
+    ]
+    progress(0.8, "Maintenance records aggregated")
+    summary = {
+        "records": sum(r["records"] for r in rows),
+        "totalCost": round(sum(r["totalCost"] for r in rows), 2),
+    }
+    return summary, rows
+
+
+def sensor_health(database, trains, since, progress):
+    rows = [
+        {"trainId": r[0], "sensorType": r[1], "unit": r[2], "readings": r[3], "average": round(r[4], 2),
+         "min": r[5], "max": r[6], "anomalies": r[7]}
+        for r in database.sensor_summary(since)
+    ]
+    progress(0.8, "Sensor rollups aggregated")
+    readings = sum(r["readings"] for r in rows)
+    anomalies = sum(r["anomalies"] for r in rows)
+    summary = {
+        "readings": readings,
+        "anomalies": anomalies,
+        "anomalyRate": round(anomalies / readings, 4) if readings else None,
+        "trainsReporting": len({r["trainId"] for r in rows}),
+    }
+    return summary, rows
+
+
+BUILDERS = {
+    "fleet-performance": fleet_performance,
+    "maintenance-cost": maintenance_cost,
+    "sensor-health": sensor_health,
+}
+
+
+def build_report(params, progress):
+    # Job handler: params = {"type", "days", "trains", "database"}; picklable so it can run in a worker process.
+    # params["database"] is the SQLite path; the job opens its own connections and closes them when done.
+    report_type = params["type"]
+    now = datetime.now()
+    since = now - timedelta(days=params.get("days", 30))
+    progress(0.05, "Collecting data")
+    database = KMRLDatabase(params["database"], initialize=False)
+    try:
+        summary, rows = BUILDERS[report_type](database, params.get("trains", []), since, progress)
+    finally:
+        database.close()
+    progress(0.95, "Assembling report")
+    return {
+        "type": report_type,
+        "name": f"{REPORT_TYPES[report_type]} - {now.strftime('%d %b %Y %H:%M')}",
+        "generatedAt": now.isoformat(),
+        "period": {"from": since.isoformat(), "to": now.isoformat()},
+        "summary": summary,
+        "rows": rows,
+    }
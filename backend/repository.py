@@ -0,0 +1,88 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# KMRLDatabase methods by the kind of connection they need
+READ_METHODS = (
+    "get_trains", "get_depots", "get_alerts", "get_sensor_series", "get_maintenance_records",
+    "maintenance_rollups", "activity_rollups", "sensor_window_stats", "sensor_summary",
+    "maintenance_costs", "alert_counts", "anomaly_counts", "recent_anomalies", "get_trains_by_id",
+    "get_train_predictions", "sensor_archive_candidates", "read_sensor_day", "sensor_archive_end",
+    "sensor_archive_segments", "storage_stats",
+)
+WRITE_METHODS = (
+    "add_sensor_data_batch", "add_alerts", "acknowledge_alert", "add_maintenance_records",
+    "update_maintenance_record", "insert_train", "upsert_trains", "update_train_predictions",
+    "backfill_analytics_rollups", "update_train", "delete_train", "commit_sensor_archive",
+    "expire_sensor_rollups", "incremental_vacuum",
+)
+
+
+class AsyncRepository:
+    """Awaitable access to a KMRLDatabase that never blocks the event loop.
+
+    Reads run on a bounded pool of ``readers`` threads and writes on a single
+    writer thread. The database hands every thread its own pooled
+    connection, so reader threads hold read-only (``query_only``)
+    connections that WAL lets run next to a commit, and all writes queue on
+    one connection instead of contending for SQLite's write lock. At most
+    ``max_pending`` calls per side wait for a thread; further callers wait on
+    the event loop without tying up anything. Every method in
+    ``READ_METHODS`` and ``WRITE_METHODS`` is available as a coroutine with
+    the same signature. With ``readers=0`` calls run inline on the caller's
+    thread, which is only meant for comparison benchmarks.
+    """
+
+    def __init__(self, database, readers=4, max_pending=64):
+        self.database = database
+        self.readers = readers
+        self._reader_pool = None
+        self._writer_pool = None
+        self._limits = None
+        self.max_pending = max_pending
+        if readers > 0:
+            self._reader_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read",
+                                                   initializer=self._read_only)
+            self._writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    def _read_only(self):
+        with self.database.connection() as conn:
+            conn.execute("PRAGMA query_only = ON")
+
+    def _semaphores(self):
+        # Created lazily so they bind to the running loop
+        if self._limits is None:
+            self._limits = (asyncio.Semaphore(self.max_pending), asyncio.Semaphore(self.max_pending))
+        return self._limits
+
+    async def _call(self, write, method, *args, **kwargs):
+        if self.readers <= 0:
+            return method(*args, **kwargs)
+        pool = self._writer_pool if write else self._reader_pool
+        async with self._semaphores()[write]:
+            return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(method, *args, **kwargs))
+
+    async def read(self, fn, *args, **kwargs):
+        # Any other read-only callable, e.g. a lambda over several queries
+        return await self._call(False, fn, *args, **kwargs)
+
+    async def write(self, fn, *args, **kwargs):
+        return await self._call(True, fn, *args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in READ_METHODS or name in WRITE_METHODS:
+            method = getattr(self.database, name)
+            write = name in WRITE_METHODS
+
+            async def call(*args, **kwargs):
+                return await self._call(write, method, *args, **kwargs)
+
+            call.__name__ = name
+            setattr(self, name, call)
+            return call
+        raise AttributeError(name)
+
+    def close(self):
+        for pool in (self._reader_pool, self._writer_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
@@ -0,0 +1,85 @@
+import json
+import threading
+import uuid
+
+
+def dump_json(content):
+    # Same encoding as Starlette's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class TrainPayloadCache:
+    """Serialized JSON fragments per train plus assembled listing bodies.
+
+    ``invalidate(train_id)`` drops only that train's fragment; listing bodies
+    are reassembled from the remaining cached fragments on the next request.
+    ETags combine a per-process id with a generation counter bumped on every
+    invalidation, so a tag from before a mutation or a restart never matches.
+    """
+
+    def __init__(self, serialize, max_listings=256):
+        self.serialize = serialize
+        self.max_listings = max_listings
+        self.fragments = {}
+        self.listings = {}
+        self.generation = 0
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, train_id=None):
+        with self._lock:
+            if train_id is None:
+                self.fragments.clear()
+            else:
+                self.fragments.pop(train_id, None)
+            self.listings.clear()
+            self.generation += 1
+
+    def fragment(self, record):
+        fragment = self.fragments.get(record[0])
+        if fragment is None:
+            self.misses += 1
+            fragment = dump_json(self.serialize(record))
+            self.fragments[record[0]] = fragment
+        else:
+            self.hits += 1
+        return fragment
+
+    def etag(self, key, generation):
+        return f'W/"trains-{self.boot_id}-{generation}-{key}"'
+
+    def join(self, records):
+        return b"[" + b",".join(self.fragment(r) for r in records) + b"]"
+
+    async def listing(self, key, build_body):
+        # Returns (body, etag) for a listing query, awaiting build_body() only on a miss;
+        # the body is built off the cache lock, so a slow query doesn't hold up hits
+        cached, generation = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._store(key, generation, await build_body())
+
+    def _lookup(self, key):
+        with self._lock:
+            return self.listings.get(key), self.generation
+
+    def _store(self, key, generation, body):
+        result = (body, self.etag(key, generation))
+        with self._lock:
+            # Skip storing if a mutation landed while this body was being built
+            if generation == self.generation:
+                if len(self.listings) >= self.max_listings:
+                    self.listings.clear()
+                self.listings[key] = result
+        return result
+
+    def stats(self):
+        return {
+            "fragments": len(self.fragments),
+            "listings": len(self.listings),
+            "generation": self.generation,
+            "fragment_hits": self.hits,
+            "fragment_misses": self.misses,
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import date, datetime, timedelta
+
+ARCHIVE_DIR = os.environ.get("KMRL_ARCHIVE_DIR", "archive")
+
+# Days each rollup resolution is kept; None keeps it for good. A resolution must outlive the
+# longest range pick_resolution answers from it: 1000 one-minute buckets are under 17 hours and
+# 1000 fifteen-minute buckets under 11 days, so dropping them later never leaves a gap.
+ROLLUP_RETENTION_DAYS = {60: 2, 900: 14, 3600: None}
+
+
+def archive_days(since=None, until=None):
+    # Day partitions that can hold readings in [since, until)
+    return (since.date().isoformat() if since else "", until.date().isoformat() if until else date.max.isoformat())
+
+
+class SensorArchive:
+    """Raw sensor readings moved out of SQLite, as gzip-compressed CSV day files.
+
+    Every archiving step appends one gzip member with one train's readings
+    for one day to ``<directory>/sensor_data-<day>.csv.gz``; the database
+    records each member's offset and length in ``sensor_archive_segments``,
+    so reading one train back decompresses only that train's members. Bytes
+    past the last recorded member belong to a step that failed before its
+    database commit and are cut off by the next append.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, day):
+        return os.path.join(self.directory, f"sensor_data-{day}.csv.gz")
+
+    def append(self, day, offset, rows):
+        # Writes rows as one member at offset and returns its length; durable once this returns
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        data = gzip.compress(buffer.getvalue().encode("utf-8"), compresslevel=6)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(day)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(data)
+
+    def read(self, day, offset, length):
+        # Rows of one member, typed like sensor_data rows
+        with open(self.path(day), "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        return [
+            (int(row_id), int(train_id), sensor_type, float(value), unit, timestamp, int(is_anomaly))
+            for row_id, train_id, sensor_type, value, unit, timestamp, is_anomaly
+            in csv.reader(io.StringIO(data.decode("utf-8")))
+        ]
+
+    def scan(self, segments, since=None, until=None, sensor_type=None):
+        # Yields the matching rows of each (day, offset, length) segment as one list per segment.
+        # Timestamps compare as text, the way SQLite compares them in sensor_data.
+        since = str(since) if since is not None else None
+        until = str(until) if until is not None else None
+        for day, offset, length in segments:
+            rows = [
+                row for row in self.read(day, offset, length)
+                if (sensor_type is None or row[2] == sensor_type)
+                and (since is None or row[5] >= since) and (until is None or row[5] < until)
+            ]
+            if rows:
+                yield rows
+
+    def size(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".csv.gz"))
+
+
+class SensorRetention:
+    """Keeps the sensor tables to a fixed window without ever holding the write lock for long.
+
+    Database calls go through ``repository`` (an AsyncRepository), so
+    deletes queue on its writer thread like any other write. A run does
+    three things, each as a series of small steps with ``pause`` seconds
+    between them, so the ingestion writer gets the lock between every step:
+
+    - raw readings from before the last ``raw_days`` whole days go to the
+      archive, one train-day per step; their rollups are already in
+      ``sensor_rollups`` (they are written with the raw rows), so only the
+      individual readings move out
+    - rollups past ``ROLLUP_RETENTION_DAYS`` are deleted, ``chunk`` rows at a
+      time; the coarser resolutions still cover those periods
+    - pages freed by the deletes are returned to the file system with
+      ``PRAGMA incremental_vacuum``, ``vacuum_pages`` pages at a time
+
+    A run takes what is due now; everything it does is safe to interrupt
+    and picks up where it stopped on the next run.
+    """
+
+    def __init__(self, repository, archive, raw_days=7, rollup_days=ROLLUP_RETENTION_DAYS,
+                 chunk=5000, vacuum_pages=256, pause=0.05):
+        if raw_days < 1:
+            raise ValueError("Raw sensor readings must be kept for at least a day")
+        self.repo = repository
+        self.archive = archive
+        self.raw_days = raw_days
+        self.rollup_days = rollup_days
+        self.chunk = chunk
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.archived_rows = 0
+        self.archived_bytes = 0
+        self.expired_rollups = 0
+        self.vacuumed_pages = 0
+        self.last_run = None
+
+    def raw_cutoff(self, now=None):
+        # First day kept in sensor_data
+        return ((now or datetime.now()) - timedelta(days=self.raw_days)).date().isoformat()
+
+    async def run(self, now=None):
+        # One pass over everything that is due; concurrent calls wait for the pass in progress
+        async with self._lock:
+            now = now or datetime.now()
+            started = time.perf_counter()
+            summary = {"trainDays": 0, "archivedRows": 0, "archivedBytes": 0, "expiredRollups": 0, "vacuumedPages": 0}
+            cutoff = self.raw_cutoff(now)
+            for day, train_id in await self.repo.sensor_archive_candidates(cutoff):
+                rows, length = await self.archive_train_day(day, train_id)
+                summary["trainDays"] += 1
+                summary["archivedRows"] += rows
+                summary["archivedBytes"] += length
+                await asyncio.sleep(self.pause)
+
+            for resolution, days in self.rollup_days.items():
+                if days is None:
+                    continue
+                before = int((now - timedelta(days=days)).timestamp() // resolution) * resolution
+                while True:
+                    deleted = await self.repo.expire_sensor_rollups(resolution, before, self.chunk)
+                    summary["expiredRollups"] += deleted
+                    await asyncio.sleep(self.pause)
+                    if deleted < self.chunk:
+                        break
+
+            # Bounded by what was free at the start, so a busy writer can't keep the loop going
+            free = (await self.repo.storage_stats())["freePages"]
+            while free > 0:
+                freed = await self.repo.incremental_vacuum(min(free, self.vacuum_pages))
+                if not freed:
+                    break
+                summary["vacuumedPages"] += freed
+                free -= freed
+                await asyncio.sleep(self.pause)
+
+            self.runs += 1
+            self.archived_rows += summary["archivedRows"]
+            self.archived_bytes += summary["archivedBytes"]
+            self.expired_rollups += summary["expiredRollups"]
+            self.vacuumed_pages += summary["vacuumedPages"]
+            summary.update(rawCutoff=cutoff, elapsedMs=round((time.perf_counter() - started) * 1000, 2),
+                           finishedAt=datetime.now().isoformat())
+            self.last_run = summary
+            return summary
+
+    async def archive_train_day(self, day, train_id):
+        # Archive file first, then delete and record the segment in one transaction; returns (rows, bytes).
+        # Compression runs on its own thread, so the writer thread is only needed for the commit.
+        rows = await self.repo.read_sensor_day(train_id, day)
+        if not rows:
+            return 0, 0
+        offset = await self.repo.sensor_archive_end(day)
+        length = await asyncio.to_thread(self.archive.append, day, offset, rows)
+        await self.repo.commit_sensor_archive(day, train_id, rows, offset, length)
+        return len(rows), length
+
+    async def query(self, train_id, since=None, until=None, sensor_type=None, limit=None):
+        # Archived readings of one train, oldest first, as sensor_data rows
+        segments = await self.repo.sensor_archive_segments(train_id, *archive_days(since, until))
+
+        def scan():
+            found = [row for rows in self.archive.scan(segments, since, until, sensor_type) for row in rows]
+            found.sort(key=lambda row: (row[5], row[0]))
+            return found[:limit] if limit else found
+
+        return await asyncio.to_thread(scan)
+
+    def stats(self):
+        return {
+            "rawDays": self.raw_days,
+            "rollupDays": {str(resolution): days for resolution, days in self.rollup_days.items()},
+            "runs": self.runs,
+            "archivedRows": self.archived_rows,
+            "archivedBytes": self.archived_bytes,
+            "expiredRollups": self.expired_rollups,
+            "vacuumedPages": self.vacuumed_pages,
+            "archiveFileBytes": self.archive.size(),
+            "lastRun": self.last_run,
+        }
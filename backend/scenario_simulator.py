@@ -0,0 +1,278 @@
+import math
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+SCENARIOS = ("train_replacement", "branding_priority", "mileage_balancing", "shunting_cost")
+METRICS = ("availability", "delay_minutes", "shunting_moves", "mileage_spread")
+
+# Share of the fleet carrying wrap advertising per branding priority level
+BRANDING_SHARE = {1: 0.5, 2: 0.4, 3: 0.3}
+
+
+def fleet_arrays(trains, depots):
+    # trains: rows in trains-table column order; depots: (id, name, capacity, current_occupancy, ...) rows
+    depot_ids = [d[0] for d in depots]
+    depot_index = {depot_id: i for i, depot_id in enumerate(depot_ids)}
+    return {
+        "ids": np.array([t[0] for t in trains], dtype=np.int64),
+        "mileage": np.array([t[4] for t in trains], dtype=np.float64),
+        "health": np.array([t[6] for t in trains], dtype=np.float64),
+        "home": np.array([depot_index.get(t[5], 0) for t in trains], dtype=np.int64),
+        "in_shop": np.array([str(t[3]).lower() == "maintenance" for t in trains]),
+        # Free bays double as workshop slots
+        "slots": np.array([max(1, d[2] - d[3]) for d in depots] or [1], dtype=np.int64),
+    }
+
+
+def replicate(fleet, params, scenario, options, seed):
+    # One stochastic run of params["days"] days; scenario=None is the baseline.
+    # Every day draws the same fixed-shape random arrays whatever the scenario,
+    # so baseline and scenario runs from one seed see the same luck.
+    rng = np.random.default_rng(seed)
+    n = len(fleet["ids"])
+    days = params["days"]
+    mileage = fleet["mileage"].copy()
+    health = fleet["health"].copy()
+    home = fleet["home"]
+    free = fleet["slots"].copy()
+    down = fleet["in_shop"].copy()
+    bay = np.full(n, -1)
+    repair_left = np.zeros(n, dtype=np.int64)
+    repair_days = rng.geometric(1 / params["mean_repair_days"], size=n)
+    repair_left[down] = repair_days[down]
+    for i in np.flatnonzero(down):
+        bay[i] = home[i]
+        free[home[i]] -= 1  # trains already in maintenance hold their bay even past capacity
+
+    required = min(n, math.ceil(params["service_ratio"] * n))
+    wear = np.ones(n)
+    branded = np.zeros(n, dtype=bool)
+    moves = 0.0
+    delay = 0.0
+
+    if scenario == "train_replacement":
+        failed, replacement = options.get("train_index"), options.get("replacement_index")
+        if failed is not None and not down[failed]:
+            down[failed] = True
+            repair_left[failed] = repair_days[failed]
+        if replacement is not None and replacement != failed:
+            if down[replacement]:
+                # Released early from the workshop to cover the failed train
+                if bay[replacement] >= 0:
+                    free[bay[replacement]] += 1
+                down[replacement] = False
+                bay[replacement] = -1
+                repair_left[replacement] = 0
+            if failed is not None and home[replacement] != home[failed]:
+                moves += 2
+                delay += params["transfer_delay_minutes"]
+    elif scenario == "branding_priority":
+        share = BRANDING_SHARE.get(options.get("priority_level"), BRANDING_SHARE[1])
+        branded[:round(share * n)] = True
+        # Branded trains are kept in service, so preventive maintenance slips
+        wear[branded] = params["branding_wear"]
+
+    available_total = 0
+    in_service_prev = np.zeros(n, dtype=bool)
+    for _ in range(days):
+        # Failed trains waiting for a workshop bay
+        for i in np.flatnonzero(down & (bay < 0)):
+            target = home[i]
+            if free[target] <= 0:
+                if scenario != "shunting_cost" or free.max() <= 0:
+                    continue
+                # Repair wherever a bay is free instead of queueing at home
+                target = int(free.argmax())
+                moves += 2
+            bay[i] = target
+            free[target] -= 1
+            moves += 1
+            if repair_left[i] <= 0:
+                repair_left[i] = 1
+
+        available = np.flatnonzero(~down)
+        available_total += len(available)
+        if scenario == "mileage_balancing":
+            order = available[np.lexsort((fleet["ids"][available], mileage[available]))]
+        else:
+            order = available[np.lexsort((fleet["ids"][available], -health[available]))]
+        if branded.any():
+            order = np.concatenate([order[branded[order]], order[~branded[order]]])
+        in_service = np.zeros(n, dtype=bool)
+        in_service[order[:required]] = True
+        delay += max(0, required - len(available)) * params["shortfall_delay_minutes"]
+        # Trains swapped into the service roster need a shunting move out of the stabling line
+        moves += np.count_nonzero(in_service & ~in_service_prev)
+        in_service_prev = in_service
+
+        km = rng.uniform(0.8, 1.2, size=n) * params["daily_km"]
+        health_loss = rng.uniform(0, 0.6, size=n)
+        failure_draw = rng.random(size=n)
+        incident = rng.exponential(params["incident_delay_minutes"], size=n)
+        new_repairs = rng.geometric(1 / params["mean_repair_days"], size=n)
+
+        mileage[in_service] += km[in_service]
+        health[in_service] = np.maximum(health[in_service] - health_loss[in_service], 0)
+        p_fail = (params["base_failure_rate"] * wear * (1 + (100 - health) / 25)
+                  * (1 + np.maximum(mileage - 40000, 0) / 20000))
+        failed = in_service & (failure_draw < p_fail)
+        delay += incident[failed].sum()
+        down[failed] = True
+        bay[failed] = -1
+        repair_left[failed] = new_repairs[failed]
+
+        repairing = bay >= 0
+        repair_left[repairing] -= 1
+        done = repairing & (repair_left <= 0)
+        for i in np.flatnonzero(done):
+            free[bay[i]] += 1
+            if bay[i] != home[i]:
+                moves += 1  # back to the home depot
+        bay[done] = -1
+        down[done] = False
+        health[done] = np.maximum(health[done], 90)
+        moves += np.count_nonzero(done)
+
+    return (
+        available_total / (days * n) if n else 0.0,
+        delay / days,
+        moves / days,
+        float(mileage.std()) if n else 0.0,
+    )
+
+
+def run_chunk(fleet, params, scenario, options, seeds):
+    # [(baseline metrics, scenario metrics)] per seed; module level so worker processes can import it
+    return [
+        (replicate(fleet, params, None, options, seed), replicate(fleet, params, scenario, options, seed))
+        for seed in seeds
+    ]
+
+
+def summarize(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {"mean": None, "p5": None, "p95": None}
+    p5, p95 = np.percentile(values, [5, 95])
+    return {"mean": round(float(values.mean()), 4), "p5": round(float(p5), 4), "p95": round(float(p95), 4)}
+
+
+class ScenarioSimulator:
+    """Monte Carlo what-if engine for induction scenarios.
+
+    A replication plays ``days`` days of service for the real fleet: trains
+    wear and fail with a probability rising with lost health and mileage,
+    failures queue for workshop bays at their depot, and the service roster
+    is filled from whatever is available. Each replication runs the baseline
+    and the scenario from the same seed, so the difference between the two
+    comes from the scenario rather than from sampling noise.
+
+    Replications are split into chunks of ``chunk_size`` and run on a process
+    pool, so even small studies keep the CPU work off the API process
+    (``workers=0`` runs them inline). Seeds are spawned per replication
+    from the request seed, so results do not depend on the worker count. With
+    a time budget, the longest prefix of chunks finished in time is used,
+    which keeps a budgeted run reproducible for its replication count; the
+    first chunk is always waited for, so a cold pool still returns results.
+    """
+
+    def __init__(self, workers=None, chunk_size=25, days=14, service_ratio=0.75, base_failure_rate=0.01,
+                 mean_repair_days=3.0, daily_km=450.0, incident_delay_minutes=20.0,
+                 shortfall_delay_minutes=45.0, transfer_delay_minutes=30.0, branding_wear=1.5):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.params = {
+            "days": days,
+            "service_ratio": service_ratio,
+            "base_failure_rate": base_failure_rate,
+            "mean_repair_days": mean_repair_days,
+            "daily_km": daily_km,
+            "incident_delay_minutes": incident_delay_minutes,
+            "shortfall_delay_minutes": shortfall_delay_minutes,
+            "transfer_delay_minutes": transfer_delay_minutes,
+            "branding_wear": branding_wear,
+        }
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn rather than fork: the API process runs writer and event-loop threads
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def run(self, trains, depots, scenario, replications=500, seed=None, time_budget=None, days=None,
+            progress=None, **options):
+        # options: train_index / replacement_index (positions in trains) or priority_level.
+        # progress(fraction) is called as chunks finish; an exception from it aborts the run.
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {scenario}; use one of {', '.join(SCENARIOS)}")
+        started = time.perf_counter()
+        deadline_at = started + time_budget if time_budget else None
+        if seed is None:
+            # Report a seed small enough to round-trip through JSON clients
+            seed = int(np.random.SeedSequence().entropy % 2 ** 53)
+        seed_sequence = np.random.SeedSequence(seed)
+        seeds = seed_sequence.spawn(replications)
+        chunks = [seeds[i:i + self.chunk_size] for i in range(0, replications, self.chunk_size)]
+        fleet = fleet_arrays(trains, depots)
+        params = dict(self.params, days=days or self.params["days"])
+        args = (fleet, params, scenario, options)
+
+        results = [None] * len(chunks)
+        if self.workers == 0:
+            for i, chunk in enumerate(chunks):
+                if deadline_at and i and time.perf_counter() > deadline_at:
+                    break
+                results[i] = run_chunk(*args, chunk)
+                if progress:
+                    progress((i + 1) / len(chunks))
+        else:
+            pool = self._executor()
+            futures = {pool.submit(run_chunk, *args, chunk): i for i, chunk in enumerate(chunks)}
+            pending = set(futures)
+            try:
+                while pending:
+                    timeout = None
+                    if deadline_at:
+                        remaining = deadline_at - time.perf_counter()
+                        if remaining <= 0 and results[0] is not None:
+                            break
+                        # Past the deadline without the first chunk: block until a chunk finishes
+                        # rather than polling with a zero timeout
+                        timeout = remaining if remaining > 0 else None
+                    done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[futures[future]] = future.result()
+                    if progress:
+                        progress(1 - len(pending) / len(chunks))
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        completed = []
+        for chunk_results in results:
+            if chunk_results is None:
+                break  # only a contiguous prefix is reproducible
+            completed.extend(chunk_results)
+
+        baseline = np.array([pair[0] for pair in completed]).reshape(-1, len(METRICS))
+        outcome = np.array([pair[1] for pair in completed]).reshape(-1, len(METRICS))
+        return {
+            "scenario_type": scenario,
+            "seed": seed,
+            "days": params["days"],
+            "replications": len(completed),
+            "replications_requested": replications,
+            "budget_exhausted": len(completed) < replications,
+            "baseline": {name: summarize(baseline[:, i]) for i, name in enumerate(METRICS)},
+            "scenario": {name: summarize(outcome[:, i]) for i, name in enumerate(METRICS)},
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
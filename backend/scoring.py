@@ -0,0 +1,88 @@
+import heapq
+from datetime import date, datetime
+
+import numpy as np
+
+
+class PriorityScorer:
+    """Induction priority of a train, and top-k selection over a fleet.
+
+    The score is a weighted sum of mileage (relative to ``mileage_limit``),
+    lost health and urgency (days until the next maintenance date, relative
+    to ``horizon_days``). With the default weights it ranges from 0 to 100.
+    ``top_k`` never sorts the whole fleet: small fleets go through a bounded
+    heap, and fleets of ``vectorize_above`` trains or more are scored as
+    numpy arrays and cut with ``np.partition``. Both paths return the same
+    order: highest score first, lowest train id first on ties.
+    """
+
+    def __init__(self, mileage_weight=40.0, health_weight=30.0, urgency_weight=30.0,
+                 mileage_limit=50000, horizon_days=30, vectorize_above=4096):
+        self.mileage_weight = mileage_weight
+        self.health_weight = health_weight
+        self.urgency_weight = urgency_weight
+        self.mileage_limit = mileage_limit
+        self.horizon_days = horizon_days
+        self.vectorize_above = vectorize_above
+
+    def score(self, mileage, health_score, days_to_due):
+        mileage_factor = min(mileage / self.mileage_limit, 1.0) * self.mileage_weight
+        health_factor = (100 - health_score) / 100 * self.health_weight
+        urgency_factor = (1 - min(max(days_to_due, 0) / self.horizon_days, 1.0)) * self.urgency_weight
+        return mileage_factor + health_factor + urgency_factor
+
+    def scores(self, mileage, health_score, days_to_due):
+        # Same arithmetic as score(), one numpy op per term, so both paths agree bit for bit
+        mileage_factor = np.minimum(mileage / self.mileage_limit, 1.0) * self.mileage_weight
+        health_factor = (100 - health_score) / 100 * self.health_weight
+        urgency_factor = (1 - np.minimum(np.maximum(days_to_due, 0) / self.horizon_days, 1.0)) * self.urgency_weight
+        return mileage_factor + health_factor + urgency_factor
+
+    def days_to_due(self, next_maintenance, today):
+        # Day index of the due date (0 = tomorrow); no date means outside the horizon
+        if next_maintenance is None or next_maintenance == "":
+            return self.horizon_days
+        if isinstance(next_maintenance, datetime):
+            due = next_maintenance.date()
+        elif isinstance(next_maintenance, date):
+            due = next_maintenance
+        else:
+            due = date.fromisoformat(str(next_maintenance)[:10])
+        return (due - today).days - 1
+
+    def score_row(self, row, today=None):
+        # row: trains-table column order
+        return self.score(row[4], row[6], self.days_to_due(row[8], today or date.today()))
+
+    def top_k(self, trains, k, today=None):
+        # [(score, row)] for the k highest-priority trains
+        today = today or date.today()
+        trains = trains if isinstance(trains, list) else list(trains)
+        if k <= 0 or not trains:
+            return []
+        if len(trains) >= self.vectorize_above:
+            return self._top_k_vectorized(trains, k, today)
+        scored = ((self.score_row(row, today), row) for row in trains)
+        return heapq.nsmallest(k, scored, key=lambda pair: (-pair[0], pair[1][0]))
+
+    def _top_k_vectorized(self, trains, k, today):
+        n = len(trains)
+        ids = np.fromiter((row[0] for row in trains), dtype=np.int64, count=n)
+        mileage = np.fromiter((row[4] for row in trains), dtype=np.float64, count=n)
+        health = np.fromiter((row[6] for row in trains), dtype=np.float64, count=n)
+        due = np.array([str(row[8])[:10] if row[8] else "NaT" for row in trains], dtype="datetime64[D]")
+        days = (due - np.datetime64(today, "D")).astype(np.int64) - 1
+        days = np.where(np.isnat(due), self.horizon_days, days)
+        scores = self.scores(mileage, health, days)
+
+        if k < n:
+            # Everything strictly above the k-th largest score, then ties on it by lowest id
+            kth = np.partition(scores, n - k)[n - k]
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)
+            tied = tied[np.argsort(ids[tied], kind="stable")][:k - len(above)]
+            selected = np.concatenate([above, tied])
+        else:
+            selected = np.arange(n)
+        order = selected[np.lexsort((ids[selected], -scores[selected]))]
+        return [(float(scores[i]), trains[i]) for i in order]
@@ -0,0 +1,100 @@
+import numpy as np
+
+# Simulated sensors: name, unit and the uniform range readings are drawn from
+SENSOR_PROFILES = [
+    ("temperature", "°C", 60.0, 95.0),
+    ("vibration", "mm/s", 1.0, 5.0),
+    ("pressure", "bar", 6.0, 10.0),
+]
+
+# Anomaly thresholds per train model as (low, high); None means unbounded.
+# "default" applies to models that are not listed, and to sensors a model does not override.
+MODEL_THRESHOLDS = {
+    "default": {
+        "temperature": (None, 90.0),
+        "vibration": (None, 4.0),
+        "pressure": (6.0, 10.0),
+    },
+    "Metro-A1": {
+        "temperature": (None, 88.0),
+    },
+    "Metro-B2": {
+        "vibration": (None, 3.5),
+        "pressure": (6.5, 10.0),
+    },
+    "Metro-C3": {
+        "temperature": (None, 92.0),
+        "vibration": (None, 4.5),
+    },
+}
+
+
+def threshold_for(model, sensor, thresholds=MODEL_THRESHOLDS):
+    overrides = thresholds.get(model, {})
+    if sensor in overrides:
+        return overrides[sensor]
+    return thresholds["default"].get(sensor, (None, None))
+
+
+class FleetSensorSimulator:
+    """Generates and checks one reading per train and sensor as NumPy arrays.
+
+    Threshold and range matrices are built once per fleet layout, so a tick is
+    a handful of array operations regardless of fleet size.
+    """
+
+    def __init__(self, trains, sensors=SENSOR_PROFILES, thresholds=MODEL_THRESHOLDS, seed=None):
+        # trains: (train_id, model, depot_id) tuples
+        self.train_ids = [t[0] for t in trains]
+        self.depot_ids = [t[2] for t in trains]
+        self.sensor_names = [s[0] for s in sensors]
+        self.units = [s[1] for s in sensors]
+        self.rng = np.random.default_rng(seed)
+
+        self.range_low = np.array([s[2] for s in sensors])
+        self.range_span = np.array([s[3] - s[2] for s in sensors])
+
+        # Per-model threshold rows, then one row per train by model index. A train without a model
+        # (a NULL in the trains table) gets the "default" thresholds.
+        train_models = [t[1] if t[1] is not None else "default" for t in trains]
+        models = list(dict.fromkeys(train_models))
+        model_index = {model: i for i, model in enumerate(models)}
+        low = np.full((len(models), len(sensors)), -np.inf)
+        high = np.full((len(models), len(sensors)), np.inf)
+        for i, model in enumerate(models):
+            for j, sensor in enumerate(self.sensor_names):
+                lo, hi = threshold_for(model, sensor, thresholds)
+                if lo is not None:
+                    low[i, j] = lo
+                if hi is not None:
+                    high[i, j] = hi
+        rows = np.array([model_index[model] for model in train_models], dtype=np.intp)
+        self.low = low[rows]
+        self.high = high[rows]
+
+    def __len__(self):
+        return len(self.train_ids)
+
+    def step(self):
+        # values and anomalies have shape (trains, sensors)
+        values = self.range_low + self.rng.random((len(self.train_ids), len(self.sensor_names))) * self.range_span
+        anomalies = (values < self.low) | (values > self.high)
+        return values, anomalies
+
+    def to_readings(self, values, anomalies, timestamp):
+        # Rows for SensorIngestionPipeline / INSERT_SENSOR_DATA
+        readings = []
+        for train_id, row, flags in zip(self.train_ids, values.tolist(), anomalies.tolist()):
+            for sensor, unit, value, flag in zip(self.sensor_names, self.units, row, flags):
+                readings.append((train_id, sensor, value, unit, timestamp, flag))
+        return readings
+
+    def to_updates(self, values, timestamp):
+        # Per-train payloads for BroadcastHub.publish_updates
+        iso = timestamp.isoformat()
+        updates = []
+        for train_id, depot_id, row in zip(self.train_ids, self.depot_ids, values.tolist()):
+            data = dict(zip(self.sensor_names, row))
+            data["timestamp"] = iso
+            updates.append({"train_id": train_id, "depot_id": depot_id, "data": data})
+        return updates
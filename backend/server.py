@@ -0,0 +1,1176 @@
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import date, datetime, timedelta
+import asyncio
+import os
+import math
+import sqlite3
+import time
+from database import db as history_db  # Sensor/alert history and the persisted trains table
+from fleet_store import FleetStore
+from fleet_import import FleetImport, RecordStreamParser
+from repository import AsyncRepository
+from event_bus import EventBus
+from fleet_sync import FleetSync
+from ingestion import SensorIngestionPipeline
+from broadcast import BroadcastHub
+from sensor_simulator import FleetSensorSimulator
+from anomaly_detector import StreamingAnomalyDetector
+from response_cache import TrainPayloadCache, dump_json
+from train_query import MAX_PAGE_SIZE, encode_cursor, project
+from induction_optimizer import InductionOptimizer
+from induction_plan import MaterializedInductionPlan
+from dashboard import DashboardAggregate, DashboardMirror
+from scenario_simulator import SCENARIOS, ScenarioSimulator
+from jobs import JobCancelled, JobQueue
+from reports import REPORT_TYPES, build_report
+from analytics import ANALYTICS_PERIODS, bucket_range, cost_summary, performance_series
+from predictive import PredictiveMaintenance
+from metrics import MetricsMiddleware, MetricsRegistry, sample_loop_lag
+from report_export import EXPORT_DATASETS, EXPORT_FORMATS, export_filename, export_filters, export_to_file, stream_export
+from retention import ARCHIVE_DIR, SensorArchive, SensorRetention
+
+# In-memory fleet with hash indexes by id, train number, status, depot and model,
+# loaded from the trains table so imported trains and database-assigned ids carry over
+db = FleetStore()
+db.load(history_db.get_trains())
+
+# Handlers await the database through this: reads on a small thread pool, writes on one writer thread
+repo = AsyncRepository(history_db, readers=int(os.environ.get("KMRL_DB_READERS", 4)))
+
+# Events between the workers of a multi-process deployment, over the Unix socket in KMRL_BUS_SOCKET
+# (a local bus otherwise). The bus owner alone runs ingestion, the sensor generator and scheduled predictions.
+bus = EventBus(os.environ.get("KMRL_BUS_SOCKET"))
+
+# Trains changed by any worker are re-read from the trains table by every worker
+fleet_sync = FleetSync(db, repo.get_trains_by_id)
+
+def publish_trains(ids):
+    bus.publish("trains", {"ids": list(ids)})
+
+def on_trains_changed(data, local):
+    # A single process already holds its own changes; with peers, the re-read orders them against theirs
+    if bus.path is not None or not local:
+        fleet_sync.request(data["ids"])
+
+bus.subscribe("trains", on_trains_changed)
+
+app = FastAPI(title="KMRL Train Management API", version="1.0.0")
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Allow all origins for development
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Prometheus metrics on /metrics: per-route latency and response size, event-loop lag, pipeline timings
+# and database call times. Figures other components already keep are read only when scraped.
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+loop_lag = metrics.histogram("event_loop_lag_seconds", "How late the event loop woke a sleeping task; anything blocking the loop shows here.")
+loop_lag_last = metrics.gauge("event_loop_lag_last_seconds", "The latest event loop lag sample.")
+background_errors = metrics.counter("background_errors_total", "Exceptions caught in background loops.", ("task",))
+sensor_tick = metrics.histogram("sensor_tick_seconds", "One sensor generator tick: simulate, publish and enqueue, excluding the sleep.")
+sensor_readings = metrics.counter("sensor_readings_generated_total", "Sensor readings produced by the generator.")
+sensor_flush = metrics.histogram("sensor_flush_seconds", "Persisting one ingestion batch: insert, rollups and anomaly detection.")
+ws_fanout = metrics.histogram("ws_fanout_seconds", "Routing and serializing one broadcast for this worker's WebSocket clients.", ("type",))
+ws_send = metrics.histogram("ws_send_seconds", "Writing one frame to a WebSocket.")
+prediction_runs = metrics.histogram("prediction_run_seconds", "One predictive maintenance batch over the whole fleet.",
+                                    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+db_calls = metrics.histogram("db_call_seconds", "KMRLDatabase method durations.", ("method",))
+db_slow_calls = metrics.counter("db_slow_calls_total", "KMRLDatabase calls that took KMRL_SLOW_QUERY_MS or longer.", ("method",))
+SLOW_QUERY_SECONDS = float(os.environ.get("KMRL_SLOW_QUERY_MS", 100)) / 1000
+
+def observe_query(method, seconds):
+    db_calls.labels(method).observe(seconds)
+    if seconds >= SLOW_QUERY_SECONDS:
+        db_slow_calls.labels(method).inc()
+
+history_db.observe_query = observe_query
+
+# Data models
+class Train(BaseModel):
+    train_number: str
+    model: str
+    depot_id: int
+    current_mileage: int
+
+# Body of PUT /api/trains/{train_id}: every field optional, types checked and coerced before anything is stored
+class TrainUpdate(BaseModel):
+    trainNumber: Optional[str] = None
+    model: Optional[str] = None
+    status: Optional[str] = None
+    mileage: Optional[int] = Field(None, ge=0)
+    healthScore: Optional[int] = Field(None, ge=0, le=100)
+    lastMaintenance: Optional[date] = None
+    nextMaintenance: Optional[date] = None
+    manufacturer: Optional[str] = None
+    yearOfManufacture: Optional[int] = Field(None, ge=1900, le=2100)
+    currentDepot: Optional[str] = None
+
+class InductionPlan(BaseModel):
+    train_id: int
+    train_number: str
+    priority_score: float
+    scheduled_date: str
+    depot_id: int
+    reasoning: str
+
+# WebSocket connections for real-time updates
+hub = BroadcastHub(queue_size=32, slow_client_policy="drop_oldest", observe_send=ws_send.observe)
+
+# Seconds between simulated sensor ticks for the whole fleet
+SENSOR_TICK_SECONDS = float(os.environ.get("KMRL_SENSOR_TICK_SECONDS", 5))
+
+# Rolling per-train/per-sensor statistics; alerts on z-score and rate-of-change excursions
+detector = StreamingAnomalyDetector()
+
+def persist_sensor_batch(readings):
+    # Runs on the ingestion writer thread, once per flushed batch
+    with sensor_flush.time():
+        history_db.add_sensor_data_batch(readings)
+        dashboard.record_readings(readings)
+        alerts = detector.process(readings)
+        if alerts:
+            history_db.add_alerts(alerts)
+
+# Sensor readings are buffered and written to SQLite in batches by a writer thread
+ingestion = SensorIngestionPipeline(persist_sensor_batch, capacity=50000, batch_size=1000, flush_interval=1.0)
+
+DEPOT_NAMES = ["Aluva Depot", "Pettah Depot", "Kalamassery Depot"]
+
+# Frontend field names accepted by PUT /api/trains/{train_id}
+TRAIN_UPDATE_FIELDS = {
+    "trainNumber": "train_number",
+    "model": "model",
+    "status": "status",
+    "mileage": "mileage",
+    "healthScore": "health_score",
+    "lastMaintenance": "last_maintenance",
+    "nextMaintenance": "next_maintenance",
+    "manufacturer": "manufacturer",
+    "yearOfManufacture": "year_manufactured",
+}
+
+# Helper function to convert database row to dict
+def train_row_to_dict(row):
+    return {
+        "id": row[0],
+        "trainNumber": row[1],
+        "model": row[2],
+        "status": row[3],
+        "mileage": row[4],
+        "currentDepot": DEPOT_NAMES[row[5] - 1],
+        "healthScore": row[6],
+        "lastMaintenance": str(row[7]),
+        "nextMaintenance": str(row[8]),
+        "manufacturer": row[9],
+        "yearOfManufacture": row[10],
+        "capacity": 1200,
+        "maxSpeed": 80,
+        "powerType": "Electric",
+        "airConditioning": "Yes",
+        "wifiEnabled": True,
+        "cctv": 8,
+        "emergencyBrakes": "Functional",
+        "doorSystem": "Automatic",
+        "totalServiceHours": (row[4] or 0) * 2
+    }
+
+def alert_row_to_dict(row):
+    return {
+        "id": row[0],
+        "trainId": f"KMRL-{str(row[1]).zfill(3)}",
+        "type": row[2],
+        "title": row[3],
+        "description": row[4],
+        "status": row[5],
+        "priority": row[6],
+        "timestamp": str(row[7])[:16],
+        "acknowledgedAt": row[8],
+        "resolvedAt": row[9]
+    }
+
+# Pre-serialized train payloads; a mutation only re-encodes the train it touched
+train_cache = TrainPayloadCache(train_row_to_dict)
+db.add_listener(train_cache.invalidate)
+
+# Dashboard figures maintained per train change and per sensor batch, pushed to /ws clients.
+# Other workers serve the snapshots the bus owner publishes.
+dashboard = DashboardAggregate(db, history_db)
+db.add_listener(dashboard.on_train_changed)
+dashboard_mirror = DashboardMirror()
+DASHBOARD_PUSH_SECONDS = 1.0
+
+def current_dashboard():
+    return dashboard if bus.owner or dashboard_mirror.version is None else dashboard_mirror
+
+def on_dashboard_update(snapshot, local):
+    if not local:
+        dashboard_mirror.adopt(snapshot)
+    if len(hub):
+        with ws_fanout.labels("dashboard_update").time():
+            hub.broadcast(dump_json({"type": "dashboard_update", "data": snapshot}).decode("utf-8"))
+
+bus.subscribe("dashboard_update", on_dashboard_update)
+
+# Current induction plan, re-planned per train on every fleet mutation instead of per request
+induction_plan = MaterializedInductionPlan(db, history_db.get_depots, InductionOptimizer())
+db.add_listener(induction_plan.on_train_changed)
+
+async def rebuild_induction_plan(horizon, time_budget):
+    # The optimizer runs on a thread; the plan keeps serving reads and fleet updates meanwhile
+    try:
+        return await asyncio.to_thread(
+            induction_plan.rebuild, time_budget=time_budget, optimizer=InductionOptimizer(horizon_days=horizon))
+    except Exception as e:
+        background_errors.labels("induction_plan").inc()
+        print(f"Error rebuilding induction plan: {e}")
+
+def on_plan_generated(data, local):
+    # Every worker plans with the same horizon, so GET /api/induction/plan agrees whichever one answers
+    if not local:
+        asyncio.create_task(rebuild_induction_plan(data["horizon"], data["timeBudget"]))
+
+bus.subscribe("induction_plan", on_plan_generated)
+
+# Monte Carlo what-if studies run on a process pool, started on first use
+scenario_simulator = ScenarioSimulator(workers=int(os.environ.get("KMRL_SIM_WORKERS", os.cpu_count() or 1)))
+
+# Background jobs; reports move to worker processes when KMRL_JOB_PROCESSES > 0
+jobs = JobQueue(processes=int(os.environ.get("KMRL_JOB_PROCESSES", 0)))
+jobs.register("report", build_report, concurrency=2, process=True)
+jobs.register("export", export_to_file, concurrency=2, process=True)
+jobs.register("analytics-backfill", lambda params, progress: history_db.backfill_analytics_rollups(params.get("since")))
+
+# Predicted health and remaining useful life, refreshed in the background and never on a request
+predictor = PredictiveMaintenance(db, history_db)
+PREDICTION_INTERVAL_SECONDS = float(os.environ.get("KMRL_PREDICT_SECONDS", 900))
+prediction_lock = asyncio.Lock()
+
+async def run_predictions():
+    # Inference and the trains-table write run on a worker thread; fleet updates land on the event loop
+    async with prediction_lock:
+        started = time.perf_counter()
+        version, rows = await asyncio.to_thread(predictor.score, predictor.snapshot())
+        result = predictor.apply(version, rows)
+        prediction_runs.observe(time.perf_counter() - started)
+        bus.publish("predictions", {"modelVersion": version})
+        return result
+
+async def load_predictions(version=None):
+    # Takes over the stored results of a run made by another worker
+    rows = await repo.get_train_predictions()
+    if rows:
+        predictor.apply(version, rows)
+
+def on_predictions(data, local):
+    if not local:
+        asyncio.create_task(load_predictions(data["modelVersion"]))
+
+bus.subscribe("predictions", on_predictions)
+
+async def schedule_predictions():
+    while True:
+        try:
+            await run_predictions()
+        except Exception as e:
+            background_errors.labels("predictions").inc()
+            print(f"Error running predictive maintenance: {e}")
+        await asyncio.sleep(PREDICTION_INTERVAL_SECONDS)
+
+# Raw readings older than KMRL_RAW_RETENTION_DAYS whole days move to compressed day files in the
+# archive; expired rollups and the pages they free are trimmed in small steps on the bus owner
+retention = SensorRetention(repo, SensorArchive(ARCHIVE_DIR), raw_days=int(os.environ.get("KMRL_RAW_RETENTION_DAYS", 7)))
+RETENTION_INTERVAL_SECONDS = float(os.environ.get("KMRL_RETENTION_SECONDS", 3600))
+
+async def schedule_retention():
+    while True:
+        try:
+            await retention.run()
+        except Exception as e:
+            background_errors.labels("retention").inc()
+            print(f"Error running sensor retention: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+
+def on_retention_run(data, local):
+    # Archive files are only written by the owner, whichever worker was asked
+    if bus.owner and not local:
+        asyncio.create_task(retention.run())
+
+bus.subscribe("retention_run", on_retention_run)
+
+# Publishes the dashboard aggregate to every worker's WebSocket clients whenever it has changed
+async def push_dashboard_updates():
+    pushed_version = None
+    while True:
+        try:
+            if (len(hub) or bus.peers) and dashboard.version != pushed_version:
+                snapshot = dashboard.snapshot()
+                pushed_version = snapshot["version"]
+                bus.publish("dashboard_update", snapshot)
+        except Exception as e:
+            background_errors.labels("dashboard_push").inc()
+            print(f"Error pushing dashboard update: {e}")
+        await asyncio.sleep(DASHBOARD_PUSH_SECONDS)
+
+# Background task for real-time sensor data generation
+async def generate_sensor_data():
+    simulator = None
+    while True:
+        try:
+            started = time.perf_counter()
+            trains = db.get_trains()
+            fleet = [(t[0], t[2], t[5]) for t in trains]
+            if simulator is None or simulator.train_ids != [t[0] for t in fleet]:
+                simulator = FleetSensorSimulator(fleet)
+            
+            # Generate and threshold-check every train's sensors in one vectorized step
+            values, anomalies = simulator.step()
+            now = datetime.now()
+            
+            # Every worker sends its clients one frame per tick, with only the trains and sensors they subscribed to
+            if len(hub) or bus.peers:
+                bus.publish("sensor_batch", {"timestamp": now.isoformat(), "updates": simulator.to_updates(values, now)})
+            
+            # Waits here (off the event loop) only if the writer has fallen behind
+            readings = simulator.to_readings(values, anomalies, now)
+            await ingestion.aput_many(readings, timeout=SENSOR_TICK_SECONDS)
+            sensor_readings.inc(len(readings))
+            sensor_tick.observe(time.perf_counter() - started)
+            await asyncio.sleep(SENSOR_TICK_SECONDS)
+        except Exception as e:
+            background_errors.labels("sensor_generator").inc()
+            print(f"Error in sensor data generation: {e}")
+            await asyncio.sleep(SENSOR_TICK_SECONDS)
+
+def on_sensor_batch(data, local):
+    with ws_fanout.labels("sensor_batch").time():
+        hub.publish_updates("sensor_batch", data["timestamp"], data["updates"])
+
+bus.subscribe("sensor_batch", on_sensor_batch)
+
+# Scraped figures that other components already keep
+def register_component_metrics():
+    def field(read, key):
+        return lambda: read()[key]
+
+    def per_job_type(key):
+        return lambda: {(job_type,): counts[key] for job_type, counts in jobs.stats()["types"].items()}
+
+    metrics.gauge_callback("fleet_trains", "Trains in this worker's fleet.", lambda: len(db))
+    metrics.gauge_callback("ws_clients", "Connected WebSocket clients.", lambda: len(hub))
+    metrics.gauge_callback("ws_queued_frames", "Frames waiting in WebSocket client queues.", field(hub.stats, "queued"))
+    metrics.counter_callback("ws_frames_sent_total", "Frames written to WebSocket clients.", lambda: hub.sent)
+    metrics.counter_callback("ws_frames_dropped_total", "Frames dropped for slow WebSocket clients.", lambda: hub.dropped)
+    metrics.counter_callback("ws_disconnects_total", "WebSocket clients disconnected.", lambda: hub.disconnected)
+    metrics.gauge_callback("ingestion_queued_readings", "Sensor readings waiting for the ingestion writer.", field(ingestion.stats, "queued"))
+    metrics.gauge_callback("ingestion_capacity_readings", "Ingestion buffer capacity.", lambda: ingestion.capacity)
+    for key in ("accepted", "flushed", "dropped", "failed", "batches"):
+        metrics.counter_callback(f"ingestion_{key}_total", f"Sensor ingestion counter: {key}.", field(ingestion.stats, key))
+    metrics.counter_callback("anomalies_detected_total", "Readings flagged by the streaming anomaly detector.", lambda: detector.anomalies_found)
+    metrics.gauge_callback("jobs_queued", "Background jobs waiting, by type.", per_job_type("queued"), ("type",))
+    metrics.gauge_callback("jobs_running", "Background jobs running, by type.", per_job_type("running"), ("type",))
+    metrics.counter_callback("jobs_finished_total", "Background jobs finished, by outcome.",
+                             lambda: {(status,): count for status, count in jobs.stats()["finished"].items()}, ("status",))
+    metrics.counter_callback("train_cache_hits_total", "Train payloads served from the fragment cache.", lambda: train_cache.hits)
+    metrics.counter_callback("train_cache_misses_total", "Train payloads encoded on a cache miss.", lambda: train_cache.misses)
+    metrics.counter_callback("induction_plan_rebuilds_total", "Full induction plan rebuilds.", lambda: induction_plan.rebuilds)
+    metrics.counter_callback("induction_plan_updates_total", "Incremental induction plan updates.", lambda: induction_plan.updates)
+    metrics.gauge_callback("bus_owner", "1 in the worker that owns the event bus.", lambda: int(bus.owner))
+    metrics.gauge_callback("bus_peers", "Workers connected to this bus owner.", lambda: len(bus.peers))
+    metrics.gauge_callback("bus_outbox_events", "Events waiting for a connection to the bus owner.", field(bus.stats, "outbox"))
+    metrics.counter_callback("bus_events_published_total", "Events this worker published.", lambda: bus.published)
+    metrics.counter_callback("bus_events_received_total", "Events received from the bus socket.", lambda: bus.received)
+    metrics.counter_callback("bus_workers_evicted_total", "Workers dropped for falling too far behind.", lambda: bus.evicted)
+    metrics.gauge_callback("fleet_sync_pending", "Train ids waiting to be re-read from the trains table.", field(fleet_sync.stats, "pending"))
+    metrics.counter_callback("retention_archived_readings_total", "Raw sensor readings moved to the archive.", lambda: retention.archived_rows)
+    metrics.counter_callback("retention_archived_bytes_total", "Compressed bytes written to the archive.", lambda: retention.archived_bytes)
+    metrics.counter_callback("retention_expired_rollups_total", "Sensor rollups deleted past their retention.", lambda: retention.expired_rollups)
+    metrics.counter_callback("retention_vacuumed_pages_total", "Database pages released by incremental vacuum.", lambda: retention.vacuumed_pages)
+    metrics.gauge_callback("sqlite_pages", "Pages in the database file.", field(history_db.storage_stats, "pages"))
+    metrics.gauge_callback("sqlite_free_pages", "Free pages waiting for reuse or incremental vacuum.", field(history_db.storage_stats, "freePages"))
+
+register_component_metrics()
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/health")
+async def health_check():
+    return {
+        "status": "healthy", 
+        "timestamp": datetime.now().isoformat(),
+        "trains_count": len(db),
+        "message": "Backend is running with sample data"
+    }
+
+@app.get("/api/ingestion/stats")
+async def get_ingestion_stats():
+    return {"success": True, "data": dict(ingestion.stats(), detector=detector.stats())}
+
+@app.get("/api/ws/stats")
+async def get_websocket_stats():
+    return {"success": True, "data": dict(hub.stats(), bus=bus.stats(), fleetSync=fleet_sync.stats())}
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return {"success": True, "data": dict(train_cache.stats(), induction_plan=induction_plan.stats())}
+
+@app.get("/api/test")
+async def test_endpoint():
+    return {"message": "Backend is working", "trains": len(db)}
+
+@app.get("/api/trains")
+async def get_trains(
+    request: Request,
+    status: Optional[str] = None,
+    depot: Optional[int] = None,
+    model: Optional[str] = None,
+    manufacturer: Optional[str] = None,
+    minHealth: Optional[int] = None,
+    maxHealth: Optional[int] = None,
+    minMileage: Optional[int] = None,
+    maxMileage: Optional[int] = None,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    projection = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    
+    async def build_body():
+        # Filters, sort and keyset pagination run in SQLite on a reader thread, against the indexed
+        # trains table every worker's fleet follows; only cache misses reach the database
+        trains_raw = await repo.get_trains(
+            status, depot_id=depot, model=model, manufacturer=manufacturer,
+            min_health=minHealth, max_health=maxHealth, min_mileage=minMileage, max_mileage=maxMileage,
+            sort=sort or "id", limit=limit, cursor=cursor
+        )
+        next_cursor = encode_cursor(sort or "id", trains_raw[-1]) if limit and len(trains_raw) == limit else None
+        if projection:
+            data = dump_json([project(train_row_to_dict(train), projection) for train in trains_raw])
+        else:
+            data = train_cache.join(trains_raw)
+        return b'{"success":true,"data":' + data + b',"nextCursor":' + dump_json(next_cursor) + b"}"
+    
+    try:
+        key = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.items()))
+        body, etag = await train_cache.listing(key or "*", build_body)
+        # Polling dashboards send back the last ETag and get a bodiless 304 while nothing changed
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/trains")
+async def create_train(train: Train):
+    if not 1 <= train.depot_id <= len(DEPOT_NAMES):
+        raise HTTPException(status_code=400, detail="Unknown depot")
+    if db.get_train_by_number(train.train_number) is not None:
+        raise HTTPException(status_code=409, detail=f"Train number {train.train_number} already exists")
+    try:
+        # SQLite assigns the id, so concurrent creates and bulk imports cannot collide
+        row = await repo.insert_train(
+            train_number=train.train_number,
+            model=train.model,
+            status="Available",
+            mileage=train.current_mileage,
+            depot_id=train.depot_id,
+            health_score=100,
+            last_maintenance=datetime.now().strftime("%Y-%m-%d"),
+            next_maintenance=(datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+        )
+        record = db.upsert(row)
+    except (ValueError, sqlite3.IntegrityError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    publish_trains([record.id])
+    return {"success": True, "message": "Train created successfully", "data": train_row_to_dict(record)}
+
+@app.post("/api/trains/import")
+async def import_trains(request: Request, batchSize: int = 1000):
+    # Body: a JSON array of train objects (sample_trains_dataset.json) or NDJSON, parsed as it streams in.
+    # Each batch is upserted by train number in one transaction off the event loop, then mirrored into the fleet.
+    if not 1 <= batchSize <= 10000:
+        raise HTTPException(status_code=400, detail="batchSize must be between 1 and 10000")
+    importer = FleetImport(await repo.get_depots(), batch_size=batchSize)
+    parser = RecordStreamParser()
+    pending = []
+
+    async def write(batch):
+        inserted, updated, rows, rejected = await repo.upsert_trains(batch)
+        for row, message in rejected:
+            importer.error(row["row"], message, row["train_number"])
+        for row in rows:
+            try:
+                db.upsert(row)
+            except ValueError as e:
+                importer.error(None, str(e), row[1])
+        publish_trains(row[0] for row in rows)
+        importer.record(inserted, updated)
+
+    try:
+        async for chunk in request.stream():
+            for batch in importer.take(parser.feed(chunk), pending):
+                await write(batch)
+        for batch in importer.take(parser.close(), pending):
+            await write(batch)
+        if pending:
+            await write(pending)
+    except ValueError as e:
+        # A broken JSON array: store the valid rows read before the damage and report where it stopped
+        if pending:
+            await write(pending)
+        return JSONResponse(status_code=400, content={"success": False, "detail": str(e), "data": importer.report()})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "data": importer.report()}
+
+@app.get("/api/trains/{train_id}")
+async def get_train(train_id: int):
+    train_row = db.get_train(train_id)
+    if not train_row:
+        raise HTTPException(status_code=404, detail="Train not found")
+    
+    try:
+        body = b'{"success":true,"data":' + train_cache.fragment(train_row) + b"}"
+        return Response(content=body, media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/induction/generate-plan")
+async def generate_induction_plan(horizon: int = 30, limit: Optional[int] = None, timeBudget: Optional[float] = None):
+    if not 1 <= horizon <= 365:
+        raise HTTPException(status_code=400, detail="horizon must be between 1 and 365 days")
+    try:
+        # Deterministic slot assignment under depot capacity, maintenance windows and mileage balancing;
+        # the result becomes the current plan served by GET /api/induction/plan
+        optimizer = InductionOptimizer(horizon_days=horizon)
+        result = await asyncio.to_thread(induction_plan.rebuild, time_budget=timeBudget, optimizer=optimizer)
+        bus.publish("induction_plan", {"horizon": horizon, "timeBudget": timeBudget})
+        plans, summary = induction_plan.read(limit)
+        summary["elapsed_ms"] = round(result["elapsed_ms"], 2)
+        return {"success": True, "data": plans, "summary": summary}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/induction/ranking")
+async def get_induction_ranking(k: int = 10):
+    if not 1 <= k <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        # Top-k by the same score the optimizer plans with; trains already in the shop are skipped
+        scorer = induction_plan.optimizer.scorer
+        candidates = db.get_trains_without_status("Maintenance")
+        ranking = [
+            {"rank": rank, "train_id": row[0], "train_number": row[1], "priority_score": round(score, 1)}
+            for rank, (score, row) in enumerate(scorer.top_k(candidates, k), 1)
+        ]
+        return {"success": True, "data": ranking}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def run_simulation_job(params, progress):
+    # Job handler: the Monte Carlo work itself runs on the simulator's process pool
+    trains, scenario_type = params["trains"], params["scenario_type"]
+    study = scenario_simulator.run(
+        trains, history_db.get_depots(), scenario_type, replications=params["replications"], seed=params["seed"],
+        time_budget=params["time_budget"], days=params["days"], progress=progress, **params["options"]
+    )
+    
+    baseline, scenario = study["baseline"], study["scenario"]
+    total_trains = len(trains)
+    required = min(total_trains, math.ceil(scenario_simulator.params["service_ratio"] * total_trains))
+    availability_drop = (baseline["availability"]["mean"] or 0) - (scenario["availability"]["mean"] or 0)
+    result = {
+        "scenario_type": scenario_type,
+        "base_metrics": {
+            "total_trains": total_trains,
+            "available_trains": round((baseline["availability"]["mean"] or 0) * total_trains, 1),
+            "scheduled_trains": required
+        },
+        "simulation_metrics": {
+            "total_trains": total_trains,
+            "available_trains": round((scenario["availability"]["mean"] or 0) * total_trains, 1),
+            "scheduled_trains": required
+        },
+        "impact": {
+            "service_disruption": "Minimal" if availability_drop <= 0.01 else "Moderate" if availability_drop <= 0.05 else "High",
+            "replacement_found": "replacement_index" in params["options"],
+            "estimated_delay": f"{round(scenario['delay_minutes']['mean'] or 0)} minutes/day",
+            "delay_change_minutes": round((scenario["delay_minutes"]["mean"] or 0) - (baseline["delay_minutes"]["mean"] or 0), 1),
+            "shunting_change_per_day": round((scenario["shunting_moves"]["mean"] or 0) - (baseline["shunting_moves"]["mean"] or 0), 2)
+        },
+        "distributions": {"baseline": baseline, "scenario": scenario},
+        "simulation": {key: study[key] for key in ("seed", "days", "replications", "replications_requested", "budget_exhausted", "elapsed_ms")}
+    }
+    
+    if scenario_type == "train_replacement" and "replacement_index" in params["options"]:
+        original = trains[params["options"]["train_index"]] if "train_index" in params["options"] else None
+        replacement = trains[params["options"]["replacement_index"]]
+        same_depot = original is not None and original[5] == replacement[5]
+        result["replacement_details"] = {
+            "original_train": original[1] if original else None,
+            "replacement_train": replacement[1],
+            "depot_transfer_time": "None (same depot)" if same_depot else f"{round(scenario_simulator.params['transfer_delay_minutes'])} minutes",
+            "service_resumption": "Next scheduled departure"
+        }
+    return result
+
+jobs.register("simulation", run_simulation_job, concurrency=1)
+
+@app.post("/api/induction/simulate")
+async def simulate_scenario(scenario_data: dict, background: bool = False):
+    scenario_type = scenario_data.get("scenario_type", "train_replacement")
+    train_id = scenario_data.get("train_id")
+    replacement_train_id = scenario_data.get("replacement_train_id")
+    parameters = scenario_data.get("parameters") or {}
+    if scenario_type not in SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"scenario_type must be one of {', '.join(SCENARIOS)}")
+    
+    try:
+        replications = int(parameters.get("replications", 500))
+        days = int(parameters.get("days", 14))
+        time_budget = float(parameters.get("time_budget", 5.0))
+        seed = parameters.get("seed")
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="replications, days, time_budget and seed must be numbers")
+    if not 1 <= replications <= 20000 or not 1 <= days <= 365 or not 0 < time_budget <= 60:
+        raise HTTPException(status_code=400, detail="Use 1-20000 replications, 1-365 days and a 0-60 s time budget")
+    
+    trains = [tuple(t) for t in db.get_trains()]
+    positions = {t[0]: i for i, t in enumerate(trains)}
+    options = {}
+    if scenario_type == "train_replacement":
+        for key, value in (("train_index", train_id), ("replacement_index", replacement_train_id)):
+            if value is not None:
+                if value not in positions:
+                    raise HTTPException(status_code=404, detail=f"Train {value} not found")
+                options[key] = positions[value]
+    elif scenario_type == "branding_priority":
+        # The UI sends the branding priority level in train_id
+        options["priority_level"] = parameters.get("priority_level") or train_id or 1
+    
+    params = {
+        "trains": trains, "scenario_type": scenario_type, "replications": replications, "seed": seed,
+        "time_budget": time_budget, "days": days, "options": options
+    }
+    try:
+        job = jobs.submit("simulation", params)
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if background:
+        return JSONResponse(status_code=202, content={"success": True, "data": job.to_dict()})
+    
+    # Synchronous callers still go through the queue, so the per-type cap holds for them too
+    try:
+        result = await asyncio.wrap_future(job.future)
+    except JobCancelled:
+        raise HTTPException(status_code=409, detail="Simulation was cancelled")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "data": result}
+
+@app.get("/api/dashboard")
+async def get_dashboard_data():
+    try:
+        return Response(content=current_dashboard().body(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/induction/history")
+async def get_induction_history(limit: int = 50):
+    # Mock historical data
+    history = [
+        {
+            "id": 1,
+            "date": (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M'),
+            "trains_scheduled": 5,
+            "high_priority": 2,
+            "avg_score": 67.8,
+            "generated_by": "System Auto",
+            "status": "Completed"
+        },
+        {
+            "id": 2,
+            "date": (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d %H:%M'),
+            "trains_scheduled": 3,
+            "high_priority": 1,
+            "avg_score": 54.2,
+            "generated_by": "Manual Override",
+            "status": "Partially Completed"
+        }
+    ]
+    return {"success": True, "data": history[:limit]}
+
+@app.get("/api/induction/plan")
+async def get_current_plan(limit: Optional[int] = None):
+    try:
+        # Only the first read of the day waits, for a rebuild running on a thread
+        await induction_plan.refresh()
+        if limit:
+            plans, summary = induction_plan.read(limit)
+            return {"success": True, "data": plans, "summary": summary}
+        return Response(content=induction_plan.body(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def analytics_window(period, since, until):
+    if period not in ANALYTICS_PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(ANALYTICS_PERIODS)}")
+    since, until = parse_export_range(since, until)
+    return bucket_range(period, since, until)
+
+@app.get("/api/analytics/performance")
+async def get_performance_analytics(period: str = "month", since: Optional[str] = None, until: Optional[str] = None):
+    # Answered from the daily/monthly rollups, so the cost does not grow with history
+    first, last = analytics_window(period, since, until)
+    try:
+        data = performance_series(
+            period, await repo.maintenance_rollups(period, first, last),
+            await repo.activity_rollups(period, first, last), len(db)
+        )
+        return {"success": True, "data": data}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/maintenance/predictions")
+async def get_maintenance_predictions(trainId: Optional[int] = None):
+    # Results of the last scheduled batch; nothing is scored here
+    if trainId is not None:
+        prediction = predictor.predictions.get(trainId)
+        if prediction is None:
+            raise HTTPException(status_code=404, detail="No prediction for this train yet")
+        return {"success": True, "data": prediction}
+    return {"success": True, "data": list(predictor.predictions.values()), "lastRun": predictor.last_run}
+
+@app.post("/api/maintenance/predictions/run")
+async def refresh_maintenance_predictions():
+    try:
+        return {"success": True, "data": await run_predictions()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def maintenance_row_to_dict(row):
+    train = db.get_train(row[1])
+    return {
+        "id": row[0],
+        "trainId": train.train_number if train is not None else row[1],
+        "type": row[2],
+        "status": row[3],
+        "scheduledDate": row[4],
+        "completedDate": row[5],
+        "estimatedHours": row[6],
+        "actualHours": row[7],
+        "priority": row[8],
+        "technician": row[9],
+        "cost": row[10],
+        "description": row[11],
+    }
+
+# API field -> maintenance_records column
+MAINTENANCE_API_FIELDS = {
+    "type": "type", "status": "status", "scheduledDate": "scheduled_date", "completedDate": "completed_date",
+    "estimatedHours": "estimated_hours", "actualHours": "actual_hours", "priority": "priority",
+    "technician": "technician", "cost": "cost", "description": "description",
+}
+
+@app.get("/api/maintenance/records")
+async def get_maintenance_records(status: Optional[str] = None, limit: int = 100):
+    try:
+        records = [maintenance_row_to_dict(row) for row in await repo.get_maintenance_records(status, limit)]
+        return {"success": True, "data": records}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/maintenance/schedule")
+async def schedule_maintenance(maintenance_data: dict):
+    train_id = maintenance_data.get("trainId")
+    train = db.get_train_by_number(train_id) if isinstance(train_id, str) else db.get_train(train_id)
+    if train is None:
+        raise HTTPException(status_code=404, detail="Train not found")
+    if not maintenance_data.get("scheduledDate"):
+        raise HTTPException(status_code=400, detail="scheduledDate is required")
+    fields = dict({"type": "Preventive", "status": "Scheduled"}, **maintenance_data)
+    record = (train.id,) + tuple(fields.get(api) for api in MAINTENANCE_API_FIELDS)
+    try:
+        record_id = (await repo.add_maintenance_records([record]))[0]
+        return {"success": True, "message": "Maintenance scheduled successfully", "data": {"id": record_id}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.put("/api/maintenance/records/{record_id}")
+async def update_maintenance_record(record_id: int, maintenance_data: dict):
+    # e.g. {"status": "Completed", "completedDate": "...", "actualHours": 9, "cost": 52000}; rollups follow in the same transaction
+    changes = {MAINTENANCE_API_FIELDS[name]: value for name, value in maintenance_data.items() if name in MAINTENANCE_API_FIELDS}
+    try:
+        if not await repo.update_maintenance_record(record_id, **changes):
+            raise HTTPException(status_code=404, detail="Maintenance record not found")
+        return {"success": True, "message": "Maintenance record updated"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/alerts")
+async def get_alerts(status: Optional[str] = None):
+    try:
+        alerts = [alert_row_to_dict(row) for row in await repo.get_alerts(status)]
+        return {"success": True, "data": alerts}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def parse_export_range(since, until):
+    try:
+        return (datetime.fromisoformat(since) if since else None,
+                datetime.fromisoformat(until) if until else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since and until must be ISO dates or datetimes")
+
+@app.post("/api/reports/generate")
+async def generate_report(report_data: dict):
+    report_type = report_data.get("type", "fleet-performance")
+    if report_type in EXPORT_DATASETS:
+        # Raw history export written to a file by a background job, fetched via /download
+        fmt = report_data.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        since, until = parse_export_range(report_data.get("since"), report_data.get("until"))
+        params = {
+            "dataset": report_type, "format": fmt, "since": since, "until": until,
+            "filters": export_filters(report_type, report_data),
+            "filename": export_filename(report_type, fmt, datetime.now().strftime("%Y%m%d%H%M%S%f")),
+            "database": history_db.db_path
+        }
+        job_type = "export"
+    elif report_type in REPORT_TYPES:
+        try:
+            days = int(report_data.get("days", 30))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="days must be a number")
+        params = {"type": report_type, "days": days, "trains": [tuple(t) for t in db.get_trains()], "database": history_db.db_path}
+        job_type = "report"
+    else:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(list(REPORT_TYPES) + list(EXPORT_DATASETS))}")
+    
+    try:
+        job = jobs.submit(job_type, params)
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "success": True, 
+        "message": "Report generation started",
+        "reportId": job.id,
+        "status": job.status
+    }
+
+def get_report_job(report_id):
+    job = jobs.get(report_id)
+    if job is None or job.type not in ("report", "export"):
+        raise HTTPException(status_code=404, detail="Report not found")
+    return job
+
+@app.get("/api/reports/{report_id}/status")
+async def get_report_status(report_id: str):
+    return {"success": True, "data": get_report_job(report_id).to_dict()}
+
+@app.get("/api/reports/{report_id}/download")
+async def download_report(report_id: str):
+    job = get_report_job(report_id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Report is {job.status}")
+    if job.type == "export":
+        if not os.path.exists(job.result["path"]):
+            raise HTTPException(status_code=410, detail="Export file is no longer available")
+        return FileResponse(job.result["path"], media_type=EXPORT_FORMATS[job.result["format"]][0], filename=job.result["name"])
+    filename = f"{job.params['type']}-{job.id}.json"
+    return Response(content=dump_json(job.result), media_type="application/json",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/reports/history")
+async def get_report_history():
+    reports = []
+    for job in jobs.list():
+        if job.type == "report":
+            name = job.result["name"] if job.result else REPORT_TYPES[job.params["type"]]
+            report_type, rows, fmt = REPORT_TYPES[job.params["type"]], len(job.result["rows"]) if job.result else None, "JSON"
+        elif job.type == "export":
+            name = job.params["filename"]
+            report_type, rows, fmt = "Data Export", job.result["rows"] if job.result else None, job.params["format"].upper()
+        else:
+            continue
+        reports.append({
+            "id": job.id,
+            "name": name,
+            "type": report_type,
+            "generatedDate": (job.finished_at or job.created_at).strftime("%Y-%m-%d"),
+            "status": job.status.capitalize(),
+            "rows": rows,
+            "size": f"{job.result['bytes'] / 1048576:.1f} MB" if job.type == "export" and job.result else None,
+            "format": fmt
+        })
+    return {"success": True, "data": reports}
+
+@app.get("/api/exports/{dataset}")
+async def export_dataset(dataset: str, format: str = "csv", since: Optional[str] = None, until: Optional[str] = None,
+                         trainId: Optional[int] = None, sensorType: Optional[str] = None, status: Optional[str] = None):
+    # Streams straight from a SQLite cursor; memory use is one chunk whatever the range
+    start, end = parse_export_range(since, until)
+    try:
+        filters = export_filters(dataset, {"trainId": trainId, "sensorType": sensorType, "status": status})
+        body = stream_export(history_db, dataset, format, start, end, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = export_filename(dataset, format, datetime.now().strftime("%Y%m%d%H%M%S"))
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format][0],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/jobs")
+async def list_jobs(type: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    return {"success": True, "data": [job.to_dict() for job in jobs.list(type, status, limit)], "stats": jobs.stats()}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": job.to_dict()}
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return {"success": True, "data": job.result}
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": job.to_dict()}
+
+# Additional comprehensive endpoints
+@app.put("/api/trains/{train_id}")
+async def update_train(train_id: int, train_data: TrainUpdate):
+    # Fields left out or sent as null are left unchanged
+    fields = train_data.model_dump(exclude_none=True)
+    changes = {
+        TRAIN_UPDATE_FIELDS[key]: value.isoformat() if isinstance(value, date) else value
+        for key, value in fields.items() if key in TRAIN_UPDATE_FIELDS
+    }
+    if "currentDepot" in fields:
+        if fields["currentDepot"] not in DEPOT_NAMES:
+            raise HTTPException(status_code=400, detail="Unknown depot")
+        changes["depot_id"] = DEPOT_NAMES.index(fields["currentDepot"]) + 1
+    
+    try:
+        # Stored first: the trains table is what every worker's fleet follows
+        row = await repo.update_train(train_id, **changes)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Train not found")
+        record = db.upsert(row)
+    except (ValueError, sqlite3.IntegrityError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    publish_trains([train_id])
+    
+    return {"success": True, "message": "Train updated successfully", "data": train_row_to_dict(record)}
+
+@app.delete("/api/trains/{train_id}")
+async def delete_train(train_id: int):
+    if not await repo.delete_train(train_id):
+        raise HTTPException(status_code=404, detail="Train not found")
+    db.delete_train(train_id)
+    publish_trains([train_id])
+    
+    return {"success": True, "message": "Train deleted successfully"}
+
+@app.get("/api/trains/{train_id}/sensors")
+async def get_train_sensors(train_id: int, timeRange: str = '1h', sensorType: Optional[str] = None):
+    try:
+        # Raw readings for short ranges, 1 min / 15 min / 1 h rollups for longer ones
+        resolution, formatted_data = await repo.get_sensor_series(train_id, timeRange, sensorType)
+        
+        return {"success": True, "data": formatted_data, "resolution": resolution}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/trains/{train_id}/sensors/archive")
+async def get_archived_train_sensors(train_id: int, since: Optional[str] = None, until: Optional[str] = None,
+                                     sensorType: Optional[str] = None, limit: int = 10000):
+    # Raw readings that retention moved out of the database, read back from the compressed day files
+    if not 1 <= limit <= 100000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100000")
+    start, end = parse_export_range(since, until)
+    try:
+        rows = await retention.query(train_id, start, end, sensorType, limit)
+        data = [
+            {
+                "id": row[0],
+                "train_id": row[1],
+                "sensor_type": row[2],
+                "value": row[3],
+                "unit": row[4],
+                "timestamp": datetime.fromisoformat(row[5]).isoformat(),
+                "is_anomaly": bool(row[6]),
+            }
+            for row in rows
+        ]
+        return {"success": True, "data": data}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/retention/stats")
+async def get_retention_stats():
+    try:
+        return {"success": True, "data": dict(retention.stats(), storage=await repo.storage_stats(), role=bus.role)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/retention/run")
+async def run_retention():
+    # Runs now on the owner; another worker hands the request over and returns straight away
+    if not bus.owner:
+        bus.publish("retention_run", {})
+        return {"success": True, "data": None, "message": "Retention run requested from the bus owner"}
+    try:
+        return {"success": True, "data": await retention.run()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/alerts/{alert_id}/acknowledge")
+async def acknowledge_alert(alert_id: int):
+    try:
+        if not await repo.acknowledge_alert(alert_id):
+            raise HTTPException(status_code=404, detail="Alert not found")
+        
+        return {"success": True, "message": "Alert acknowledged"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/depots")
+async def get_depots():
+    try:
+        formatted_depots = [
+            {
+                "id": depot[0],
+                "name": depot[1],
+                "capacity": depot[2],
+                "current_occupancy": depot[3],
+                "location": depot[4],
+                "utilization": round(depot[3] * 100 / depot[2]) if depot[2] else 0,
+                "available_slots": max(0, depot[2] - depot[3])
+            } for depot in await repo.get_depots()
+        ]
+        
+        return {"success": True, "data": formatted_depots}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/cost")
+async def get_cost_analytics(period: str = "month", since: Optional[str] = None, until: Optional[str] = None):
+    first, last = analytics_window(period, since, until)
+    try:
+        return {"success": True, "data": cost_summary(period, await repo.maintenance_rollups(period, first, last))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/analytics/backfill")
+async def backfill_analytics(request_data: Optional[dict] = None):
+    # Rebuilds the rollups from the source tables in the background, from `since` (ISO date) or from scratch
+    since = (request_data or {}).get("since")
+    if since is not None:
+        since = parse_export_range(since, None)[0].date()
+    try:
+        job = jobs.submit("analytics-backfill", {"since": since})
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={"success": True, "data": job.to_dict()})
+
+@app.get("/api/notifications")
+async def get_notifications():
+    notifications = [
+        {
+            "id": 1,
+            "title": "Maintenance Alert",
+            "message": "Train KMRL-001 requires scheduled maintenance",
+            "type": "warning",
+            "timestamp": datetime.now().isoformat(),
+            "read": False
+        },
+        {
+            "id": 2,
+            "title": "System Update",
+            "message": "New AI optimization algorithm deployed",
+            "type": "info",
+            "timestamp": (datetime.now() - timedelta(hours=2)).isoformat(),
+            "read": True
+        }
+    ]
+    return {"success": True, "data": notifications}
+
+# WebSocket endpoint for real-time updates
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    client = hub.connect(websocket)
+    try:
+        while True:
+            # Clients send {"action": "subscribe", "trains": [1, 2], "sensors": ["temperature"]} etc.
+            hub.handle_message(client, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.disconnect(client, close=False)
+
+# Start background tasks
+async def start_owner_tasks():
+    # Runs in the one process that owns the bus: at startup, or when it takes over from a dead owner
+    if bus.path is not None:
+        fleet_sync.request()
+    # Load the aggregate before the writer starts, so no batch is counted twice
+    dashboard.load()
+    ingestion.start()
+    asyncio.create_task(generate_sensor_data())
+    asyncio.create_task(push_dashboard_updates())
+    asyncio.create_task(schedule_predictions())
+    asyncio.create_task(schedule_retention())
+
+bus.on_promote(start_owner_tasks)
+# Events sent while a worker was disconnected are lost to it, so it re-reads the whole fleet
+bus.on_connect(fleet_sync.request)
+
+@app.on_event("startup")
+async def startup_event():
+    asyncio.create_task(sample_loop_lag(loop_lag, loop_lag_last))
+    await bus.start()
+    if not bus.owner:
+        await load_predictions()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush whatever is still buffered before the process exits
+    await asyncio.to_thread(ingestion.close)
+    await asyncio.to_thread(jobs.shutdown)
+    await asyncio.to_thread(repo.close)
+    await bus.close()
+    scenario_simulator.close()
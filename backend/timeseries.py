@@ -0,0 +1,87 @@
+from datetime import datetime
+
+# Rollup bucket widths in seconds: 1 min, 15 min, 1 h
+ROLLUP_RESOLUTIONS = (60, 900, 3600)
+
+# Ranges up to this many seconds are answered from raw readings
+RAW_MAX_RANGE = 3600
+
+TIME_RANGE_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+UPSERT_ROLLUP = '''
+    INSERT INTO sensor_rollups (resolution, train_id, sensor_type, bucket_start, unit, count, sum, min, max, anomalies)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, train_id, sensor_type, bucket_start) DO UPDATE SET
+        count = count + excluded.count,
+        sum = sum + excluded.sum,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max),
+        anomalies = anomalies + excluded.anomalies
+'''
+
+
+def parse_time_range(time_range):
+    # "15m", "1h", "24h", "7d", "2w" -> seconds
+    time_range = (time_range or "1h").strip().lower()
+    unit = TIME_RANGE_UNITS.get(time_range[-1:])
+    try:
+        amount = int(time_range[:-1])
+    except ValueError:
+        amount = 0
+    if unit is None or amount <= 0:
+        raise ValueError(f"Invalid timeRange: {time_range}")
+    return amount * unit
+
+
+def pick_resolution(range_seconds, max_points=1000):
+    # 0 means raw rows; otherwise the finest rollup that keeps the series under max_points
+    if range_seconds <= RAW_MAX_RANGE:
+        return 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        if range_seconds / resolution <= max_points:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def to_epoch(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp.timestamp()
+
+
+def aggregate_readings(readings):
+    # Fold a batch of (train_id, sensor_type, value, unit, timestamp, is_anomaly)
+    # readings into one partial aggregate per rollup bucket
+    buckets = {}
+    for train_id, sensor_type, value, unit, timestamp, is_anomaly in readings:
+        epoch = to_epoch(timestamp)
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (resolution, train_id, sensor_type, int(epoch // resolution) * resolution)
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = [unit, 1, value, value, value, int(bool(is_anomaly))]
+            else:
+                agg[1] += 1
+                agg[2] += value
+                if value < agg[3]:
+                    agg[3] = value
+                if value > agg[4]:
+                    agg[4] = value
+                agg[5] += int(bool(is_anomaly))
+    return [key + tuple(agg) for key, agg in buckets.items()]
+
+
+def rollup_row_to_dict(row):
+    resolution, train_id, sensor_type, bucket_start, unit, count, total, low, high, anomalies = row
+    return {
+        "train_id": train_id,
+        "sensor_type": sensor_type,
+        "value": total / count if count else None,
+        "min": low,
+        "max": high,
+        "count": count,
+        "unit": unit,
+        "timestamp": datetime.fromtimestamp(bucket_start).isoformat(),
+        "resolution": resolution,
+        "is_anomaly": anomalies > 0,
+    }
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Offline training for the predictive maintenance model.
+
+There is no labelled failure history yet, so the model is fitted on a
+simulated fleet: each train gets a latent wear level driven by mileage, age
+and time since maintenance, wear shifts its sensor readings (hotter, more
+vibration, pressure drifting low, a rising trend and more threshold
+breaches), and health and remaining useful life follow from wear and wear
+rate. The simulated week of hourly statistics goes through the same
+feature_matrix() used for inference, so training and serving features match.
+
+Usage: python train_predictive_model.py [--trains 5000] [--seed 7] [--output models/predictive_model.json]
+"""
+import argparse
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
+from predictive import MAX_RUL_DAYS, MODEL_PATH, SENSORS, feature_matrix, fit_model
+from sensor_simulator import MODEL_THRESHOLDS
+
+HOURS = 7 * 24
+READINGS_PER_HOUR = 60
+
+# Per sensor: healthy mean, shift at full wear, trend per day per unit wear rate, hourly noise, in-hour spread.
+# A train at moderate wear produces roughly what sensor_simulator emits.
+SENSOR_WEAR = {
+    "temperature": (72.0, 12.0, 40.0, 2.0, 8.0),
+    "vibration": (2.4, 1.6, 12.0, 0.2, 0.8),
+    "pressure": (8.3, -1.0, -8.0, 0.15, 0.8),
+}
+
+_erfc = np.vectorize(math.erfc)
+
+
+def tail_probability(mean, spread, low, high):
+    # Share of normally distributed readings outside (low, high)
+    p = np.zeros_like(mean)
+    if high is not None:
+        p += 0.5 * _erfc((high - mean) / (spread * math.sqrt(2)))
+    if low is not None:
+        p += 0.5 * _erfc((mean - low) / (spread * math.sqrt(2)))
+    return np.minimum(p, 1.0)
+
+
+def simulate_fleet(size, rng, today):
+    mileage = rng.uniform(2000, 60000, size)
+    age = rng.integers(0, 9, size)
+    days_since = rng.uniform(0, 365, size)
+    latent = rng.beta(2, 4, size)
+    wear = np.clip(0.35 * mileage / 60000 + 0.2 * age / 8 + 0.3 * days_since / 365 + 0.3 * latent - 0.05, 0, 1)
+    wear_rate = rng.uniform(0.002, 0.008, size) * (0.6 + wear)
+
+    trains = [
+        (i, float(mileage[i]), (today - timedelta(days=int(days_since[i]))).isoformat(), today.year - int(age[i]))
+        for i in range(size)
+    ]
+    x = np.arange(HOURS) / 24.0
+    stats = []
+    for j, sensor in enumerate(SENSORS):
+        healthy, shift, trend, noise, spread = SENSOR_WEAR[sensor]
+        low, high = MODEL_THRESHOLDS["default"].get(sensor, (None, None))
+        # hourly means: size x HOURS
+        means = (healthy + shift * wear)[:, None] + (trend * wear_rate)[:, None] * (x - x[-1])[None, :]
+        means = means + rng.normal(0, noise, (size, HOURS))
+        within = spread * (1 + wear)[:, None]
+        breaches = rng.binomial(READINGS_PER_HOUR, tail_probability(means, within, low, high))
+        for i in range(size):
+            m = means[i]
+            stats.append((
+                i, j, HOURS, HOURS * READINGS_PER_HOUR, m.mean(), (m * m).mean(),
+                (m + 2.5 * within[i]).max(), breaches[i].sum(), x.sum(), (x * x).sum(), (x * m).sum(),
+            ))
+
+    health = np.clip(100 - 75 * wear + rng.normal(0, 3, size), 5, 99)
+    rul = np.clip((1 - wear) / wear_rate * rng.lognormal(0, 0.15, size), 1, MAX_RUL_DAYS)
+    return trains, stats, health, rul
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trains", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--l2", type=float, default=1.0)
+    parser.add_argument("--version", default="1")
+    parser.add_argument("--output", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    today = date.today()
+    trains, stats, health, rul = simulate_fleet(args.trains, rng, today)
+    _, X = feature_matrix(trains, stats, today)
+
+    holdout = args.trains // 5
+    model = fit_model(X[holdout:], health[holdout:], rul[holdout:], l2=args.l2, version=args.version)
+    predicted_health, predicted_rul = model.predict(X[:holdout])
+    print(f"trained on {args.trains - holdout} simulated trains, {len(model.features)} features")
+    print(f"holdout health MAE: {np.abs(predicted_health - health[:holdout]).mean():.1f} points")
+    print(f"holdout RUL median abs error: {np.median(np.abs(predicted_rul - rul[:holdout])):.1f} days")
+    model.save(args.output)
+    print(f"saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
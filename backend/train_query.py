@@ -0,0 +1,92 @@
+import base64
+import json
+
+# API sort names -> (trains column, TrainRecord / row position)
+SORT_FIELDS = {
+    "id": ("id", 0),
+    "trainNumber": ("train_number", 1),
+    "model": ("model", 2),
+    "status": ("status", 3),
+    "mileage": ("mileage", 4),
+    "healthScore": ("health_score", 6),
+}
+
+MAX_PAGE_SIZE = 1000
+
+
+def parse_sort(sort):
+    # "mileage" ascending, "-mileage" descending
+    sort = sort or "id"
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in SORT_FIELDS:
+        raise ValueError(f"Cannot sort by {name}; use one of {', '.join(SORT_FIELDS)}")
+    return name, descending
+
+
+def encode_cursor(sort, row):
+    position = SORT_FIELDS[sort.lstrip("-")][1]
+    raw = json.dumps([sort, row[position], row[0]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    # Returns (sort value, id) of the last row on the previous page
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, train_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != (sort or "id"):
+        raise ValueError("Cursor was issued for a different sort order")
+    return value, train_id
+
+
+def filter_sql(status=None, depot_id=None, model=None, manufacturer=None,
+               min_health=None, max_health=None, min_mileage=None, max_mileage=None):
+    clauses, params = [], []
+    for clause, value in (
+        ("status = ? COLLATE NOCASE", status),
+        ("depot_id = ?", depot_id),
+        ("model = ?", model),
+        ("manufacturer = ?", manufacturer),
+        ("health_score >= ?", min_health),
+        ("health_score <= ?", max_health),
+        ("mileage >= ?", min_mileage),
+        ("mileage <= ?", max_mileage),
+    ):
+        if value is not None and value != "":
+            clauses.append(clause)
+            params.append(value)
+    return clauses, params
+
+
+def page_sql(clauses, params, sort="id", limit=None, cursor=None):
+    name, descending = parse_sort(sort)
+    column = SORT_FIELDS[name][0]
+    direction = "DESC" if descending else "ASC"
+    clauses, params = list(clauses), list(params)
+    if cursor:
+        # Keyset pagination: continue after (sort value, id) of the previous page. NULLs sort
+        # first ascending and last descending, as in SQLite, and never compare in a row value.
+        value, train_id = decode_cursor(cursor, sort)
+        if value is None:
+            clauses.append(f"({column} IS NULL AND id < ?)" if descending else f"({column} IS NULL AND id > ? OR {column} IS NOT NULL)")
+            params.append(train_id)
+        else:
+            clauses.append(f"(({column}, id) < (?, ?) OR {column} IS NULL)" if descending else f"({column}, id) > (?, ?)")
+            params.extend([value, train_id])
+    sql = "SELECT * FROM trains"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {column} {direction}, id {direction}"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def project(train, fields):
+    if not fields:
+        return train
+    return {name: train[name] for name in fields if name in train}
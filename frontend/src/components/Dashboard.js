@@ -106,12 +106,20 @@ const Dashboard = () => {
     // Connect to WebSocket for real-time updates
     wsService.connect();
     wsService.subscribe('sensor_update', handleSensorUpdate);
+    wsService.subscribe('dashboard_update', handleDashboardUpdate);
     
     return () => {
       wsService.unsubscribe('sensor_update', handleSensorUpdate);
+      wsService.unsubscribe('dashboard_update', handleDashboardUpdate);
     };
   }, []);
   
+  // The server pushes the dashboard aggregate whenever it changes, so there is nothing to poll
+  const handleDashboardUpdate = (message) => {
+    setDashboardData(message.data);
+    setLastUpdate(new Date());
+  };
+  
   const handleSensorUpdate = (data) => {
     setRealTimeData(prev => ({
       ...prev,
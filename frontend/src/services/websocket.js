@@ -19,7 +19,12 @@ class WebSocketService {
       this.ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
-          this.notifyListeners(data.type, data);
+          if (data.type === 'sensor_batch') {
+            // The server sends every train's readings for a tick in one frame
+            data.updates.forEach(update => this.notifyListeners('sensor_update', { type: 'sensor_update', ...update }));
+          } else {
+            this.notifyListeners(data.type, data);
+          }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
@@ -47,6 +52,13 @@ class WebSocketService {
     }
   }
 
+  // Server-side topic filter, e.g. updateSubscription('subscribe', { trains: [1, 2], sensors: ['temperature'] })
+  updateSubscription(action, topics = {}) {
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify({ action, ...topics }));
+    }
+  }
+
   subscribe(eventType, callback) {
     if (!this.listeners.has(eventType)) {
       this.listeners.set(eventType, []);
@@ -3,8 +3,9 @@ import uvicorn
 import sys
 import os
 
-# Add the backend directory to Python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add the backend directory to Python path; server.py imports its sibling modules directly
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
 
 if __name__ == "__main__":
     print("🚊 Starting KMRL Backend Server...")
@@ -15,7 +16,8 @@ if __name__ == "__main__":
     
     try:
         uvicorn.run(
-            "backend.main:app",
+            "server:app",
+            app_dir=BACKEND_DIR,
             host="127.0.0.1",
             port=8001,
             reload=True,